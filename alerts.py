@@ -0,0 +1,353 @@
+"""
+EAR Trader Simulator - Alerts
+User-defined rules on prices, EAR indicators and regime changes, indexed by
+(symbol, field) so each market update only touches the rules it can fire
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from db import Database
+from ear_engine import REGIMES
+
+ALERTS_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS alert_rules
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        field TEXT NOT NULL,
+        condition TEXT NOT NULL,
+        threshold REAL,
+        from_value TEXT,
+        to_value TEXT,
+        note TEXT,
+        created_at TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS alert_events
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rule_id INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        field TEXT NOT NULL,
+        previous,
+        value,
+        message TEXT,
+        fired_at TIMESTAMP)'''
+]
+
+# Numeric fields take above/below thresholds; categorical fields take changes
+THRESHOLD_FIELDS = ('current_price', 'epi', 'eci', 'etb')
+CHANGE_FIELDS = ('regime',)
+CONDITIONS = ('above', 'below', 'changes')
+
+# Rule symbol matching every symbol
+ANY_SYMBOL = '*'
+
+# Called with the events fired by one update, after they are stored
+AlertListener = Callable[[List[Dict]], None]
+
+
+def parse_rule(data: Dict) -> Dict:
+    """Validate a raw rule payload, raising ValueError on bad input"""
+    try:
+        rule = {
+            'symbol': str(data['symbol']).strip().upper(),
+            'field': data['field'],
+            'condition': data['condition'],
+            'threshold': None,
+            'from': data.get('from'),
+            'to': data.get('to'),
+            'note': data.get('note')
+        }
+        if rule['condition'] in ('above', 'below'):
+            rule['threshold'] = float(data['threshold'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid rule: {e}')
+
+    if not rule['symbol']:
+        raise ValueError('Symbol is required')
+    if rule['condition'] not in CONDITIONS:
+        raise ValueError(f"Unknown condition: {rule['condition']} (use {', '.join(CONDITIONS)})")
+    fields = CHANGE_FIELDS if rule['condition'] == 'changes' else THRESHOLD_FIELDS
+    if rule['field'] not in fields:
+        raise ValueError(f"{rule['condition']} applies to {', '.join(fields)}")
+    if rule['condition'] == 'changes':
+        for key in ('from', 'to'):
+            if rule[key] is not None and rule[key] not in REGIMES:
+                raise ValueError(f"Unknown regime in {key}: {rule[key]} (use {', '.join(REGIMES)})")
+    return rule
+
+
+def describe(rule: Dict, symbol: str, previous, value) -> str:
+    """Human-readable message of a rule fired for symbol"""
+    if rule['condition'] == 'changes':
+        message = f"{symbol} {rule['field']}: {previous} -> {value}"
+    else:
+        message = (f"{symbol} {rule['field']} {rule['condition']} {rule['threshold']:.8g} "
+                   f"({previous:.8g} -> {value:.8g})")
+    return f"{message} - {rule['note']}" if rule['note'] else message
+
+
+class _Bucket:
+    """
+    Rules of one (symbol, field). Thresholds are kept sorted, so the rules
+    a move from `previous` to `value` crosses are one bisect away.
+    """
+
+    def __init__(self):
+        self.above: List[Tuple[float, int]] = []  # (threshold, rule id), sorted
+        self.below: List[Tuple[float, int]] = []
+        self.changes: List[int] = []
+
+    def add(self, rule: Dict):
+        if rule['condition'] == 'changes':
+            self.changes.append(rule['id'])
+        else:
+            insort(getattr(self, rule['condition']), (rule['threshold'], rule['id']))
+
+    def remove(self, rule: Dict):
+        if rule['condition'] == 'changes':
+            self.changes.remove(rule['id'])
+        else:
+            getattr(self, rule['condition']).remove((rule['threshold'], rule['id']))
+
+    def __len__(self):
+        return len(self.above) + len(self.below) + len(self.changes)
+
+    def crossed(self, previous: float, value: float) -> List[int]:
+        """Rules whose threshold lies between previous and value, in the direction of the move"""
+        if value > previous:
+            # above: previous <= threshold < value
+            rules = self.above[bisect_left(self.above, (previous,)):bisect_left(self.above, (value,))]
+        elif value < previous:
+            # below: value < threshold <= previous
+            inf = float('inf')
+            rules = self.below[bisect_right(self.below, (value, inf)):bisect_right(self.below, (previous, inf))]
+        else:
+            return []
+        return [rule_id for _, rule_id in rules]
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules against the market stream's deltas.
+
+    Rules are stored in SQLite and compiled into an index of _Buckets keyed
+    by (symbol, field), plus (ANY_SYMBOL, field) for rules on every symbol.
+    A changed field looks up its two buckets and bisects the thresholds it
+    moved across, so the cost of an update depends on the rules it fires,
+    not on how many rules exist. Thresholds fire when the value crosses
+    them (edge-triggered, also on the way back); a value seen for the first
+    time has nothing to cross.
+
+    Updates are queued by the stream's refresh loop and evaluated on a
+    worker thread; fired alerts are stored in alert_events and handed to
+    on_alerts (the stream, which pushes them to the UI).
+    """
+
+    def __init__(self, db: Database, on_alerts: Optional[AlertListener] = None):
+        self.db = db
+        self.on_alerts = on_alerts
+        self._rules: Optional[Dict[int, Dict]] = None
+        self._index: Dict[Tuple[str, str], _Bucket] = {}
+        self._lock = threading.Lock()
+        self._pending = deque()  # (delta, previous state, enqueued_at)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._busy = 0
+
+        self.updates = 0
+        self.candidates = 0
+        self.fired = 0
+        self.errors = 0
+        self.eval_time_total = 0.0
+
+    def _load(self) -> Dict[int, Dict]:
+        if self._rules is None:
+            rows = self.db.connection().execute(
+                """SELECT id, symbol, field, condition, threshold, from_value, to_value, note, created_at
+                   FROM alert_rules ORDER BY id""").fetchall()
+            self._rules = {}
+            for row in rows:
+                self._compile(dict(zip(('id', 'symbol', 'field', 'condition', 'threshold', 'from', 'to',
+                                        'note', 'created_at'), row)))
+        return self._rules
+
+    def _compile(self, rule: Dict):
+        self._rules[rule['id']] = rule
+        key = (rule['symbol'], rule['field'])
+        bucket = self._index.get(key)
+        if bucket is None:
+            bucket = self._index[key] = _Bucket()
+        bucket.add(rule)
+
+    def rules(self) -> List[Dict]:
+        with self._lock:
+            return list(self._load().values())
+
+    def symbols(self) -> List[str]:
+        """Symbols named by rules (not ANY_SYMBOL), which the stream has to watch"""
+        with self._lock:
+            self._load()
+            return list(dict.fromkeys(symbol for symbol, _ in self._index if symbol != ANY_SYMBOL))
+
+    def active(self) -> bool:
+        with self._lock:
+            return bool(self._load())
+
+    def add(self, rule: Dict) -> Dict:
+        """Store a rule (see parse_rule) and start evaluating it; returns it with its id"""
+        rule = dict(rule, created_at=datetime.now().isoformat())
+        with self._lock:
+            self._load()
+            conn = self.db.connection()
+            with conn:
+                cur = conn.execute("INSERT INTO alert_rules VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (rule['symbol'], rule['field'], rule['condition'], rule['threshold'],
+                                    rule['from'], rule['to'], rule['note'], rule['created_at']))
+            rule['id'] = cur.lastrowid
+            self._compile(rule)
+        return rule
+
+    def remove(self, rule_id: int) -> bool:
+        with self._lock:
+            rule = self._load().get(rule_id)
+            if rule is None:
+                return False
+            conn = self.db.connection()
+            with conn:
+                conn.execute("DELETE FROM alert_rules WHERE id=?", (rule_id,))
+            del self._rules[rule_id]
+            key = (rule['symbol'], rule['field'])
+            self._index[key].remove(rule)
+            if not self._index[key]:
+                del self._index[key]
+        return True
+
+    def submit(self, delta: Dict[str, Dict], previous: Dict[str, Dict]):
+        """Queue one stream update ({symbol: changed fields}) and the state before it"""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='alerts', daemon=True)
+                self._thread.start()
+            self._pending.append((delta, previous, time.monotonic()))
+            self._cond.notify_all()
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until every queued update has been evaluated"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = list(self._pending)
+                self._pending.clear()
+                self._busy += 1
+            try:
+                events = []
+                for delta, previous, _ in batch:
+                    events += self.evaluate(delta, previous)
+                if events:
+                    self._store(events)
+                    if self.on_alerts is not None:
+                        self.on_alerts(events)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error evaluating alerts: {e}")
+            finally:
+                self.db.release()
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def evaluate(self, delta: Dict[str, Dict], previous: Dict[str, Dict]) -> List[Dict]:
+        """Alerts fired by one update (not stored)"""
+        start = time.perf_counter()
+        events = []
+        candidates = 0
+        with self._lock:
+            self._load()
+            index = self._index
+            for symbol, fields in delta.items():
+                before = previous.get(symbol, {})
+                for field, value in fields.items():
+                    old = before.get(field)
+                    if old is None or value is None or old == value:
+                        continue
+                    for key in ((symbol, field), (ANY_SYMBOL, field)):
+                        bucket = index.get(key)
+                        if bucket is None:
+                            continue
+                        if field in CHANGE_FIELDS:
+                            fired = [rule_id for rule_id in bucket.changes
+                                     if self._matches(self._rules[rule_id], old, value)]
+                            candidates += len(bucket.changes)
+                        else:
+                            fired = bucket.crossed(old, value)
+                            candidates += len(fired)
+                        for rule_id in fired:
+                            events.append({
+                                'rule_id': rule_id,
+                                'symbol': symbol,
+                                'field': field,
+                                'previous': old,
+                                'value': value,
+                                'message': describe(self._rules[rule_id], symbol, old, value)
+                            })
+        self.updates += 1
+        self.candidates += candidates
+        self.fired += len(events)
+        self.eval_time_total += time.perf_counter() - start
+        return events
+
+    @staticmethod
+    def _matches(rule: Dict, old, value) -> bool:
+        return ((rule['from'] is None or rule['from'] == old) and
+                (rule['to'] is None or rule['to'] == value))
+
+    def _store(self, events: List[Dict]):
+        fired_at = datetime.now().isoformat()
+        conn = self.db.connection()
+        with conn:
+            for event in events:
+                cur = conn.execute("INSERT INTO alert_events VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)",
+                                   (event['rule_id'], event['symbol'], event['field'], event['previous'],
+                                    event['value'], event['message'], fired_at))
+                event['id'] = cur.lastrowid
+                event['fired_at'] = fired_at
+
+    def events(self, since: int = None, limit: int = 50) -> List[Dict]:
+        """Stored alerts newer than event id `since`, newest first"""
+        rows = self.db.connection().execute(
+            """SELECT id, rule_id, symbol, field, previous, value, message, fired_at
+               FROM alert_events WHERE id > ? ORDER BY id DESC LIMIT ?""", (since or 0, limit)).fetchall()
+        columns = ('id', 'rule_id', 'symbol', 'field', 'previous', 'value', 'message', 'fired_at')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rules = len(self._rules) if self._rules is not None else None
+            buckets = len(self._index)
+        with self._cond:
+            depth = len(self._pending)
+        return {
+            'rules': rules,
+            'buckets': buckets,
+            'depth': depth,
+            'updates': self.updates,
+            'candidates': self.candidates,
+            'fired': self.fired,
+            'errors': self.errors,
+            'avg_eval_us': self.eval_time_total / self.updates * 1e6 if self.updates else 0.0
+        }
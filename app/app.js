@@ -3,6 +3,8 @@
 const API_URL = 'http://localhost:5000/api';
 let currentSymbol = 'BTC';
 let marketData = {};
+let portfolioData = null;
+let livePrices = {};
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -11,14 +13,67 @@ document.addEventListener('DOMContentLoaded', () => {
     setupTradeForm();
     loadDashboard();
     
-    // Auto-refresh every 30 seconds
-    setInterval(() => {
-        if (document.querySelector('.tab-content.active').id === 'dashboard') {
-            loadDashboard();
-        }
-    }, 30000);
+    if (window.EventSource) {
+        connectStream();
+    } else {
+        // Auto-refresh every 30 seconds
+        setInterval(() => {
+            if (document.querySelector('.tab-content.active').id === 'dashboard') {
+                loadDashboard();
+            }
+        }, 30000);
+    }
 });
 
+// Live updates: the server pushes only changed prices/indicators
+function connectStream() {
+    const source = new EventSource(`${API_URL}/stream`);
+    
+    // Full state on (re)connect, then deltas
+    source.addEventListener('snapshot', event => applyStreamUpdate(JSON.parse(event.data)));
+    source.addEventListener('update', event => applyStreamUpdate(JSON.parse(event.data)));
+    // Alert rules fired on the server (see /api/alerts)
+    source.addEventListener('alert', event => {
+        JSON.parse(event.data).forEach(alert => showAlert('warning', `🔔 ${alert.message}`));
+    });
+}
+
+function applyStreamUpdate(delta) {
+    let pricesChanged = false;
+    
+    Object.entries(delta).forEach(([symbol, fields]) => {
+        if (fields.current_price !== undefined) {
+            livePrices[symbol] = fields.current_price;
+            pricesChanged = true;
+        }
+        if (marketData[symbol]) {
+            Object.assign(marketData[symbol], fields);
+        }
+    });
+    
+    if (pricesChanged && portfolioData) {
+        renderPortfolio(revaluePortfolio(portfolioData));
+    }
+    if (delta[currentSymbol] && marketData[currentSymbol]) {
+        renderMarketData(marketData[currentSymbol]);
+    }
+}
+
+// Recompute value and P&L of held assets at the latest streamed prices
+function revaluePortfolio(data) {
+    let totalValue = 0;
+    data.portfolio.forEach(item => {
+        if (item.asset !== 'USD' && livePrices[item.asset] !== undefined) {
+            item.current_price = livePrices[item.asset];
+            item.value = item.amount * item.current_price;
+            item.pnl = item.avg_price > 0 ? (item.current_price - item.avg_price) / item.avg_price * 100 : 0;
+        }
+        totalValue += item.value;
+    });
+    data.total_value = totalValue;
+    return data;
+}
+
 // Tab switching
 function setupTabs() {
     document.querySelectorAll('.tab').forEach(tab => {
@@ -79,14 +134,23 @@ function setupMarketButtons() {
 async function loadDashboard() {
     await loadPortfolio();
     await loadMarketData(currentSymbol);
+    await loadRisk();
 }
 
 // Load Portfolio
 async function loadPortfolio() {
     try {
         const response = await fetch(`${API_URL}/portfolio`);
-        const data = await response.json();
-        
+        portfolioData = await response.json();
+        renderPortfolio(portfolioData);
+    } catch (error) {
+        document.getElementById('portfolio-content').innerHTML = `
+            <div class="alert alert-error">⚠️ Errore caricamento portfolio</div>
+        `;
+    }
+}
+
+function renderPortfolio(data) {
         const portfolioHTML = data.portfolio.map(item => {
             if (item.asset === 'USD') {
                 return `
@@ -131,20 +195,76 @@ async function loadPortfolio() {
                 <span class="pnl ${totalPnlClass}">(${totalPnlSign}${totalPnl.toFixed(2)}%)</span>
             </div>
         `;
+}
+
+// Load Portfolio Risk (cached server-side per holdings and day)
+async function loadRisk() {
+    try {
+        const response = await fetch(`${API_URL}/risk`);
+        renderRisk(await response.json());
     } catch (error) {
-        document.getElementById('portfolio-content').innerHTML = `
-            <div class="alert alert-error">⚠️ Errore caricamento portfolio</div>
+        document.getElementById('risk-content').innerHTML = `
+            <div class="alert alert-error">⚠️ Errore caricamento rischio</div>
         `;
     }
 }
 
+function renderRisk(data) {
+    if (data.var.length === 0) {
+        document.getElementById('risk-content').innerHTML = `
+            <div class="alert alert-warning">Nessuna posizione aperta</div>
+        `;
+        return;
+    }
+    
+    const varCards = data.var.map(row => `
+        <div class="stat-card">
+            <div class="stat-label">VaR ${(row.confidence * 100).toFixed(0)}% (1g)</div>
+            <div class="stat-value negative">-$${row.historical_var_usd.toFixed(2)}</div>
+            <div class="asset-amount">CVaR -$${row.historical_cvar_usd.toFixed(2)} · parametrico -$${row.parametric_var_usd.toFixed(2)}</div>
+        </div>
+    `).join('');
+    
+    const assets = data.correlation.assets;
+    const correlationRows = assets.map((asset, i) => `
+        <tr>
+            <td>${asset}</td>
+            ${data.correlation.matrix[i].map(value => `<td>${value.toFixed(2)}</td>`).join('')}
+        </tr>
+    `).join('');
+    
+    document.getElementById('risk-content').innerHTML = `
+        <div class="stats-grid">
+            ${varCards}
+            <div class="stat-card">
+                <div class="stat-label">Volatilità annua (${data.window_days}g)</div>
+                <div class="stat-value">${(data.volatility.portfolio * 100).toFixed(1)}%</div>
+            </div>
+        </div>
+        <table class="trade-table">
+            <thead>
+                <tr><th>Correlazione</th>${assets.map(asset => `<th>${asset}</th>`).join('')}</tr>
+            </thead>
+            <tbody>${correlationRows}</tbody>
+        </table>
+    `;
+}
+
 // Load Market Data
 async function loadMarketData(symbol) {
     try {
         const response = await fetch(`${API_URL}/market/${symbol}`);
         const data = await response.json();
         marketData[symbol] = data;
-        
+        renderMarketData(data);
+    } catch (error) {
+        document.getElementById('market-content').innerHTML = `
+            <div class="alert alert-error">⚠️ Errore caricamento dati</div>
+        `;
+    }
+}
+
+function renderMarketData(data) {
         const priceChange = data.price_history && data.price_history.length > 1 
             ? ((data.current_price - data.price_history[0].price) / data.price_history[0].price * 100)
             : 0;
@@ -166,12 +286,11 @@ async function loadMarketData(symbol) {
         
         // Update recommendation
         updateRecommendation(data);
-        
-    } catch (error) {
-        document.getElementById('market-content').innerHTML = `
-            <div class="alert alert-error">⚠️ Errore caricamento dati</div>
-        `;
-    }
+}
+
+// Indicator value, or n/d when undefined (null on flat or short series)
+function formatIndicator(value, digits) {
+    return value === null || value === undefined ? 'n/d' : value.toFixed(digits);
 }
 
 // Update EAR Indicators
@@ -194,7 +313,7 @@ function updateEARIndicators(data) {
         <div class="indicator">
             <div class="indicator-label">
                 <span>EPI (Hurst Exponent)</span>
-                <span class="indicator-value">${data.epi.toFixed(3)}</span>
+                <span class="indicator-value">${formatIndicator(data.epi, 3)}</span>
             </div>
             <div class="indicator-bar">
                 <div class="indicator-fill" style="width: ${epiPercent}%">
@@ -207,7 +326,7 @@ function updateEARIndicators(data) {
         <div class="indicator">
             <div class="indicator-label">
                 <span>ECI (Criticality Index)</span>
-                <span class="indicator-value">${data.eci.toFixed(3)}</span>
+                <span class="indicator-value">${formatIndicator(data.eci, 3)}</span>
             </div>
             <div class="indicator-bar">
                 <div class="indicator-fill" style="width: ${eciPercent}%">
@@ -220,7 +339,7 @@ function updateEARIndicators(data) {
         <div class="indicator">
             <div class="indicator-label">
                 <span>ETB (Topology Balance)</span>
-                <span class="indicator-value">${data.etb.toFixed(3)}</span>
+                <span class="indicator-value">${formatIndicator(data.etb, 3)}</span>
             </div>
             <div class="indicator-bar">
                 <div class="indicator-fill" style="width: ${etbPercent}%">
@@ -346,29 +465,29 @@ function updateTradeAssistant(symbol) {
     
     // Check EPI
     if (data.epi > 0.7) {
-        checks.push('✓ EPI=' + data.epi.toFixed(2) + ' conferma trend');
+        checks.push('✓ EPI=' + formatIndicator(data.epi, 2) + ' conferma trend');
     } else if (data.epi < 0.55) {
-        warnings.push('⚠ EPI=' + data.epi.toFixed(2) + ' (ranging, no trend)');
+        warnings.push('⚠ EPI=' + formatIndicator(data.epi, 2) + ' (ranging, no trend)');
     } else {
-        checks.push('○ EPI=' + data.epi.toFixed(2) + ' (moderato)');
+        checks.push('○ EPI=' + formatIndicator(data.epi, 2) + ' (moderato)');
     }
     
     // Check ECI
     if (data.eci < 0.6) {
-        checks.push('✓ ECI=' + data.eci.toFixed(2) + ' lontano da soglia');
+        checks.push('✓ ECI=' + formatIndicator(data.eci, 2) + ' lontano da soglia');
     } else if (data.eci > 0.75) {
-        warnings.push('⚠ ECI=' + data.eci.toFixed(2) + ' (soglia imminente)');
+        warnings.push('⚠ ECI=' + formatIndicator(data.eci, 2) + ' (soglia imminente)');
     } else {
-        warnings.push('○ ECI=' + data.eci.toFixed(2) + ' (attenzione)');
+        warnings.push('○ ECI=' + formatIndicator(data.eci, 2) + ' (attenzione)');
     }
     
     // Check ETB
     if (data.etb > 0.6) {
-        checks.push('✓ ETB=' + data.etb.toFixed(2) + ' struttura sana');
+        checks.push('✓ ETB=' + formatIndicator(data.etb, 2) + ' struttura sana');
     } else if (data.etb < 0.4) {
-        warnings.push('⚠ ETB=' + data.etb.toFixed(2) + ' (struttura degradata)');
+        warnings.push('⚠ ETB=' + formatIndicator(data.etb, 2) + ' (struttura degradata)');
     } else {
-        checks.push('○ ETB=' + data.etb.toFixed(2) + ' (moderato)');
+        checks.push('○ ETB=' + formatIndicator(data.etb, 2) + ' (moderato)');
     }
     
     const allItems = [...checks, ...warnings];
@@ -470,7 +589,7 @@ ${epiTrend}
             <div class="stats-grid">
                 <div class="stat-card">
                     <div class="stat-label">Corrente</div>
-                    <div class="stat-value">${data.eci.toFixed(3)}</div>
+                    <div class="stat-value">${formatIndicator(data.eci, 3)}</div>
                 </div>
                 <div class="stat-card">
                     <div class="stat-label">Soglia</div>
@@ -479,7 +598,7 @@ ${epiTrend}
                 <div class="stat-card">
                     <div class="stat-label">Distanza</div>
                     <div class="stat-value ${data.eci < 0.6 ? 'positive' : 'negative'}">
-                        ${(0.8 - data.eci).toFixed(3)}
+                        ${data.eci === null ? 'n/d' : (0.8 - data.eci).toFixed(3)}
                     </div>
                 </div>
             </div>
@@ -628,7 +747,7 @@ async function loadHistory() {
                                     <td>$${trade.entry_price.toFixed(2)}</td>
                                     <td>$${trade.exit_price.toFixed(2)}</td>
                                     <td class="pnl ${pnlClass}">${pnlSign}${trade.pnl_percent.toFixed(2)}%</td>
-                                    <td>${trade.regime}</td>
+                                    <td>${trade.regime || '…'}</td>
                                 </tr>
                             `;
                         }).join('')}
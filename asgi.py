@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+EAR Trader Simulator - Async (ASGI) server
+Serves the upstream-bound endpoints without blocking on CoinGecko; every
+other route is the Flask app mounted as-is
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+import numpy as np
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import main
+from main import DataFetcher
+from metrics import metrics
+from stream import AsyncSubscription
+
+
+class AsyncDataFetcher:
+    """
+    Non-blocking counterpart of DataFetcher on one pooled httpx.AsyncClient.
+
+    Shares DataFetcher's caches and price store, so both servers see the same
+    spot prices and history. Concurrent misses on a spot price or a history
+    sync await the one request already in flight instead of issuing another.
+    Local sources (replay, synthetic) are called on the thread pool instead.
+    """
+
+    def __init__(self, max_connections: int = 100):
+        self.max_connections = max_connections
+        self.client = None
+        self._prices: Dict[str, asyncio.Future] = {}  # symbol -> in-flight bulk fetch
+        self._syncs: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    async def start(self):
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_connections)
+        self.client = httpx.AsyncClient(limits=limits, timeout=10)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get_current_price(self, symbol: str) -> float:
+        return (await self.get_current_prices([symbol]))[symbol.upper()]
+
+    async def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Same contract as DataFetcher.get_current_prices"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        prices = {}
+        pending = {}
+        missing = []
+        for symbol in symbols:
+            price = DataFetcher.price_cache.get(symbol)
+            if price is not None:
+                prices[symbol] = price
+            elif symbol in self._prices:
+                pending[symbol] = self._prices[symbol]
+            else:
+                missing.append(symbol)
+
+        if missing:
+            # One bulk request for everything not cached or already in flight
+            fetch = asyncio.ensure_future(self._fetch_prices(missing))
+            for symbol in missing:
+                self._prices[symbol] = fetch
+                pending[symbol] = fetch
+            fetch.add_done_callback(lambda _: [self._prices.pop(s, None) for s in missing])
+
+        for symbol, fetch in pending.items():
+            prices[symbol] = (await asyncio.shield(fetch))[symbol]
+        return {symbol: prices[symbol] for symbol in symbols}
+
+    async def _fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        source = DataFetcher.source
+        try:
+            if source.remote:
+                url, params, coin_ids = source.price_request(symbols)
+                with metrics.timer('upstream', 'simple_price'):
+                    response = await self.client.get(url, params=params, timeout=5)
+                fetched = source.parse_prices(response.json(), coin_ids)
+            else:
+                fetched = await run_blocking(DataFetcher._fetch_current_prices, symbols)
+        except Exception:
+            fetched = {}
+        return DataFetcher._cache_prices(symbols, fetched)
+
+    async def get_price_history(self, symbol: str, days: int = 365) -> Tuple[np.ndarray, np.ndarray]:
+        """Same contract as DataFetcher.get_price_history"""
+        symbol = symbol.upper()
+        key = (symbol, days)
+        if DataFetcher.history_cache.get(key) is None:
+            sync = self._syncs.get(key)
+            if sync is None:
+                sync = asyncio.ensure_future(self._sync_history(symbol, days))
+                self._syncs[key] = sync
+                sync.add_done_callback(lambda _: self._syncs.pop(key, None))
+            try:
+                await asyncio.shield(sync)
+            except Exception as e:
+                print(f"Error fetching data: {e}")
+        return DataFetcher._stored_history(symbol, days)
+
+    async def _sync_history(self, symbol: str, days: int):
+        source = DataFetcher.source
+        if not source.remote:
+            await run_blocking(DataFetcher._sync_history, symbol, days)
+            DataFetcher.history_cache.put((symbol, days), True)
+            return
+        # Store reads/writes touch SQLite, so they run on the thread pool
+        fetch_days = await run_blocking(DataFetcher._missing_days, symbol, days)
+        url, params = source.market_chart_request(symbol, fetch_days)
+        with metrics.timer('upstream', 'market_chart'):
+            response = await self.client.get(url, params=params)
+        timestamps, prices = source.parse_market_chart(response.json())
+        await run_blocking(DataFetcher._store_history, symbol, timestamps, prices, fetch_days)
+        DataFetcher.history_cache.put((symbol, days), True)
+
+
+async def run_blocking(func, *args):
+    """Run a blocking call (SQLite, indicator math) off the event loop"""
+    # to_thread carries the context over, so the call lands in the request's profile
+    return await asyncio.to_thread(func, *args)
+
+
+def instrumented(endpoint: str, handler):
+    """Request metrics and the opt-in Server-Timing breakdown, as the Flask hooks record them"""
+    @functools.wraps(handler)
+    async def wrapper(request):
+        if not metrics.enabled:
+            return await handler(request)
+        start = time.perf_counter()
+        token = metrics.start_profile() if request.headers.get(main.PROFILE_HEADER) else None
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status_code
+            if token is not None:
+                response.headers['Server-Timing'] = metrics.profile().server_timing()
+            return response
+        finally:
+            if token is not None:
+                metrics.stop_profile(token)
+            metrics.observe('ear_http_request_seconds', (request.method, endpoint, str(status)),
+                            time.perf_counter() - start)
+    return wrapper
+
+
+def json_response(payload: Dict, status_code: int = 200) -> Response:
+    # Flask's encoder and compact separators, so the body is byte-identical to jsonify()
+    body = main.app.json.dumps(payload, separators=(',', ':')) + '\n'
+    return Response(body, status_code=status_code, media_type='application/json')
+
+
+fetcher = AsyncDataFetcher()
+
+
+async def get_portfolio(request):
+    """Get current portfolio state"""
+    rows = main.portfolio_rows()
+    prices = await fetcher.get_current_prices(main.held_assets(rows))
+    return json_response(main.portfolio_payload(rows, prices))
+
+
+async def get_market_data(request):
+    """Get current market data and EAR analysis for symbol"""
+    symbol = request.path_params['symbol']
+    resolution = request.query_params.get('resolution', '1d')
+    if resolution == '1d':
+        history = fetcher.get_price_history(symbol, days=main.HISTORY_BARS)
+    else:
+        # Intraday bars are local (bars.py): no upstream call, only SQLite on first use
+        history = run_blocking(DataFetcher.get_bar_history, symbol, resolution)
+    try:
+        current_price, (timestamps, prices) = await asyncio.gather(fetcher.get_current_price(symbol), history)
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    if len(prices) == 0:
+        return json_response({'error': f'No {resolution} bars for {symbol}'}, 404)
+    indicators = await run_blocking(main.market_indicators, symbol, resolution, timestamps, prices)
+    return json_response(main.market_payload(symbol, current_price, timestamps, prices,
+                                             indicators, resolution))
+
+
+async def scan_market(request):
+    """EAR analysis of many symbols, fetched concurrently and computed on the pool"""
+    try:
+        symbols = main.scan_symbols(request.query_params.get('symbols'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    prices, *histories = await asyncio.gather(
+        fetcher.get_current_prices(symbols),
+        *(fetcher.get_price_history(symbol, days=365) for symbol in symbols))
+    indicators = await run_blocking(main.compute_pool.analyze_many, [h[1] for h in histories])
+    return json_response(main.scan_payload(symbols, prices, indicators))
+
+
+async def get_risk(request):
+    """Portfolio risk, with the held assets' histories synced concurrently"""
+    try:
+        window = main.risk_window(request.query_params.get('window'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+    holdings = {asset: amount for asset, amount, _ in main.portfolio_rows() if asset != 'USD'}
+    histories = await asyncio.gather(*(fetcher.get_price_history(asset, days=window + 1)
+                                       for asset in holdings))
+    return json_response(await run_blocking(main.risk_engine.report, holdings,
+                                            dict(zip(holdings, histories)), window))
+
+
+async def stream_market(request):
+    """Server-Sent Events from the shared market stream, without holding a thread per client"""
+    subscription = main.market_stream.subscribe(AsyncSubscription(asyncio.get_running_loop()))
+
+    async def events():
+        try:
+            while True:
+                message = await subscription.get(timeout=main.market_stream.keepalive)
+                if message is None:
+                    break
+                yield message
+        finally:
+            main.market_stream.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def lifespan(app):
+    await run_blocking(main.init_db)
+    await run_blocking(main.tagging_worker.recover)
+    await run_blocking(main.compute_pool.start)
+    main.warmup.start()
+    main.scanner.start()
+    main.mark_to_market.start()
+    main.market_stream.start()
+    await fetcher.start()
+    yield
+    await fetcher.close()
+    await run_blocking(main.position_book.flush)
+    main.compute_pool.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/portfolio', instrumented('/api/portfolio', get_portfolio), methods=['GET']),
+        Route('/api/market/scan', instrumented('/api/market/scan', scan_market), methods=['GET']),
+        Route('/api/risk', instrumented('/api/risk', get_risk), methods=['GET']),
+        Route('/api/stream', instrumented('/api/stream', stream_market), methods=['GET']),
+        Route('/api/market/{symbol}', instrumented('/api/market/<symbol>', get_market_data),
+              methods=['GET']),
+        Mount('/', app=WSGIMiddleware(main.app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                           allow_headers=['*'], expose_headers=['Server-Timing'])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Run the EAR Trader backend on uvicorn')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("🚀 EAR Trader Simulator Backend Starting (ASGI)...")
+    print(f"📊 Access at: http://localhost:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
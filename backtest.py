@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+EAR Trader Simulator - Vectorized backtesting
+Replays EAREngine regimes and recommendations over a price history
+
+Indicators for every rolling window are computed in batched NumPy form
+(the same windows as /api/market: EPI/ETB on the last 100 points, ECI on
+the whole lookback), then the regime/recommendation state machine is run
+over the precomputed arrays.
+
+    python backtest.py BTC ETH SOL --days 1825
+    python backtest.py BTC --sweep exit_eci=0.7,0.8,0.9 --sweep entry_eci=0.5,0.6 --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from ear_engine import DEFAULT_THRESHOLDS, EARLY, REGIMES, SPIRAL, EAREngine, classify_regimes
+
+PERIODS_PER_YEAR = 365  # Daily crypto bars
+
+_window_view = np.lib.stride_tricks.sliding_window_view
+
+
+def rolling_hurst(prices: np.ndarray, window: int = 100, max_lag: int = 20) -> np.ndarray:
+    """
+    EAREngine.calculate_hurst_exponent for every window of `window` prices.
+
+    Overlapping windows share their R/S chunks, so each lag's chunk
+    statistics are computed once per chunk start across the whole series
+    and then gathered per window, instead of once per window.
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_windows = len(prices) - window + 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(prices) / prices[:-1]
+    n_returns = window - 1
+
+    lags = np.arange(2, min(max_lag, window // 2))
+    log_rs = np.empty((n_windows, len(lags)))
+    starts = np.arange(n_windows)[:, None]
+    for j, lag in enumerate(lags):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chunks = _window_view(returns, lag)
+            dev = chunks - chunks.mean(axis=1, keepdims=True)
+            Y = np.cumsum(dev, axis=1)
+            R = Y.max(axis=1) - Y.min(axis=1)
+            S = np.sqrt((dev * dev).sum(axis=1) / lag)
+            rs = np.where((R > 0) & (S > 0), R / S, np.nan)
+
+            # Non-overlapping chunks of each window start at window + k * lag
+            gathered = rs[starts + lag * np.arange(n_returns // lag)]
+            valid = ~np.isnan(gathered)
+            log_rs[:, j] = np.log(np.where(valid, gathered, 0.0).sum(axis=1) / valid.sum(axis=1))
+
+    return EAREngine.fit_hurst(log_rs, lags, _window_view(returns, n_returns))
+
+
+def rolling_etb(prices: np.ndarray, window: int = 100, lag: int = 20) -> np.ndarray:
+    """EAREngine.calculate_etb for every window of `window` prices"""
+    prices = np.asarray(prices, dtype=float)
+    windows = _window_view(prices, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = _window_view(np.diff(prices) / prices[:-1], window - 1)
+
+        # Tree score: trend consistency
+        std = returns.std(axis=1)
+        trend_consistency = np.where(std != 0, np.abs(returns.mean(axis=1) / std), 0)
+        tree_score = np.minimum(trend_consistency * 0.3, 0.5)
+
+        # Lattice score: mean reversion strength
+        mean_price = windows.mean(axis=1, keepdims=True)
+        mean_reversion = 1 - (np.abs(windows - mean_price) / mean_price).mean(axis=1)
+        lattice_score = np.maximum(mean_reversion * 0.5, 0.2)
+
+        # Loop score: lag autocorrelation
+        if window >= 100:
+            x = windows[:, :-lag] - windows[:, :-lag].mean(axis=1, keepdims=True)
+            y = windows[:, lag:] - windows[:, lag:].mean(axis=1, keepdims=True)
+            autocorr = (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+            loop_score = np.abs(np.clip(autocorr, -1, 1)) * 0.3
+        else:
+            loop_score = np.full(len(windows), 0.2)
+
+    return EAREngine.combine_etb(tree_score, lattice_score, loop_score)
+
+
+def rolling_eci(prices: np.ndarray, lookback: int = 365) -> np.ndarray:
+    """EAREngine.calculate_eci for every window of `lookback` prices"""
+    prices = np.asarray(prices, dtype=float)
+    n_windows = len(prices) - lookback + 1
+
+    # Component 1: Volatility compression
+    short_vol = _window_view(prices, 30).std(axis=1)[-n_windows:]
+    long_vol = _window_view(prices, min(lookback, 365)).std(axis=1)[-n_windows:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_compression = np.where(long_vol != 0, short_vol / long_vol, 1.0)
+
+    # Component 2: Correlation instability over each lookback's rolling correlations
+    corrs = EAREngine.rolling_corrs(prices)
+    corr_instability = _window_view(corrs, lookback - 40).std(axis=1)[:n_windows]
+
+    # Component 3: Price momentum divergence
+    end = prices[lookback - 1:]
+    short_momentum = (end - prices[lookback - 10:len(prices) - 9]) / prices[lookback - 10:len(prices) - 9]
+    long_momentum = (end - prices[lookback - 50:len(prices) - 49]) / prices[lookback - 50:len(prices) - 49]
+    momentum_div = np.abs(short_momentum - long_momentum)
+
+    return EAREngine.combine_eci(vol_compression, corr_instability, momentum_div)
+
+
+def rolling_indicators(prices: np.ndarray, lookback: int = 365, window: int = 100) -> Dict[str, np.ndarray]:
+    """
+    EPI, ECI and ETB for each bar, as /api/market would compute them with
+    the last `lookback` prices. Bars before the first full lookback are NaN.
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    if lookback < max(window, 100):
+        raise ValueError(f'lookback must be at least {max(window, 100)}')
+    if len(prices) < lookback:
+        raise ValueError(f'need at least {lookback} prices, got {len(prices)}')
+
+    offset = lookback - window  # First EPI/ETB window inside the first lookback
+    result = {}
+    for name, values in (('epi', rolling_hurst(prices, window)[offset:]),
+                         ('eci', rolling_eci(prices, lookback)),
+                         ('etb', rolling_etb(prices, window)[offset:])):
+        full = np.full(len(prices), np.nan)
+        full[lookback - 1:] = values
+        result[name] = full
+    return result
+
+
+def simulate(prices: np.ndarray, indicators: Dict[str, np.ndarray], thresholds: Dict = None,
+             cost_bps: float = 10.0) -> Dict:
+    """
+    Run the get_recommendation state machine over precomputed indicators.
+
+    Flat: ENTER_LONG opens a full position. Long: EXIT closes it, REDUCE_50%
+    halves it, HOLD keeps it. Decisions at bar t's close earn bar t+1's
+    return; cost_bps is charged on every change of exposure.
+    """
+    th = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    prices = np.asarray(prices, dtype=float)
+    epi, eci, etb = indicators['epi'], indicators['eci'], indicators['etb']
+    ready = ~(np.isnan(epi) | np.isnan(eci) | np.isnan(etb))
+
+    regimes = classify_regimes(epi, eci, etb, th)
+    with np.errstate(invalid='ignore'):
+        enter = (ready & np.isin(regimes, [SPIRAL, EARLY])
+                 & (eci < th['entry_eci']) & (etb > th['entry_etb'])).tolist()
+        leave = (ready & ((epi > th['exit_epi']) | (eci > th['exit_eci']))).tolist()
+        reduce = (ready & (etb < th['reduce_etb'])).tolist()
+
+    # The state machine is inherently sequential, but only branches on
+    # precomputed booleans
+    position = np.zeros(len(prices))
+    trades = []
+    size = 0.0
+    entry = None
+    for t in range(len(prices)):
+        if size == 0.0:
+            if enter[t]:
+                size = 1.0
+                entry = t
+        elif leave[t]:
+            trades.append((entry, t))
+            size = 0.0
+        elif reduce[t]:
+            size *= 0.5
+        position[t] = size
+    if size:
+        trades.append((entry, len(prices) - 1))
+
+    returns = np.zeros(len(prices))
+    returns[1:] = np.diff(prices) / prices[:-1]
+    held = np.concatenate(([0.0], position[:-1]))
+    turnover = np.abs(np.diff(np.concatenate(([0.0], position))))
+    strategy = held * returns - turnover * cost_bps / 10000
+    equity = np.cumprod(1 + strategy)
+
+    trade_list = [{
+        'entry_index': int(i),
+        'exit_index': int(j),
+        'entry_price': float(prices[i]),
+        'exit_price': float(prices[j]),
+        'pnl_percent': float((prices[j] - prices[i]) / prices[i] * 100),
+        'bars': int(j - i),
+        'open': bool(size) and k == len(trades) - 1
+    } for k, (i, j) in enumerate(trades)]
+
+    return {
+        'equity_curve': equity,
+        'position': position,
+        'regimes': regimes,
+        'trades': trade_list,
+        'statistics': statistics(equity, strategy, position, trade_list, prices, ready)
+    }
+
+
+def statistics(equity: np.ndarray, strategy: np.ndarray, position: np.ndarray,
+               trades: List[Dict], prices: np.ndarray, ready: np.ndarray) -> Dict:
+    """Performance summary of a simulated equity curve"""
+    active = np.flatnonzero(ready)
+    start = active[0] if len(active) else len(prices) - 1
+    rets = strategy[start + 1:]
+    years = max(len(rets), 1) / PERIODS_PER_YEAR
+    total_return = equity[-1] / equity[start] - 1
+    drawdown = equity[start:] / np.maximum.accumulate(equity[start:]) - 1
+    std = rets.std() if len(rets) > 1 else 0.0
+    pnls = [t['pnl_percent'] for t in trades]
+
+    return {
+        'bars': int(len(rets)),
+        'total_return': float(total_return * 100),
+        'annual_return': float(((1 + total_return) ** (1 / years) - 1) * 100) if total_return > -1 else -100.0,
+        'annual_volatility': float(std * np.sqrt(PERIODS_PER_YEAR) * 100),
+        'sharpe_ratio': float(rets.mean() / std * np.sqrt(PERIODS_PER_YEAR)) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown.min() * 100) if len(drawdown) else 0.0,
+        'exposure': float((position[start:] > 0).mean() * 100),
+        'total_trades': len(trades),
+        'win_rate': float(np.mean([p > 0 for p in pnls]) * 100) if pnls else 0.0,
+        'avg_trade': float(np.mean(pnls)) if pnls else 0.0,
+        'buy_and_hold_return': float((prices[-1] / prices[start] - 1) * 100)
+    }
+
+
+def run_backtest(prices: np.ndarray, thresholds: Dict = None, lookback: int = 365,
+                 cost_bps: float = 10.0) -> Dict:
+    """Indicators, state machine and statistics for one price series"""
+    prices = np.ascontiguousarray(prices, dtype=float)
+    indicators = rolling_indicators(prices, lookback)
+    result = simulate(prices, indicators, thresholds, cost_bps)
+    result.update(indicators)
+    return result
+
+
+def _sweep_chunk(series: Dict[str, tuple], param_sets: List[Dict], cost_bps: float) -> List[Dict]:
+    """Evaluate a slice of the parameter grid (runs inside a worker process)"""
+    results = []
+    for params in param_sets:
+        per_symbol = {symbol: simulate(prices, indicators, params, cost_bps)['statistics']
+                      for symbol, (prices, indicators) in series.items()}
+        sharpes = [s['sharpe_ratio'] for s in per_symbol.values()]
+        results.append({
+            'thresholds': params,
+            'mean_sharpe': float(np.mean(sharpes)),
+            'mean_return': float(np.mean([s['total_return'] for s in per_symbol.values()])),
+            'symbols': per_symbol
+        })
+    return results
+
+
+def sweep(prices_by_symbol: Dict[str, np.ndarray], grid: Dict[str, List[float]],
+          lookback: int = 365, cost_bps: float = 10.0, workers: int = 0) -> List[Dict]:
+    """
+    Grid search over regime/recommendation thresholds.
+
+    Indicators are computed once per symbol; only the state machine is
+    re-run per parameter set. workers > 0 spreads the grid over a process
+    pool, each task receiving the indicator arrays once for its chunk.
+    Results are sorted by mean Sharpe ratio across symbols.
+    """
+    unknown = set(grid) - set(DEFAULT_THRESHOLDS)
+    if unknown:
+        raise ValueError(f"Unknown thresholds: {', '.join(sorted(unknown))}")
+
+    series = {}
+    for symbol, prices in prices_by_symbol.items():
+        prices = np.ascontiguousarray(prices, dtype=float)
+        series[symbol] = (prices, rolling_indicators(prices, lookback))
+
+    keys = list(grid)
+    param_sets = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+    if workers and len(param_sets) > 1:
+        n_chunks = min(len(param_sets), workers * 4)
+        chunks = [param_sets[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_sweep_chunk, series, chunk, cost_bps) for chunk in chunks]
+            results = [r for f in futures for r in f.result()]
+    else:
+        results = _sweep_chunk(series, param_sets, cost_bps)
+
+    return sorted(results, key=lambda r: r['mean_sharpe'], reverse=True)
+
+
+def summarize(result: Dict, include_curve: bool = True) -> Dict:
+    """JSON-ready view of a run_backtest result"""
+    summary = {
+        'statistics': result['statistics'],
+        'trades': result['trades']
+    }
+    if include_curve:
+        summary['equity_curve'] = [round(float(v), 6) for v in result['equity_curve']]
+        summary['regimes'] = [REGIMES[r] for r in result['regimes']]
+    return summary
+
+
+def _parse_grid(specs: List[str]) -> Dict[str, List[float]]:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        grid[name.strip()] = [float(v) for v in values.split(',') if v.strip()]
+    return grid
+
+
+def _load_prices(args) -> Dict[str, np.ndarray]:
+    if args.csv:
+        data = np.genfromtxt(args.csv, delimiter=',', names=True)
+        column = 'price' if 'price' in data.dtype.names else data.dtype.names[-1]
+        name = os.path.splitext(os.path.basename(args.csv))[0].upper()
+        return {name: np.asarray(data[column], dtype=float)}
+
+    # Local price store, synced from CoinGecko when stale
+    from main import DataFetcher, init_db
+    init_db()
+    return {symbol.upper(): DataFetcher.get_price_history(symbol, args.days)[1]
+            for symbol in args.symbols}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest EAR regimes over price history')
+    parser.add_argument('symbols', nargs='*', default=['BTC', 'ETH', 'SOL'])
+    parser.add_argument('--days', type=int, default=1825, help='history length per symbol')
+    parser.add_argument('--csv', help='load prices from a CSV file (price column) instead')
+    parser.add_argument('--lookback', type=int, default=365)
+    parser.add_argument('--cost-bps', type=float, default=10.0)
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help='threshold grid to search (repeatable)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='process pool size for sweeps (0 = in-process)')
+    parser.add_argument('--top', type=int, default=10, help='sweep results to print')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    prices_by_symbol = _load_prices(args)
+
+    start = time.perf_counter()
+    if args.sweep:
+        results = sweep(prices_by_symbol, _parse_grid(args.sweep), args.lookback,
+                        args.cost_bps, args.workers)
+        elapsed = time.perf_counter() - start
+        if args.json:
+            print(json.dumps(results[:args.top], indent=2, ensure_ascii=False))
+            return
+        print(f"{len(results)} parameter sets x {len(prices_by_symbol)} symbols in {elapsed:.3f}s")
+        for r in results[:args.top]:
+            params = ', '.join(f'{k}={v}' for k, v in r['thresholds'].items())
+            print(f"  sharpe={r['mean_sharpe']:6.2f}  return={r['mean_return']:8.2f}%  {params}")
+        return
+
+    results = {symbol: run_backtest(prices, lookback=args.lookback, cost_bps=args.cost_bps)
+               for symbol, prices in prices_by_symbol.items()}
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps({s: summarize(r, include_curve=False) for s, r in results.items()},
+                         indent=2, ensure_ascii=False))
+        return
+
+    print(f"Backtested {len(results)} symbols in {elapsed:.3f}s")
+    for symbol, result in results.items():
+        s = result['statistics']
+        print(f"  {symbol:>5}: return={s['total_return']:8.2f}%  (buy&hold {s['buy_and_hold_return']:8.2f}%)  "
+              f"sharpe={s['sharpe_ratio']:5.2f}  maxDD={s['max_drawdown']:7.2f}%  "
+              f"trades={s['total_trades']:3d}  win={s['win_rate']:5.1f}%  exposure={s['exposure']:5.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+EAR Trader Simulator - Intraday OHLC bars
+Minute-level or tick data folded into persistent 1m/5m/1h/1d OHLC pyramids,
+ingested in fixed-size chunks so memory stays bounded however long the feed
+
+    python bars.py BTC ticks.csv                 # columns: timestamp (ms), price
+    python bars.py BTC ticks.csv --chunk-size 500000
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from db import Database
+
+# Bar length in ms per resolution, finest first; each divides the next
+RESOLUTIONS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000
+}
+
+OHLC_BARS_SCHEMA = '''CREATE TABLE IF NOT EXISTS ohlc_bars
+            (symbol TEXT NOT NULL,
+             resolution TEXT NOT NULL,
+             timestamp INTEGER NOT NULL,
+             open REAL NOT NULL,
+             high REAL NOT NULL,
+             low REAL NOT NULL,
+             close REAL NOT NULL,
+             PRIMARY KEY (symbol, resolution, timestamp)) WITHOUT ROWID'''
+
+# (timestamps, open, high, low, close)
+Bars = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def aggregate(bars: Bars, step_ms: int) -> Bars:
+    """
+    Coarser bars from time-sorted finer bars (or ticks, with open = high =
+    low = close = price). Bars are stamped with their start time; empty
+    intervals produce no bar.
+    """
+    timestamps, open_, high, low, close = bars
+    buckets = timestamps // step_ms * step_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    return (buckets[starts], open_[starts], np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts), close[ends])
+
+
+class _Level:
+    """Append-only OHLC columns of one (symbol, resolution) with O(1) amortized growth"""
+
+    def __init__(self, bars: Bars):
+        n = len(bars[0])
+        capacity = max(2 * n, 512)
+        self.columns = [np.empty(capacity, dtype=np.int64)] + [np.empty(capacity) for _ in range(4)]
+        for column, values in zip(self.columns, bars):
+            column[:n] = values
+        self.n = n
+        self.shared = False  # A view of the columns has been handed out
+
+    def merge(self, bars: Bars) -> int:
+        """
+        Fold newer bars in; a bar with the same start as the last one extends
+        it (open kept, high/low widened, close replaced). Returns the index of
+        the first bar that changed.
+        """
+        timestamps, open_, high, low, close = bars
+        first = self.n
+        if self.n and timestamps[0] == self.columns[0][self.n - 1]:
+            last = self.n - 1
+            if self.shared:
+                # On copies: views handed out by view() must never change under their readers
+                self.columns[2:] = [column.copy() for column in self.columns[2:]]
+                self.shared = False
+            self.columns[2][last] = max(self.columns[2][last], high[0])
+            self.columns[3][last] = min(self.columns[3][last], low[0])
+            self.columns[4][last] = close[0]
+            bars = tuple(values[1:] for values in bars)
+            first = last
+
+        needed = self.n + len(bars[0])
+        if needed > len(self.columns[0]):
+            self.columns = [np.resize(column[:self.n], 2 * needed) for column in self.columns]
+            self.shared = False
+        for column, values in zip(self.columns, bars):
+            column[self.n:needed] = values
+        self.n = needed
+        return first
+
+    def view(self, start: int = 0) -> Bars:
+        """Bars from `start` on, for readers outside the store lock"""
+        self.shared = True
+        return self.tail(start)
+
+    def tail(self, start: int = 0) -> Bars:
+        """Bars from `start` on, for use under the store lock only"""
+        return tuple(column[start:self.n] for column in self.columns)
+
+
+class BarStore:
+    """
+    OHLC bars per symbol at every resolution in RESOLUTIONS, built once on
+    ingest and kept in SQLite (mirrored in memory like PriceStore).
+
+    ingest() takes raw ticks in chunks of chunk_size: each chunk becomes 1m
+    bars, and every coarser level is rebuilt only from the finer bars the
+    chunk touched, so the raw feed is never held in memory or re-read.
+    Ticks must arrive in time order (ties and ticks within the current
+    last minute are fine). Arrays returned by get() are views that ingest
+    never changes: a bar extended in place is written to copied columns.
+    """
+
+    def __init__(self, db: Database, chunk_size: int = 1000000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self._levels: Dict[Tuple[str, str], _Level] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol: str, resolution: str) -> _Level:
+        level = self._levels.get((symbol, resolution))
+        if level is None:
+            rows = self.db.connection().execute(
+                """SELECT timestamp, open, high, low, close FROM ohlc_bars
+                   WHERE symbol=? AND resolution=? ORDER BY timestamp""", (symbol, resolution)).fetchall()
+            data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+            level = _Level((data[:, 0].astype(np.int64),) + tuple(data[:, i] for i in range(1, 5)))
+            self._levels[(symbol, resolution)] = level
+        return level
+
+    def get(self, symbol: str, resolution: str, limit: int = None) -> Bars:
+        """Last `limit` bars (all when None), oldest first"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution} (use {', '.join(RESOLUTIONS)})")
+        with self._lock:
+            level = self._load(symbol.upper(), resolution)
+            return level.view(max(0, level.n - limit) if limit else 0)
+
+    def closes(self, symbol: str, resolution: str, limit: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(bar start in ms, close) series, the input the indicators run on"""
+        timestamps, _, _, _, close = self.get(symbol, resolution, limit)
+        return timestamps, close
+
+    def ingest(self, symbol: str, timestamps: np.ndarray, prices: np.ndarray) -> Dict[str, int]:
+        """Add ticks (ms timestamps, prices); returns the bars written per resolution"""
+        symbol = symbol.upper()
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        written = dict.fromkeys(RESOLUTIONS, 0)
+        for start in range(0, len(prices), self.chunk_size):
+            for resolution, n in self._ingest_chunk(symbol, timestamps[start:start + self.chunk_size],
+                                                    prices[start:start + self.chunk_size]).items():
+                written[resolution] += n
+        return written
+
+    def _ingest_chunk(self, symbol: str, timestamps: np.ndarray, prices: np.ndarray) -> Dict[str, int]:
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, prices = timestamps[order], prices[order]
+
+        with self._lock:
+            finest = self._load(symbol, next(iter(RESOLUTIONS)))
+            if finest.n and timestamps[0] < finest.columns[0][finest.n - 1]:
+                raise ValueError(f"{symbol} ticks older than the last stored bar")
+
+            # Each level is aggregated from the part of the finer level that changed
+            changed = (timestamps, prices, prices, prices, prices)
+            updates = {}
+            for resolution, step in RESOLUTIONS.items():
+                level = self._load(symbol, resolution)
+                first = level.merge(aggregate(changed, step))
+                changed = level.tail(first)
+                updates[resolution] = changed
+
+            conn = self.db.connection()
+            try:
+                with conn:
+                    for resolution, (ts, open_, high, low, close) in updates.items():
+                        conn.executemany("INSERT OR REPLACE INTO ohlc_bars VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                         zip([symbol] * len(ts), [resolution] * len(ts), ts.tolist(),
+                                             open_.tolist(), high.tolist(), low.tolist(), close.tolist()))
+            except Exception:
+                # Memory is ahead of SQLite now; reload from SQLite on next use
+                for resolution in RESOLUTIONS:
+                    self._levels.pop((symbol, resolution), None)
+                raise
+        return {resolution: len(bars[0]) for resolution, bars in updates.items()}
+
+    def stats(self, symbol: str) -> Dict[str, Dict]:
+        """Bar count and time span per resolution"""
+        result = {}
+        for resolution in RESOLUTIONS:
+            timestamps = self.get(symbol, resolution)[0]
+            result[resolution] = {
+                'bars': len(timestamps),
+                'first': int(timestamps[0]) if len(timestamps) else None,
+                'last': int(timestamps[-1]) if len(timestamps) else None
+            }
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest tick or minute data into OHLC bars')
+    parser.add_argument('symbol')
+    parser.add_argument('csv', help='CSV with timestamp (ms) and price columns, oldest first')
+    parser.add_argument('--chunk-size', type=int, default=1000000, help='rows read and aggregated at a time')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    from main import DataFetcher, init_db
+    init_db()
+    store = DataFetcher.bars
+    store.chunk_size = args.chunk_size
+
+    start = time.perf_counter()
+    ticks = 0
+    for chunk in pd.read_csv(args.csv, usecols=['timestamp', 'price'], chunksize=args.chunk_size):
+        store.ingest(args.symbol, chunk['timestamp'].to_numpy(np.int64), chunk['price'].to_numpy(np.float64))
+        ticks += len(chunk)
+    elapsed = time.perf_counter() - start
+
+    print(f"Ingested {ticks} ticks for {args.symbol.upper()} in {elapsed:.1f}s")
+    for resolution, info in store.stats(args.symbol).items():
+        print(f"  {resolution:>3}: {info['bars']} bars")
+
+
+if __name__ == '__main__':
+    main()
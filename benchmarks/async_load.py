@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Concurrency scaling of the Flask (WSGI) and async (ASGI) servers
+
+Starts each server in its own process, pointed at a local stub price server
+that answers after a fixed delay, with the price and history caches
+disabled so every request goes upstream. Clients then hit /api/portfolio and
+/api/market/<symbol> (a different symbol per request) at increasing
+concurrency; throughput and latency percentiles are reported per level.
+
+    python benchmarks/async_load.py --delay 0.5 --concurrency 1 8 16 32 --seconds 3
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import Database
+from main import MIGRATIONS
+from sources import LiveSource
+
+HELD = ['BTC', 'ETH', 'SOL', 'ADA', 'DOT']
+SYMBOLS = [f'COIN{i}' for i in range(200)]
+
+
+def seed(path: str):
+    database = Database(path, MIGRATIONS)
+    conn = database.connection()
+    now = datetime.now()
+    conn.execute("INSERT INTO portfolio VALUES (1, 'USD', 50000, 1, ?)", (now,))
+    conn.executemany("INSERT INTO portfolio VALUES (NULL, ?, 1, 100, ?)",
+                     [(asset, now) for asset in HELD])
+    conn.commit()
+    database.close_all()
+
+
+def serve(mode: str, port: int, db_path: str, upstream: str):
+    """Run one server in this process (the --serve entry point)"""
+    import main
+
+    main.db.path = db_path
+    main.DataFetcher.source = LiveSource(main.COINGECKO_IDS, base_url=upstream)
+    main.DataFetcher.price_cache.ttl = 0
+    main.DataFetcher.history_cache.ttl = 0
+
+    if mode == 'flask':
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        main.init_db()
+        main.app.run(port=port, threaded=True)
+    else:
+        import uvicorn
+
+        import asgi
+        uvicorn.run(asgi.app, port=port, log_level='warning')
+
+
+def start_process(args: list, ready_url: str) -> subprocess.Popen:
+    """Start a helper process and wait until ready_url answers"""
+    proc = subprocess.Popen([sys.executable] + args, cwd=ROOT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(ready_url)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{args[0]} did not start')
+
+
+async def load(base: str, endpoint: str, concurrency: int, seconds: float) -> dict:
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal errors
+            rng = random.Random()
+            while time.perf_counter() < deadline:
+                path = endpoint if endpoint == '/api/portfolio' else f'/api/market/{rng.choice(SYMBOLS)}'
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {'requests': len(latencies), 'errors': errors, 'rps': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--delay', type=float, default=0.5, help='stub upstream latency (s)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', choices=['flask', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.db, args.upstream)
+        return
+
+    # Separate processes, so the stub and the clients do not share a GIL with each other
+    upstream = f'http://127.0.0.1:{args.port + 1}/api/v3'
+    stub = start_process([os.path.join(ROOT, 'benchmarks', 'stub_prices.py'), '--port', str(args.port + 1),
+                          '--delay', str(args.delay)], upstream)
+    print(f"upstream delay {args.delay * 1000:.0f} ms, {args.seconds:.0f} s per level")
+    for mode in ('flask', 'asgi'):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            seed(db_path)
+            proc = start_process([os.path.abspath(__file__), '--serve', mode, '--port', str(args.port),
+                                  '--db', db_path, '--upstream', upstream],
+                                 f'http://127.0.0.1:{args.port}/api/trades/tagging')
+            try:
+                for endpoint in ('/api/portfolio', '/api/market/<symbol>'):
+                    for concurrency in args.concurrency:
+                        r = asyncio.run(load(f'http://127.0.0.1:{args.port}', endpoint,
+                                             concurrency, args.seconds))
+                        print(f"{mode:>5} {endpoint:<21} c={concurrency:<3} {r['rps']:8.1f} req/s  "
+                              f"p50={r['p50_ms']:7.1f} ms  p95={r['p95_ms']:7.1f} ms  "
+                              f"errors={r['errors']}")
+            finally:
+                proc.terminate()
+                proc.wait()
+    stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
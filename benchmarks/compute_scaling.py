@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Indicator throughput: inline (GIL-bound) vs the process-pool compute backend
+
+Several request threads repeatedly analyze a batch of synthetic price
+histories, as /api/market/scan does, and the number of histories analyzed
+per second is reported for each worker count. Scaling beyond one worker
+needs as many free cores.
+
+    python benchmarks/compute_scaling.py --workers 0 1 2 4 --threads 8 --symbols 10
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compute import ComputePool
+
+
+def run(workers: int, threads: int, batch: list, seconds: float) -> float:
+    pool = ComputePool(workers)
+    pool.start()
+    done = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def client(i):
+        while time.perf_counter() < deadline:
+            pool.analyze_many(batch)
+            done[i] += len(batch)
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return sum(done) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--threads', type=int, default=8, help='concurrent request threads')
+    parser.add_argument('--symbols', type=int, default=10, help='histories per batch')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batch = [40000 * np.exp(np.cumsum(rng.normal(0, 0.02, args.days))) for _ in range(args.symbols)]
+
+    print(f"{os.cpu_count()} cores, {args.threads} threads, {args.symbols} x {args.days}-day histories")
+    for workers in args.workers:
+        rate = run(workers, args.threads, batch, args.seconds)
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f"{label:>10}: {rate:8.1f} histories/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write SQLite load: connect-per-request vs pooled WAL connections
+
+Runs the same queries as /api/trades/history, /api/portfolio (reads) and
+/api/trade (writes) from several threads against a scratch database and
+reports operations per second for both access patterns.
+
+    python benchmarks/db_load.py --threads 8 --seconds 3 --write-ratio 0.2
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import Database
+from main import MIGRATIONS
+
+READ_HISTORY = """SELECT date, asset, type, entry_price, exit_price,
+                         amount, pnl_percent, regime, epi, eci, etb
+                  FROM trades ORDER BY date DESC LIMIT 50"""
+READ_PORTFOLIO = "SELECT asset, amount, avg_price FROM portfolio"
+
+
+def seed(path: str, trades: int):
+    database = Database(path, MIGRATIONS)
+    conn = database.connection()
+    conn.execute("INSERT INTO portfolio VALUES (1, 'USD', 1e12, 1, ?)", (datetime.now(),))
+    conn.execute("INSERT INTO portfolio VALUES (NULL, 'BTC', 1e6, 40000, ?)", (datetime.now(),))
+    conn.executemany("""INSERT INTO trades (date, asset, type, entry_price, exit_price,
+                        amount, pnl_percent, regime, epi, eci, etb, notes)
+                        VALUES (?, 'BTC', 'LONG', 1, 1, 1, ?, 'Σ₁₂₃₊', 0.5, 0.5, 0.5, '')""",
+                     [(datetime.now(), random.gauss(0, 5)) for _ in range(trades)])
+    conn.commit()
+    database.close_all()
+
+
+def operation(conn: sqlite3.Connection, write: bool):
+    if write:
+        conn.execute("UPDATE portfolio SET amount = amount - 1 WHERE asset='USD'")
+        conn.execute("UPDATE portfolio SET amount = amount + 1 WHERE asset='BTC'")
+        conn.execute("""INSERT INTO trades (date, asset, type, entry_price, exit_price,
+                        amount, pnl_percent, regime, epi, eci, etb, notes)
+                        VALUES (?, 'BTC', 'LONG', 1, 1, 1, 0, 'Σ₁₂₃₊', 0.5, 0.5, 0.5, '')""",
+                     (datetime.now(),))
+        conn.commit()
+    else:
+        conn.execute(READ_HISTORY).fetchall()
+        conn.execute(READ_PORTFOLIO).fetchall()
+
+
+def run(mode: str, path: str, threads: int, seconds: float, write_ratio: float) -> dict:
+    database = Database(path, MIGRATIONS)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        rng = random.Random()
+        local = {'reads': 0, 'writes': 0, 'errors': 0}
+        while time.perf_counter() < deadline:
+            write = rng.random() < write_ratio
+            try:
+                if mode == 'legacy':
+                    # What every handler used to do
+                    conn = sqlite3.connect(path)
+                    operation(conn, write)
+                    conn.close()
+                else:
+                    operation(database.connection(), write)
+                local['writes' if write else 'reads'] += 1
+            except sqlite3.OperationalError:
+                local['errors'] += 1
+        with lock:
+            for key in counts:
+                counts[key] += local[key]
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    database.close_all()
+
+    return dict(counts, mode=mode, ops_per_sec=(counts['reads'] + counts['writes']) / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--trades', type=int, default=10000, help='rows seeded into trades')
+    args = parser.parse_args()
+
+    for mode in ('legacy', 'pooled'):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            seed(path, args.trades)
+            if mode == 'legacy':
+                # Legacy databases had no WAL and no indexes
+                conn = sqlite3.connect(path)
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.execute("DROP INDEX idx_trades_date")
+                conn.close()
+            result = run(mode, path, args.threads, args.seconds, args.write_ratio)
+        print(f"{result['mode']:>7}: {result['ops_per_sec']:9.1f} ops/s  "
+              f"(reads={result['reads']}, writes={result['writes']}, lock errors={result['errors']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the CoinGecko endpoints DataFetcher uses
+
+Serves /simple/price and /coins/<id>/market_chart with deterministic prices
+after an artificial delay, so load tests can model a slow upstream without
+touching the network.
+
+    python benchmarks/stub_prices.py --port 8765 --delay 0.2
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, delay: float = 0.0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.delay = delay
+        self.requests = 0
+        self.calls = Counter()  # Requests per endpoint: 'simple_price', 'market_chart'
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v3"
+
+    def start(self) -> 'StubServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.calls['simple_price' if endpoint == 'price' else endpoint] += 1
+        time.sleep(self.server.delay)
+
+        if url.path.endswith('/simple/price'):
+            ids = query['ids'][0].split(',')
+            body = {coin_id: {'usd': 100.0 + sum(map(ord, coin_id)) % 900} for coin_id in ids}
+        elif url.path.endswith('/market_chart'):
+            days = int(query['days'][0])
+            now = int(time.time() * 1000)
+            start = (now // DAY_MS - days) * DAY_MS
+            timestamps = [start + i * DAY_MS for i in range(days + 1)] + [now]
+            body = {'prices': [[ts, 1000.0 + (ts // DAY_MS) % 97] for ts in timestamps]}
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.2, help='seconds per response')
+    args = parser.parse_args()
+
+    server = StubServer(args.port, args.delay)
+    print(f"Stub prices at {server.base_url} (delay {args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: EAREngine methods and API endpoints, saved as JSON
+
+Times every EAREngine indicator method over input sizes (100 -> 1M points)
+and every Flask endpoint through the test client, with market data from the
+seeded synthetic source and a scratch database, so runs measure the code
+rather than the network and see the same prices every time. Each case
+reports latency percentiles, throughput and tracemalloc allocations of one
+call. The startup group times fresh processes instead: `import main`, the
+first response with and without the warm-up, and the warm-up itself.
+--compare reports changes against a previous run and exits non-zero on
+regressions.
+
+    python benchmarks/suite.py --out results.json
+    python benchmarks/suite.py --only engine --sizes 100 10000 --compare results.json
+    python benchmarks/suite.py --only startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ear_engine import EAREngine, StreamingEAREngine
+
+SIZES = [100, 1000, 10000, 100000, 1000000]
+SYMBOLS = ['BTC', 'ETH', 'SOL', 'DOGE', 'XRP']
+
+
+def synthetic_prices(n: int, seed: int = 0, start: float = 40000.0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+def measure(fn: Callable[[], object], min_time: float, max_calls: int, min_calls: int = 3) -> Dict:
+    """
+    Latency percentiles and throughput of fn(), called until min_time has
+    passed (at least min_calls, at most max_calls times), then the
+    allocations of one extra call under tracemalloc.
+    """
+    fn()  # Warm-up: imports, caches, lazily built layouts
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < max_calls and (len(latencies) < min_calls or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    # Separate call: tracing slows allocation-heavy code down several times
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'lineno')
+    allocated = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+
+    us = np.array(latencies) * 1e6
+    return {
+        'calls': len(latencies),
+        'mean_us': float(us.mean()),
+        'p50_us': float(np.percentile(us, 50)),
+        'p95_us': float(np.percentile(us, 95)),
+        'p99_us': float(np.percentile(us, 99)),
+        'max_us': float(us.max()),
+        'ops_per_s': float(len(us) / (us.sum() / 1e6)),
+        'peak_kib': peak / 1024,
+        'retained_kib': allocated / 1024,
+        'retained_blocks': int(blocks)
+    }
+
+
+def engine_cases(sizes: List[int]) -> List[Dict]:
+    """(name, size, fn) for every EAREngine method at every size"""
+    cases = []
+    for size in sizes:
+        prices = synthetic_prices(size)
+        # Batch kernels get the same number of points as rows of one year
+        days = min(size, 365)
+        matrix = synthetic_prices(size - size % days).reshape(-1, days)
+        stream = StreamingEAREngine.from_prices(prices, history=max(size, StreamingEAREngine.WINDOW))
+        ticks = iter(np.resize(prices, 10 ** 6))
+
+        cases += [
+            ('calculate_hurst_exponent', size, lambda p=prices: EAREngine.calculate_hurst_exponent(p)),
+            ('calculate_eci', size, lambda p=prices: EAREngine.calculate_eci(p)),
+            ('calculate_etb', size, lambda p=prices: EAREngine.calculate_etb(p)),
+            ('rolling_corr_instability', size, lambda p=prices: EAREngine.rolling_corr_instability(p)),
+            ('calculate_hurst_batch', size, lambda m=matrix: EAREngine.calculate_hurst_batch(m)),
+            ('calculate_eci_batch', size, lambda m=matrix: EAREngine.calculate_eci_batch(m)),
+            ('calculate_etb_batch', size, lambda m=matrix: EAREngine.calculate_etb_batch(m)),
+            ('StreamingEAREngine.push', size, lambda s=stream, t=ticks: s.push(next(t)))
+        ]
+
+    epi, eci, etb = 0.6, 0.5, 0.4
+    regime = EAREngine.classify_regime(epi, eci, etb)
+    cases += [
+        ('classify_regime', 1, lambda: EAREngine.classify_regime(epi, eci, etb)),
+        ('get_recommendation', 1, lambda: EAREngine.get_recommendation(epi, eci, etb, regime))
+    ]
+    return [{'group': 'engine', 'name': name, 'size': size, 'fn': fn} for name, size, fn in cases]
+
+
+def endpoint_cases(db_path: str, trades: int) -> List[Dict]:
+    """(name, fn) for every non-streaming endpoint, on a seeded scratch database"""
+    import main
+    from compute import ComputePool
+    from sources import SyntheticSource
+
+    main.db.path = db_path
+    main.compute_pool = ComputePool(0)
+    main.DataFetcher.source = SyntheticSource(seed=0, speed=0)
+    main.init_db()
+
+    conn = main.db.connection()
+    conn.execute("UPDATE portfolio SET amount = 1e12 WHERE asset='USD'")
+    conn.executemany("INSERT INTO portfolio VALUES (NULL, ?, 1e6, 100, ?)",
+                     [(s, datetime.now()) for s in SYMBOLS])
+    rng = np.random.default_rng(0)
+    conn.executemany("""INSERT INTO trades (date, asset, type, entry_price, exit_price, amount,
+                        pnl_percent, regime, notes) VALUES (?, ?, 'LONG', 100, ?, 1, ?, 'TREE', '')""",
+                     [(datetime.now(), SYMBOLS[i % len(SYMBOLS)], 100 + pnl, pnl)
+                      for i, pnl in enumerate(rng.normal(0, 5, trades))])
+    conn.commit()
+    main.scanner.refresh()
+
+    client = main.app.test_client()
+    prices = synthetic_prices(1095).tolist()
+    order = {'asset': 'BTC', 'type': 'BUY', 'amount': 0.001, 'price': 100}
+    requests = [
+        ('GET /api/portfolio', lambda: client.get('/api/portfolio')),
+        ('GET /api/market/<symbol>', lambda: client.get('/api/market/BTC')),
+        ('GET /api/market/scan', lambda: client.get('/api/market/scan?symbols=' + ','.join(SYMBOLS))),
+        ('GET /api/scan', lambda: client.get('/api/scan')),
+        ('GET /api/scan/status', lambda: client.get('/api/scan/status')),
+        ('GET /api/stream/status', lambda: client.get('/api/stream/status')),
+        ('GET /api/risk', lambda: client.get('/api/risk')),
+        ('GET /api/trades/history', lambda: client.get('/api/trades/history')),
+        ('GET /api/trades/tagging', lambda: client.get('/api/trades/tagging')),
+        ('POST /api/backtest', lambda: client.post('/api/backtest', json={'prices': prices,
+                                                                          'include_curve': False})),
+        ('POST /api/trade', lambda: client.post('/api/trade', json=order)),
+        ('POST /api/trades/batch', lambda: client.post('/api/trades/batch', json={'orders': [order] * 10}))
+    ]
+
+    def checked(name, call):
+        def fn():
+            response = call()
+            if response.status_code != 200:
+                raise RuntimeError(f'{name}: HTTP {response.status_code} {response.get_data(as_text=True)}')
+        return fn
+
+    return [{'group': 'api', 'name': name, 'size': trades, 'fn': checked(name, call)} for name, call in requests]
+
+
+# Runs in a fresh interpreter; prints the startup timings (s) of one process as JSON
+STARTUP_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.init_db()
+initialized = time.perf_counter()
+client = main.app.test_client()
+if main.WARMUP:
+    main.warmup.start()
+    main.warmup.wait()
+ready = time.perf_counter()
+response = client.get('/api/market/BTC')
+if response.status_code != 200:
+    sys.exit(f'GET /api/market/BTC: HTTP {response.status_code}')
+done = time.perf_counter()
+print(json.dumps({'import': imported - start, 'init_db': initialized - imported,
+                  'warmup': ready - initialized, 'ready': ready - start,
+                  'first_response': done - start, 'first_request': done - ready,
+                  'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+
+def startup_results(db_path: str, runs: int) -> List[Dict]:
+    """Startup timings over `runs` fresh processes each, with and without warm-up"""
+    def probe(warmup: bool) -> Dict:
+        env = dict(os.environ, EAR_SOURCE='synthetic', EAR_REPLAY_SPEED='0', EAR_DB_PATH=db_path,
+                   EAR_COMPUTE_WORKERS='0', EAR_WARMUP='1' if warmup else '0')
+        out = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    probe(False)  # Creates the schema and history once: later runs start on a current database
+    samples = {warmup: [probe(warmup) for _ in range(runs)] for warmup in (False, True)}
+    cases = [
+        ('import main', False, 'import'),
+        ('init_db', False, 'init_db'),
+        ('first response (cold)', False, 'first_response'),
+        ('warm-up', True, 'warmup'),
+        ('ready (warm-up)', True, 'ready'),
+        ('first response (warm-up)', True, 'first_response'),
+        ('first request after ready', True, 'first_request')
+    ]
+
+    results = []
+    for name, warmup, field in cases:
+        us = np.array([sample[field] for sample in samples[warmup]]) * 1e6
+        results.append({
+            'group': 'startup', 'name': name, 'size': 1, 'calls': len(us),
+            'mean_us': float(us.mean()),
+            'p50_us': float(np.percentile(us, 50)),
+            'p95_us': float(np.percentile(us, 95)),
+            'p99_us': float(np.percentile(us, 99)),
+            'max_us': float(us.max()),
+            'ops_per_s': float(len(us) / (us.sum() / 1e6)),
+            # Whole-process peak RSS here, not a tracemalloc peak of one call
+            'peak_kib': float(max(sample['max_rss_kib'] for sample in samples[warmup])),
+            'retained_kib': 0.0,
+            'retained_blocks': 0
+        })
+    return results
+
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> int:
+    """Print p50 changes against a baseline run; returns the number of regressions"""
+    previous = {(r['group'], r['name'], r['size']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}), "
+          f"threshold {threshold:.0%}")
+    for r in results:
+        old = previous.get((r['group'], r['name'], r['size']))
+        if old is None:
+            continue
+        change = r['p50_us'] / old['p50_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            flag = 'faster'
+        print(f"{r['name']:<28} {r['size']:>8}  {old['p50_us']:12.1f} -> {r['p50_us']:12.1f} us  "
+              f"{change:+7.1%}  {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', choices=['engine', 'api', 'startup'], help='run one group only')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='engine input sizes (points)')
+    parser.add_argument('--trades', type=int, default=10000, help='trades seeded for the API group')
+    parser.add_argument('--runs', type=int, default=5, help='processes started per startup case')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per case')
+    parser.add_argument('--max-calls', type=int, default=10000)
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = []
+        if args.only in (None, 'engine'):
+            cases += engine_cases(args.sizes)
+        if args.only in (None, 'api'):
+            cases += endpoint_cases(os.path.join(tmp, 'bench.db'), args.trades)
+
+        results = []
+        print(f"{'case':<28} {'size':>8} {'calls':>6} {'p50 us':>12} {'p95 us':>12} {'p99 us':>12} "
+              f"{'ops/s':>10} {'peak KiB':>10}")
+        for case in cases:
+            r = dict(group=case['group'], name=case['name'], size=case['size'],
+                     **measure(case['fn'], args.min_time, args.max_calls))
+            results.append(r)
+            print(f"{r['name']:<28} {r['size']:>8} {r['calls']:>6} {r['p50_us']:12.1f} {r['p95_us']:12.1f} "
+                  f"{r['p99_us']:12.1f} {r['ops_per_s']:10.1f} {r['peak_kib']:10.1f}")
+        if args.only in (None, 'startup'):
+            for r in startup_results(os.path.join(tmp, 'startup.db'), args.runs):
+                results.append(r)
+                print(f"{r['name']:<28} {r['size']:>8} {r['calls']:>6} {r['p50_us']:12.1f} "
+                      f"{r['p95_us']:12.1f} {r['p99_us']:12.1f} {r['ops_per_s']:10.1f} {r['peak_kib']:10.1f}")
+
+    run = {'meta': metadata(), 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
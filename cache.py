@@ -0,0 +1,143 @@
+"""
+EAR Trader Simulator - In-process caching
+TTL + LRU cache with in-flight request coalescing for upstream data
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class _InFlight:
+    """A load in progress that concurrent callers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe cache with per-entry TTL and bounded LRU eviction.
+
+    get_or_load() coalesces concurrent misses for the same key: the first
+    caller runs the loader, the others block until it finishes and share
+    its result (or its exception). Failed loads are never cached.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+        self.load_count = 0
+        self.load_time_total = 0.0
+        self.load_time_max = 0.0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = _InFlight()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        start = time.perf_counter()
+        try:
+            value = loader()
+        except Exception as e:
+            inflight.error = e
+            with self._lock:
+                self.errors += 1
+                del self._inflight[key]
+            inflight.event.set()
+            raise
+
+        elapsed = time.perf_counter() - start
+        inflight.value = value
+        with self._lock:
+            self.load_count += 1
+            self.load_time_total += elapsed
+            self.load_time_max = max(self.load_time_max, elapsed)
+            self._put(key, value)
+            del self._inflight[key]
+        inflight.event.set()
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value without loading, or default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value loaded outside get_or_load (e.g. a bulk request)"""
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        """Hit/miss/latency counters"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                'avg_load_ms': self.load_time_total / self.load_count * 1000 if self.load_count else 0.0,
+                'max_load_ms': self.load_time_max * 1000
+            }
@@ -0,0 +1,125 @@
+"""
+EAR Trader Simulator - Indicator compute backend
+Runs EAR indicator math in a process pool, passing price histories through
+shared memory instead of pickling them
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from ear_engine import EAREngine
+from metrics import metrics
+
+
+def analyze(prices: np.ndarray) -> Dict:
+    """EPI/ECI/ETB, regime and recommendation for one daily price history"""
+    engine = EAREngine()
+    epi = engine.calculate_hurst_exponent(prices[-100:])  # Last 100 days
+    eci = engine.calculate_eci(prices)
+    etb = engine.calculate_etb(prices[-100:])
+    regime = engine.classify_regime(epi, eci, etb)
+    return {
+        'epi': float(epi),
+        'eci': float(eci),
+        'etb': float(etb),
+        'regime': regime,
+        'recommendation': engine.get_recommendation(epi, eci, etb, regime)
+    }
+
+
+def _analyze_shared(name: str, size: int, spans: List[Tuple[int, int]]) -> List[Dict]:
+    """Worker side: analyze slices of a shared float64 block"""
+    # Spawned workers share the parent's resource tracker, which the parent's unlink() settles
+    shm = SharedMemory(name=name)
+    try:
+        block = np.ndarray(size, dtype=np.float64, buffer=shm.buf)
+        results = [analyze(block[start:stop]) for start, stop in spans]
+        del block
+        return results
+    finally:
+        shm.close()
+
+
+def _ready() -> bool:
+    return True
+
+
+class ComputePool:
+    """
+    Process pool for indicator math, so concurrent requests use every core
+    instead of queueing on the GIL.
+
+    Price arrays are copied once into a shared memory block; tasks receive
+    only the block name and (start, stop) offsets. Workers are spawned (not
+    forked) because the server process runs threads and holds SQLite
+    connections. workers=0 computes inline in the calling thread.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def start(self):
+        """Spawn the workers now rather than on the first request"""
+        if self.workers:
+            pool = self._pool()
+            for future in [pool.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def analyze(self, prices: np.ndarray) -> Dict:
+        """Indicators for one price history (see analyze())"""
+        return self.analyze_many([prices])[0]
+
+    @metrics.timed('compute')
+    def analyze_many(self, series: List[np.ndarray]) -> List[Dict]:
+        """Indicators for many price histories, spread over the workers"""
+        if not self.workers or not series:
+            return [analyze(np.asarray(prices, dtype=np.float64)) for prices in series]
+
+        bounds = np.cumsum([0] + [len(prices) for prices in series])
+        size = int(bounds[-1])
+        shm = SharedMemory(create=True, size=max(size, 1) * 8)
+        try:
+            block = np.ndarray(size, dtype=np.float64, buffer=shm.buf)
+            for i, prices in enumerate(series):
+                block[bounds[i]:bounds[i + 1]] = prices
+            del block
+
+            spans = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+            chunks = [spans[i::self.workers] for i in range(min(self.workers, len(spans)))]
+            pool = self._pool()
+            futures = [pool.submit(_analyze_shared, shm.name, size, chunk) for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            print(f"Compute pool failed, computing inline: {e}")
+            self.shutdown()
+            return [analyze(np.asarray(prices, dtype=np.float64)) for prices in series]
+        finally:
+            shm.close()
+            shm.unlink()
+
+        # Undo the round-robin chunking
+        results = [None] * len(series)
+        for offset, chunk in enumerate(chunk_results):
+            results[offset::len(chunks)] = chunk
+        return results
@@ -0,0 +1,183 @@
+"""
+EAR Trader Simulator - SQLite data access
+Per-thread pooled connections in WAL mode with versioned schema migrations
+"""
+
+import sqlite3
+import threading
+import time
+from typing import List, Sequence, Union
+
+from metrics import metrics
+
+
+def _operation(sql: str) -> str:
+    """Statement verb used as the metric name, e.g. 'select'"""
+    words = sql.split(None, 1)
+    return words[0].lower() if words else 'empty'
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor recording statement and fetch times as db operations"""
+
+    def execute(self, sql, parameters=()):
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record('db', _operation(sql), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record('db', _operation(sql), time.perf_counter() - start)
+
+    def fetchall(self):
+        # SQLite steps through most of a SELECT here, not in execute()
+        if not metrics.enabled:
+            return super().fetchall()
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.record('db', 'fetch', time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including execute() shortcuts) and commits are timed"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not metrics.enabled:
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.record('db', 'commit', time.perf_counter() - start)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # `with conn:` commits here without going through commit()
+        if not metrics.enabled or exc_type is not None:
+            return super().__exit__(exc_type, exc_value, traceback)
+        start = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            metrics.record('db', 'commit', time.perf_counter() - start)
+
+
+class Database:
+    """
+    One long-lived connection per thread instead of a connect/close per
+    request. Connections run in WAL mode so readers never block behind a
+    writer, use synchronous=NORMAL (durable at checkpoints, safe for WAL)
+    and wait on busy locks instead of failing. Each connection keeps its
+    own prepared-statement cache, so repeated queries skip re-parsing.
+    Statements, fetches and commits (also those of `with conn:`) are timed
+    as `db` operations (see metrics.py).
+
+    Migrations are a list of SQL scripts (or lists of statements); entry i
+    brings the schema to version i + 1, tracked in PRAGMA user_version.
+    """
+
+    def __init__(self, path: str, migrations: Sequence[Union[str, List[str]]] = (),
+                 busy_timeout_ms: int = 5000, cached_statements: int = 256):
+        self.path = path
+        self.migrations = list(migrations)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened (and migrated) on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+            if not self._migrated:
+                self.migrate()
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        # Never shared across threads; check_same_thread=False only lets close_all() close it
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                               cached_statements=self.cached_statements,
+                               check_same_thread=False,
+                               factory=TimedConnection if metrics.enabled else sqlite3.Connection)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def migrate(self) -> int:
+        """Apply pending migrations; a no-op when the schema is current"""
+        if self._migrated:
+            # This process already brought the schema to len(migrations)
+            return len(self.migrations)
+        with self._lock:
+            conn = getattr(self._local, 'conn', None) or self._open()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(self.migrations):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Re-read under the write lock in case another process migrated
+                    version = conn.execute("PRAGMA user_version").fetchone()[0]
+                    for target, migration in enumerate(self.migrations[version:], version + 1):
+                        statements = [migration] if isinstance(migration, str) else migration
+                        for statement in statements:
+                            conn.execute(statement)
+                        conn.execute(f"PRAGMA user_version={target}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                version = len(self.migrations)
+            if conn is not getattr(self._local, 'conn', None):
+                conn.close()
+            self._migrated = True
+            return version
+
+    def release(self):
+        """Roll back anything the current thread left uncommitted"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self):
+        """Close every pooled connection (other threads reopen on next use)"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def reset(self, path: str = None):
+        """
+        Close every connection and migrate again on next use, optionally
+        switching to another database file (e.g. a scratch file in tests)
+        """
+        self.close_all()
+        with self._lock:
+            if path is not None:
+                self.path = path
+            self._migrated = False
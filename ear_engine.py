@@ -0,0 +1,827 @@
+"""
+EAR Trader Simulator - EAR indicator engine
+Batch (EAREngine) and per-tick streaming (StreamingEAREngine) computation
+of the EPI, ECI and ETB indicators and regime classification
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+from metrics import metrics
+
+# Thresholds of EAREngine.classify_regime and get_recommendation
+DEFAULT_THRESHOLDS = {
+    'spiral_epi': 0.75,
+    'spiral_eci': 0.6,
+    'spiral_moderate_epi': 0.65,
+    'spiral_moderate_eci': 0.5,
+    'exhaustion_epi': 0.75,
+    'exhaustion_eci': 0.75,
+    'ranging_epi': 0.55,
+    'event_eci': 0.75,
+    'early_epi': 0.6,
+    'early_eci': 0.5,
+    'breakdown_etb': 0.4,
+    'entry_eci': 0.6,
+    'entry_etb': 0.5,
+    'exit_epi': 0.85,
+    'exit_eci': 0.8,
+    'reduce_etb': 0.4
+}
+
+# Regime codes, in classify_regime order
+REGIMES = ["Σ₂₃₂₊", "Σ₃₃₁₊", "Σ₁₁₁₋", "Σ₄₁₃₊", "Σ₁₃₁₊", "Σ₃₃₃₋", "Σ₁₂₃₊"]
+SPIRAL, EXHAUSTION, RANGING, EVENT, EARLY, BREAKDOWN, TRANSITION = range(len(REGIMES))
+
+# EAR Calculations
+class EAREngine:
+    """Core EAR analysis engine"""
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_hurst_exponent(prices: np.ndarray, max_lag: int = 20) -> float:
+        """
+        Calculate Hurst exponent using R/S analysis with robust fallback
+        H ≈ 0.5: Random walk
+        H > 0.5: Persistent (trending)
+        H < 0.5: Anti-persistent (mean-reverting)
+        """
+        try:
+            if len(prices) < 30:
+                return 0.5
+            return float(EAREngine.calculate_hurst_batch(prices, max_lag)[0])
+        except Exception:
+            return 0.5
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_hurst_batch(prices: np.ndarray, max_lag: int = 20) -> np.ndarray:
+        """
+        Batched R/S Hurst estimator, one value per row of a 2-D price array
+        (many symbols or many windows). A 1-D array is treated as one row.
+        
+        Returns are split into non-overlapping chunks for every lag; all
+        (lag, chunk) pairs are padded to the largest lag and evaluated in a
+        single NumPy pass, then log(R/S) is regressed on log(lag) per row.
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        n_rows, n_points = prices.shape
+        if n_points < 30:
+            return np.full(n_rows, 0.5)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(prices, axis=1) / prices[:, :-1]
+        
+        if max_lag <= 2:
+            # No lags to fit: every row takes the autocorrelation fallback
+            return EAREngine.fit_hurst(np.empty((n_rows, 0)), np.arange(2, 2), returns)
+        
+        lags, group_starts, chunk_lags, mask, idx = EAREngine._hurst_layout(n_points, max_lag)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            RS = EAREngine.chunk_rs(np.where(mask, returns[:, idx], 0.0), chunk_lags, mask)
+        
+        return EAREngine.fit_hurst(EAREngine.mean_log_rs(RS, group_starts), lags, returns)
+    
+    @staticmethod
+    def chunk_rs(chunks: np.ndarray, chunk_lags: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        Rescaled range of every zero-padded chunk of returns along the last
+        axis (chunk_lags: real length per chunk), NaN where undefined
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = chunks.sum(axis=-1) / chunk_lags
+            dev = np.where(mask, chunks - means[..., None], 0.0)
+            # Padding keeps the cumsum at its final value (~0), so R is unaffected
+            Y = np.cumsum(dev, axis=-1)
+            R = Y.max(axis=-1) - Y.min(axis=-1)
+            S = np.sqrt((dev * dev).sum(axis=-1) / chunk_lags)
+            return np.where((R > 0) & (S > 0), R / S, np.nan)
+    
+    @staticmethod
+    def mean_log_rs(RS: np.ndarray, group_starts: np.ndarray) -> np.ndarray:
+        """log of the mean R/S per lag, for chunk R/S rows grouped by lag"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = ~np.isnan(RS)
+            rs_sum = np.add.reduceat(np.where(valid, RS, 0.0), group_starts, axis=1)
+            rs_count = np.add.reduceat(valid, group_starts, axis=1)
+            return np.log(rs_sum / rs_count)
+    
+    @staticmethod
+    def fit_hurst(log_rs: np.ndarray, lags: np.ndarray, returns: np.ndarray) -> np.ndarray:
+        """
+        Per-row least-squares slope of log(R/S) (rows x lags) on log(lag),
+        clipped to [0.3, 0.9]. Rows with fewer than two usable lags fall back
+        to the lag-1 autocorrelation of their returns row.
+        """
+        hurst = np.full(len(log_rs), 0.5)
+        
+        # Least-squares slope of log(R/S) vs log(lag), ignoring empty lags
+        ok = np.isfinite(log_rs)
+        k = ok.sum(axis=1)
+        x = np.where(ok, np.log(lags), 0.0)
+        y = np.where(ok, log_rs, 0.0)
+        sx, sy = x.sum(axis=1), y.sum(axis=1)
+        denom = k * (x * x).sum(axis=1) - sx * sx
+        fitted = (k >= 2) & (denom > 0)
+        slope = (k * (x * y).sum(axis=1) - sx * sy)[fitted] / denom[fitted]
+        hurst[fitted] = np.clip(slope, 0.3, 0.9)
+        
+        # Fallback: autocorrelation method
+        if not fitted.all():
+            r0 = returns[~fitted, :-1]
+            r1 = returns[~fitted, 1:]
+            r0 = r0 - r0.mean(axis=1, keepdims=True)
+            r1 = r1 - r1.mean(axis=1, keepdims=True)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                autocorr = (r0 * r1).sum(axis=1) / np.sqrt((r0 * r0).sum(axis=1) * (r1 * r1).sum(axis=1))
+            hurst[~fitted] = np.where(np.isnan(autocorr), 0.5,
+                                      np.clip(0.5 + autocorr * 0.25, 0.3, 0.85))
+        
+        return hurst
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _hurst_layout(n_points: int, max_lag: int) -> Tuple:
+        """Chunk index layout for calculate_hurst_batch, cached per series length"""
+        n_returns = n_points - 1
+        
+        # One entry per (lag, chunk), grouped by lag
+        lags = np.arange(2, min(max_lag, n_points // 2))
+        chunk_counts = n_returns // lags
+        group_starts = np.cumsum(chunk_counts) - chunk_counts
+        chunk_lags = np.repeat(lags, chunk_counts)
+        chunk_starts = (np.arange(len(chunk_lags)) - np.repeat(group_starts, chunk_counts)) * chunk_lags
+        
+        cols = np.arange(lags[-1])
+        mask = cols < chunk_lags[:, None]
+        idx = np.minimum(chunk_starts[:, None] + cols, n_returns - 1)
+        return lags, group_starts, chunk_lags, mask, idx
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_eci(prices: np.ndarray, volumes: np.ndarray = None) -> float:
+        """
+        Calculate EAR Criticality Index (ECI)
+        Measures proximity to critical threshold
+        ECI > 0.8: Near threshold (transition imminent)
+        ECI < 0.5: Stable
+        """
+        if len(prices) < 30:
+            return 0.0
+            
+        # Component 1: Volatility compression
+        short_vol = np.std(prices[-30:])
+        long_vol = np.std(prices[-365:] if len(prices) >= 365 else prices)
+        vol_compression = short_vol / long_vol if long_vol != 0 else 1.0
+        
+        # Component 2: Correlation instability (rolling correlation variance)
+        if len(prices) >= 100:
+            corr_instability = EAREngine.rolling_corr_instability(prices)
+        else:
+            corr_instability = 0.0
+        
+        # Component 3: Price momentum divergence
+        if len(prices) >= 50:
+            short_momentum = (prices[-1] - prices[-10]) / prices[-10]
+            long_momentum = (prices[-1] - prices[-50]) / prices[-50]
+            momentum_div = abs(short_momentum - long_momentum)
+        else:
+            momentum_div = 0.0
+        
+        return EAREngine.combine_eci(vol_compression, corr_instability, momentum_div)
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_eci_batch(prices: np.ndarray) -> np.ndarray:
+        """
+        calculate_eci for every row of a 2-D price array (rows x days).
+        Rows must be complete; all components are evaluated in one pass.
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        n_rows, n_points = prices.shape
+        if n_points < 30:
+            return np.zeros(n_rows)
+        
+        short_vol = prices[:, -30:].std(axis=1)
+        long_vol = prices[:, -365:].std(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol_compression = np.where(long_vol != 0, short_vol / long_vol, 1.0)
+        
+        if n_points >= 100:
+            window = 20
+            n_windows = n_points - 2 * window
+            windows = np.lib.stride_tricks.sliding_window_view(prices, 2 * window, axis=1)[:, :n_windows]
+            corrs = EAREngine.lag1_corr(windows.reshape(-1, 2 * window)).reshape(n_rows, n_windows)
+            corr_instability = corrs.std(axis=1)
+        else:
+            corr_instability = np.zeros(n_rows)
+        
+        if n_points >= 50:
+            short_momentum = (prices[:, -1] - prices[:, -10]) / prices[:, -10]
+            long_momentum = (prices[:, -1] - prices[:, -50]) / prices[:, -50]
+            momentum_div = np.abs(short_momentum - long_momentum)
+        else:
+            momentum_div = np.zeros(n_rows)
+        
+        return EAREngine.combine_eci(vol_compression, corr_instability, momentum_div)
+    
+    @staticmethod
+    def combine_eci(vol_compression: float, corr_instability: float, momentum_div: float) -> float:
+        """
+        Weighted combination of the ECI components, clamped to [0, 1].
+        Accepts scalars or equally shaped arrays.
+        """
+        eci = (0.4 * vol_compression + 
+               0.3 * corr_instability * 10 +  # Scale up
+               0.3 * momentum_div * 5)  # Scale up
+        
+        return np.clip(eci, 0.0, 1.0)  # Clamp to [0, 1]
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def rolling_corr_instability(prices: np.ndarray, window: int = 20) -> float:
+        """
+        Std of the lag-1 autocorrelation over centered 2*window slices.
+        Vectorized with sliding_window_view: every slice is computed in a
+        single NumPy pass instead of one np.corrcoef call per index.
+        """
+        corrs = EAREngine.rolling_corrs(prices, window)
+        return float(np.std(corrs)) if len(corrs) else 0.0
+    
+    @staticmethod
+    def rolling_corrs(prices: np.ndarray, window: int = 20) -> np.ndarray:
+        """Lag-1 autocorrelation of every centered 2*window slice"""
+        prices = np.asarray(prices, dtype=float)
+        n_windows = len(prices) - 2 * window
+        if n_windows <= 0:
+            return np.empty(0)
+        
+        windows = np.lib.stride_tricks.sliding_window_view(prices, 2 * window)[:n_windows]
+        return EAREngine.lag1_corr(windows)
+    
+    @staticmethod
+    def lag1_corr(windows: np.ndarray) -> np.ndarray:
+        """Row-wise np.corrcoef(row[:-1], row[1:]) for a 2-D array of windows"""
+        x = windows[:, :-1]
+        y = windows[:, 1:]
+        x = x - x.mean(axis=1, keepdims=True)
+        y = y - y.mean(axis=1, keepdims=True)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corrs = (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+        return np.clip(corrs, -1, 1)  # Same clipping as np.corrcoef
+    
+    @staticmethod
+    def _rolling_corr_instability_reference(prices: np.ndarray, window: int = 20) -> float:
+        """Reference loop implementation, checked against the vectorized one in tests/test_eci.py"""
+        rolling_corrs = []
+        for i in range(window, len(prices) - window):
+            subset = prices[i-window:i+window]
+            corr = np.corrcoef(subset[:-1], subset[1:])[0, 1]
+            rolling_corrs.append(corr)
+        return float(np.std(rolling_corrs)) if rolling_corrs else 0.0
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_etb(prices: np.ndarray) -> float:
+        """
+        Calculate EAR Topology Balance (ETB)
+        Measures structural health of the system
+        ETB > 0.6: Healthy balanced structure
+        ETB < 0.4: Degraded structure
+        
+        For price data, we approximate topology from:
+        - Tree: trend consistency (hierarchy)
+        - Lattice: mean reversion (network)
+        - Loop: cyclical patterns (feedback)
+        """
+        if len(prices) < 50:
+            return 0.5
+            
+        # Tree score: trend consistency
+        returns = np.diff(prices) / prices[:-1]
+        trend_consistency = abs(np.mean(returns) / np.std(returns)) if np.std(returns) != 0 else 0
+        tree_score = min(trend_consistency * 0.3, 0.5)
+        
+        # Lattice score: mean reversion strength
+        mean_price = np.mean(prices)
+        deviations = abs(prices - mean_price) / mean_price
+        mean_reversion = 1 - np.mean(deviations)
+        lattice_score = max(mean_reversion * 0.5, 0.2)
+        
+        # Loop score: cyclical pattern (simple autocorrelation)
+        if len(prices) >= 100:
+            lag = 20
+            autocorr = np.corrcoef(prices[:-lag], prices[lag:])[0, 1]
+            loop_score = abs(autocorr) * 0.3
+        else:
+            loop_score = 0.2
+        
+        return EAREngine.combine_etb(tree_score, lattice_score, loop_score)
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def calculate_etb_batch(prices: np.ndarray) -> np.ndarray:
+        """calculate_etb for every row of a 2-D price array (rows x days)"""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        n_rows, n_points = prices.shape
+        if n_points < 50:
+            return np.full(n_rows, 0.5)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Tree score: trend consistency
+            returns = np.diff(prices, axis=1) / prices[:, :-1]
+            std = returns.std(axis=1)
+            trend_consistency = np.where(std != 0, np.abs(returns.mean(axis=1) / std), 0)
+            tree_score = np.minimum(trend_consistency * 0.3, 0.5)
+            
+            # Lattice score: mean reversion strength
+            mean_price = prices.mean(axis=1, keepdims=True)
+            mean_reversion = 1 - (np.abs(prices - mean_price) / mean_price).mean(axis=1)
+            lattice_score = np.maximum(mean_reversion * 0.5, 0.2)
+            
+            # Loop score: lag autocorrelation
+            if n_points >= 100:
+                lag = 20
+                x = prices[:, :-lag] - prices[:, :-lag].mean(axis=1, keepdims=True)
+                y = prices[:, lag:] - prices[:, lag:].mean(axis=1, keepdims=True)
+                autocorr = (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+                loop_score = np.abs(np.clip(autocorr, -1, 1)) * 0.3
+            else:
+                loop_score = np.full(n_rows, 0.2)
+        
+        return EAREngine.combine_etb(tree_score, lattice_score, loop_score)
+    
+    @staticmethod
+    def combine_etb(tree_score: float, lattice_score: float, loop_score: float) -> float:
+        """
+        Balance of the tree/lattice/loop scores (1 = perfectly balanced).
+        Accepts scalars or equally shaped arrays.
+        """
+        # Balance: ideally each component ~33%
+        total = np.asarray(tree_score + lattice_score + loop_score, dtype=float)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Normalized scores
+            tree_norm = tree_score / total
+            lattice_norm = lattice_score / total
+            loop_norm = loop_score / total
+        
+        # ETB: how close to perfect balance (0.33, 0.33, 0.33)
+        ideal = 1/3
+        deviation = (np.abs(tree_norm - ideal) + 
+                     np.abs(lattice_norm - ideal) + 
+                     np.abs(loop_norm - ideal)) / 2
+        
+        etb = np.clip(1 - deviation, 0.0, 1.0)
+        return np.where(total == 0, 0.5, etb)[()]
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def classify_regime(epi: float, eci: float, etb: float) -> str:
+        """
+        Classify market regime using EAR framework
+        Returns symbol notation (e.g., Σ₂₃₂₊)
+        """
+        # Simplified regime classification
+        if epi > 0.75 and eci < 0.6:
+            return "Σ₂₃₂₊"  # Spirale - Strong trend
+        elif epi > 0.65 and eci < 0.5:
+            return "Σ₂₃₂₊"  # Spirale - Moderate trend
+        elif epi > 0.75 and eci > 0.75:
+            return "Σ₃₃₁₊"  # Espansione - Exhaustion
+        elif epi < 0.55:
+            return "Σ₁₁₁₋"  # Continuità - Ranging
+        elif eci > 0.75:
+            return "Σ₄₁₃₊"  # Evento - Breakout imminent
+        elif epi > 0.6 and eci < 0.5:
+            return "Σ₁₃₁₊"  # Avanzamento - Early trend
+        elif etb < 0.4:
+            return "Σ₃₃₃₋"  # Dissoluzione - Structure breakdown
+        else:
+            return "Σ₁₂₃₊"  # Transizione - Uncertain
+    
+    @staticmethod
+    @metrics.timed('engine')
+    def get_recommendation(epi: float, eci: float, etb: float, 
+                          regime: str, current_position: str = None) -> Dict:
+        """Generate trading recommendation based on EAR indicators"""
+        
+        # Default: no position
+        if current_position is None:
+            if regime in ["Σ₂₃₂₊", "Σ₁₃₁₊"] and eci < 0.6 and etb > 0.5:
+                return {
+                    "action": "ENTER_LONG",
+                    "confidence": "HIGH",
+                    "rationale": [
+                        f"EPI={epi:.2f} confirms persistence",
+                        f"ECI={eci:.2f} safe from threshold",
+                        f"ETB={etb:.2f} structure healthy"
+                    ]
+                }
+            elif regime == "Σ₄₁₃₊" and eci > 0.75:
+                return {
+                    "action": "PREPARE_BREAKOUT",
+                    "confidence": "MEDIUM",
+                    "rationale": [
+                        f"ECI={eci:.2f} near threshold",
+                        "Breakout imminent (direction uncertain)"
+                    ]
+                }
+            else:
+                return {
+                    "action": "WAIT",
+                    "confidence": "HIGH",
+                    "rationale": [
+                        f"Regime {regime} not favorable for entry"
+                    ]
+                }
+        
+        # Has long position
+        elif current_position == "LONG":
+            if epi > 0.85 or eci > 0.8:
+                return {
+                    "action": "EXIT",
+                    "confidence": "HIGH",
+                    "rationale": [
+                        f"EPI={epi:.2f} exhaustion zone" if epi > 0.85 else "",
+                        f"ECI={eci:.2f} threshold approaching" if eci > 0.8 else ""
+                    ]
+                }
+            elif etb < 0.4:
+                return {
+                    "action": "REDUCE_50%",
+                    "confidence": "MEDIUM",
+                    "rationale": [
+                        f"ETB={etb:.2f} structure degrading"
+                    ]
+                }
+            else:
+                return {
+                    "action": "HOLD",
+                    "confidence": "HIGH",
+                    "rationale": [
+                        f"EPI={epi:.2f} trend intact",
+                        f"ECI={eci:.2f} stable",
+                        f"ETB={etb:.2f} healthy"
+                    ]
+                }
+        
+        return {"action": "HOLD", "confidence": "MEDIUM", "rationale": ["Default"]}
+
+# Vectorized regimes (backtest, scanner)
+def classify_regimes(epi: np.ndarray, eci: np.ndarray, etb: np.ndarray,
+                     thresholds: Dict = None) -> np.ndarray:
+    """Vectorized EAREngine.classify_regime; returns indices into REGIMES"""
+    th = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    conditions = [
+        (epi > th['spiral_epi']) & (eci < th['spiral_eci']),
+        (epi > th['spiral_moderate_epi']) & (eci < th['spiral_moderate_eci']),
+        (epi > th['exhaustion_epi']) & (eci > th['exhaustion_eci']),
+        epi < th['ranging_epi'],
+        eci > th['event_eci'],
+        (epi > th['early_epi']) & (eci < th['early_eci']),
+        etb < th['breakdown_etb']
+    ]
+    choices = [SPIRAL, SPIRAL, EXHAUSTION, RANGING, EVENT, EARLY, BREAKDOWN]
+    return np.select(conditions, choices, default=TRANSITION)
+
+# Streaming EAR state
+class _RollingMoments:
+    """Running count/sum/sum-of-squares over a sliding window (shifted for precision)"""
+    
+    def __init__(self, shift: float = 0.0):
+        self.reset(np.empty(0), shift)
+    
+    def reset(self, values: np.ndarray, shift: float = 0.0):
+        values = np.asarray(values, dtype=float) - shift
+        self.shift = shift
+        self.n = len(values)
+        self.s = float(values.sum())
+        self.ss = float((values * values).sum())
+    
+    def add(self, x: float):
+        x -= self.shift
+        self.n += 1
+        self.s += x
+        self.ss += x * x
+    
+    def remove(self, x: float):
+        x -= self.shift
+        self.n -= 1
+        self.s -= x
+        self.ss -= x * x
+    
+    @property
+    def mean(self) -> float:
+        return self.shift + self.s / self.n
+    
+    @property
+    def std(self) -> float:
+        m = self.s / self.n
+        return float(np.sqrt(max(self.ss / self.n - m * m, 0.0)))
+
+
+class _RollingCorrelation:
+    """Running Pearson correlation of (x, y) pairs over a sliding window"""
+    
+    def __init__(self):
+        self.reset(np.empty(0), np.empty(0))
+    
+    def reset(self, x: np.ndarray, y: np.ndarray, shift: float = 0.0):
+        x = np.asarray(x, dtype=float) - shift
+        y = np.asarray(y, dtype=float) - shift
+        self.shift = shift
+        self.n = len(x)
+        self.sx, self.sy = float(x.sum()), float(y.sum())
+        self.sxx, self.syy = float((x * x).sum()), float((y * y).sum())
+        self.sxy = float((x * y).sum())
+    
+    def add(self, x: float, y: float, sign: int = 1):
+        x -= self.shift
+        y -= self.shift
+        self.n += sign
+        self.sx += sign * x
+        self.sy += sign * y
+        self.sxx += sign * x * x
+        self.syy += sign * y * y
+        self.sxy += sign * x * y
+    
+    def remove(self, x: float, y: float):
+        self.add(x, y, sign=-1)
+    
+    @property
+    def corr(self) -> float:
+        mx, my = self.sx / self.n, self.sy / self.n
+        cov = self.sxy / self.n - mx * my
+        var = (self.sxx / self.n - mx * mx) * (self.syy / self.n - my * my)
+        if var <= 0:
+            return float('nan')  # np.corrcoef is undefined for constant input
+        return float(np.clip(cov / np.sqrt(var), -1, 1))
+
+
+class StreamingEAREngine:
+    """
+    Incremental EAR indicators for one symbol, updated on every price tick.
+    
+    Keeps rolling accumulators (price moments, return moments, lag-20 loop
+    correlation, rolling lag-1 correlations) so push() costs O(window)
+    instead of recomputing EPI/ECI/ETB over the whole history. Output
+    matches EAREngine run on the last `history` prices, using the same
+    windows as /api/market (EPI/ETB on the last 100, ECI on everything).
+    
+    EPI reuses R/S values too: a chunk's R/S depends only on its returns,
+    so each push computes the one new chunk per lag that ends at the newest
+    return (O(max_lag²)) and reads the window's other chunks from a per-lag
+    ring, then refits the log(R/S) slope. Per push that is O(window) for
+    ECI/ETB plus O(max_lag²) for EPI, about 0.4 ms against 1 ms for
+    compute.analyze on 365 points; most of it is fixed NumPy call overhead.
+    """
+    
+    WINDOW = 100          # EPI/ETB window
+    SHORT_VOL = 30
+    LONG_VOL = 365
+    CORR_WINDOW = 20
+    LOOP_LAG = 20
+    RESYNC_EVERY = 1000   # Rebuild accumulators to bound float drift
+    MAX_LAG = 20          # calculate_hurst_exponent's default
+    
+    def __init__(self, symbol: str = None, history: int = 365):
+        if history < self.WINDOW:
+            raise ValueError(f"history must be at least {self.WINDOW}")
+        self.symbol = symbol
+        self.history = history
+        # Contiguous ring buffer holding one extra price for window evictions
+        self._buf = np.empty(2 * (history + 1))
+        self._start = 0
+        self._end = 0
+        self._pushes = 0
+        
+        self._short = _RollingMoments()
+        self._long = _RollingMoments()
+        self._window = _RollingMoments()
+        self._returns = _RollingMoments()
+        self._loop = _RollingCorrelation()
+        self._corrs = deque()
+        self._corr_moments = _RollingMoments()
+        self._corr_nans = 0
+        
+        # R/S of every chunk by (lag, absolute start of its first return)
+        lags, group_starts, chunk_lags, mask, idx = EAREngine._hurst_layout(self.WINDOW, self.MAX_LAG)
+        self._lags = lags
+        self._group_starts = group_starts
+        self._chunk_rows = np.repeat(np.arange(len(lags)), np.diff(np.r_[group_starts, len(chunk_lags)]))
+        self._chunk_starts = idx[:, 0]
+        self._tail_mask = np.arange(lags[-1]) < lags[:, None]
+        self._tail_idx = np.where(self._tail_mask, np.arange(lags[-1]) - lags[:, None], 0)
+        self._rs = np.full((len(lags), 2 * self.WINDOW), np.nan)
+        self._returns_end = 0  # Absolute index after the newest return
+        self._state = None
+    
+    @classmethod
+    def from_prices(cls, prices: np.ndarray, symbol: str = None,
+                    history: int = 365) -> 'StreamingEAREngine':
+        """Seed a stream from an existing price history"""
+        stream = cls(symbol, history)
+        prices = np.asarray(prices, dtype=float)[-(history + 1):]
+        stream._buf[:len(prices)] = prices
+        stream._end = len(prices)
+        stream._rebuild()
+        return stream
+    
+    @property
+    def prices(self) -> np.ndarray:
+        """View of the last `history` prices"""
+        return self._buf[max(self._start, self._end - self.history):self._end]
+    
+    @metrics.timed('engine', 'StreamingEAREngine.push')
+    def push(self, price: float) -> Dict:
+        """Append one price and update all indicators"""
+        prev_len = len(self.prices)
+        
+        if self._end == len(self._buf):
+            keep = self._end - self._start
+            self._buf[:keep] = self._buf[self._start:self._end]
+            self._start, self._end = 0, keep
+        self._buf[self._end] = price
+        self._end += 1
+        if self._end - self._start > self.history + 1:
+            self._start += 1
+        self._pushes += 1
+        
+        if self._pushes % self.RESYNC_EVERY == 0 or self._short.n == 0:
+            self._rebuild()
+        else:
+            self._update(prev_len)
+        return self.snapshot()
+    
+    def snapshot(self) -> Dict:
+        """Current indicators and regime"""
+        if self._state is None:
+            self._state = self._compute()
+        return dict(self._state)
+    
+    def _slide(self, moments: _RollingMoments, size: int, prev_len: int):
+        """Slide a suffix window of `size` prices by the newest one"""
+        buf = self._buf[self._start:self._end]
+        moments.add(buf[-1])
+        if prev_len >= size:
+            moments.remove(buf[-size - 1])
+    
+    def _update(self, prev_len: int):
+        buf = self._buf[self._start:self._end]
+        length = len(self.prices)
+        
+        self._slide(self._short, self.SHORT_VOL, prev_len)
+        self._slide(self._long, min(self.history, self.LONG_VOL), prev_len)
+        self._slide(self._window, self.WINDOW, prev_len)
+        
+        # Returns and loop pairs inside the EPI/ETB window
+        self._returns.add((buf[-1] - buf[-2]) / buf[-2])
+        if prev_len >= self.WINDOW:
+            old = buf[-self.WINDOW - 1]
+            self._returns.remove((buf[-self.WINDOW] - old) / old)
+            self._loop.remove(old, buf[-self.WINDOW - 1 + self.LOOP_LAG])
+        if length > self.LOOP_LAG:
+            self._loop.add(buf[-self.LOOP_LAG - 1], buf[-1])
+        
+        # Rolling lag-1 correlations over the full history
+        span = 2 * self.CORR_WINDOW
+        if length > span:
+            corr = float(EAREngine.lag1_corr(buf[-span - 1:-1][None, :])[0])
+            self._add_corr(corr)
+        if prev_len >= self.history:
+            self._remove_corr(self._corrs.popleft())
+        
+        # R/S of the chunks ending at the new return, one per lag
+        self._returns_end += 1
+        tail = buf[-self._lags[-1] - 1:]
+        tail_returns = np.diff(tail) / tail[:-1]
+        rows = np.flatnonzero(self._lags <= len(tail_returns))  # All of them past the first few ticks
+        lags, mask = self._lags[rows], self._tail_mask[rows]
+        chunks = np.where(mask, tail_returns[self._tail_idx[rows]], 0.0)
+        self._rs[rows, (self._returns_end - lags) % self._rs.shape[1]] = EAREngine.chunk_rs(chunks, lags, mask)
+        
+        self._state = None
+    
+    def _add_corr(self, corr: float):
+        self._corrs.append(corr)
+        if np.isnan(corr):
+            self._corr_nans += 1
+        else:
+            self._corr_moments.add(corr)
+    
+    def _remove_corr(self, corr: float):
+        if np.isnan(corr):
+            self._corr_nans -= 1
+        else:
+            self._corr_moments.remove(corr)
+    
+    def _rebuild(self):
+        """Recompute every accumulator from the buffer"""
+        prices = self.prices
+        window = prices[-self.WINDOW:]
+        shift = float(prices[-1])
+        
+        self._short.reset(prices[-self.SHORT_VOL:], shift)
+        self._long.reset(prices[-self.LONG_VOL:], shift)
+        self._window.reset(window, shift)
+        self._returns.reset(np.diff(window) / window[:-1])
+        self._loop.reset(window[:-self.LOOP_LAG], window[self.LOOP_LAG:], shift)
+        
+        self._corrs = deque()
+        self._corr_moments.reset(np.empty(0))
+        self._corr_nans = 0
+        for corr in EAREngine.rolling_corrs(prices, self.CORR_WINDOW):
+            self._add_corr(float(corr))
+        
+        # R/S of every chunk inside the EPI window; absolute return indices restart at 0
+        returns = np.diff(window) / window[:-1]
+        self._returns_end = len(returns)
+        self._rs.fill(np.nan)
+        width = self._lags[-1]
+        for row, lag in enumerate(self._lags):
+            if lag > len(returns):
+                break
+            chunks = np.zeros((len(returns) - lag + 1, width))
+            chunks[:, :lag] = np.lib.stride_tricks.sliding_window_view(returns, lag)
+            self._rs[row, :len(chunks)] = EAREngine.chunk_rs(chunks, lag, np.arange(width) < lag)
+        
+        self._state = None
+    
+    def _compute(self) -> Dict:
+        prices = self.prices
+        window = prices[-self.WINDOW:]
+        
+        epi = self._epi(window)
+        eci = self._eci(prices)
+        etb = self._etb(window)
+        return {
+            'symbol': self.symbol,
+            'price': float(prices[-1]) if len(prices) else None,
+            'epi': epi,
+            'eci': eci,
+            'etb': etb,
+            'regime': EAREngine.classify_regime(epi, eci, etb)
+        }
+    
+    def _epi(self, window: np.ndarray) -> float:
+        """EAREngine.calculate_hurst_exponent of the window, from the cached chunk R/S"""
+        if len(window) < self.WINDOW:
+            return EAREngine.calculate_hurst_exponent(window)
+        
+        first = self._returns_end - (self.WINDOW - 1)
+        RS = self._rs[self._chunk_rows, (first + self._chunk_starts) % self._rs.shape[1]]
+        returns = np.diff(window) / window[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_rs = EAREngine.mean_log_rs(RS[None, :], self._group_starts)
+            return float(EAREngine.fit_hurst(log_rs, self._lags, returns[None, :])[0])
+    
+    def _eci(self, prices: np.ndarray) -> float:
+        """Same components as EAREngine.calculate_eci, read from accumulators"""
+        if len(prices) < 30:
+            return 0.0
+        
+        long_vol = self._long.std
+        vol_compression = self._short.std / long_vol if long_vol != 0 else 1.0
+        
+        if len(prices) >= 100:
+            if self._corr_nans:
+                corr_instability = float('nan')
+            else:
+                corr_instability = self._corr_moments.std if self._corr_moments.n else 0.0
+        else:
+            corr_instability = 0.0
+        
+        if len(prices) >= 50:
+            short_momentum = (prices[-1] - prices[-10]) / prices[-10]
+            long_momentum = (prices[-1] - prices[-50]) / prices[-50]
+            momentum_div = abs(short_momentum - long_momentum)
+        else:
+            momentum_div = 0.0
+        
+        return EAREngine.combine_eci(vol_compression, corr_instability, momentum_div)
+    
+    def _etb(self, window: np.ndarray) -> float:
+        """Same components as EAREngine.calculate_etb, read from accumulators"""
+        if len(window) < 50:
+            return 0.5
+        
+        returns_std = self._returns.std
+        trend_consistency = abs(self._returns.mean / returns_std) if returns_std != 0 else 0
+        tree_score = min(trend_consistency * 0.3, 0.5)
+        
+        mean_price = self._window.mean
+        mean_reversion = 1 - np.mean(np.abs(window - mean_price)) / mean_price
+        lattice_score = max(mean_reversion * 0.5, 0.2)
+        
+        if len(window) >= 100:
+            loop_score = abs(self._loop.corr) * 0.3
+        else:
+            loop_score = 0.2
+        
+        return EAREngine.combine_etb(tree_score, lattice_score, loop_score)
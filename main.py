@@ -4,370 +4,391 @@ EAR Trader Simulator - Main Backend
 Paper trading application with EAR framework analysis
 """
 
-import json
-import sqlite3
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+import os
+import tempfile
+import time
+from datetime import datetime
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import numpy as np
-import pandas as pd
-import requests
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import backtest
+from alerts import ALERTS_SCHEMA, AlertEngine, parse_rule
+from bars import OHLC_BARS_SCHEMA, RESOLUTIONS, BarStore
+from cache import TTLCache
+from compute import ComputePool
+from db import Database
+from metrics import metrics
+from orders import OrderEngine, OrderRejected, parse_order
+from positions import PORTFOLIO_SNAPSHOTS_SCHEMA, MarkToMarket, PositionBook
+from price_store import PRICE_HISTORY_SCHEMA, PriceStore
+from risk import RiskEngine
+from scanner import MarketScanner
+from sources import SyntheticSource, create_source
+from stream import MarketStream, rounded
+from tagging import TaggingWorker
+from trade_stats import TradeStats, trade_stats_schema
+from warmup import Warmup
+
+if TYPE_CHECKING:
+    import pandas as pd  # Imported on use: it is most of the import time and only this helper needs it
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['Server-Timing'])
+
+# Market data source (sources.py): live (CoinGecko), record (live, also written
+# to EAR_FEED_DIR), replay (the feed in EAR_FEED_DIR, EAR_REPLAY_SPEED times
+# real time; 0 = one tick per price refresh) or synthetic (seeded by EAR_SEED)
+DATA_SOURCE = os.environ.get('EAR_SOURCE', 'live')
+FEED_DIR = os.environ.get('EAR_FEED_DIR', 'data/feeds')
+REPLAY_SPEED = float(os.environ.get('EAR_REPLAY_SPEED', '1'))
+SYNTHETIC_SEED = int(os.environ.get('EAR_SEED', '0'))
+
+# Database setup; offline sources get a scratch database by default, so
+# replayed or synthetic prices never mix into the paper-trading history
+DB_PATH = os.environ.get('EAR_DB_PATH') or (
+    'data/trades.db' if DATA_SOURCE in ('live', 'record')
+    else os.path.join(tempfile.mkdtemp(prefix='ear-'), 'trades.db'))
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Indicator worker processes, one per core by default; 0 computes inline
+# (the default on a single core, where a pool only adds IPC)
+COMPUTE_WORKERS = int(os.environ.get('EAR_COMPUTE_WORKERS',
+                                     os.cpu_count() if (os.cpu_count() or 1) > 1 else 0))
+
+MAX_SCAN_SYMBOLS = 50
+
+# Seconds between background rescans of the watchlist
+SCAN_INTERVAL = 300
+
+# Seconds between mark-to-market snapshots of the portfolio value
+SNAPSHOT_INTERVAL = 60
+
+# Seconds between spot price refreshes of the live stream (/api/stream)
+STREAM_INTERVAL = 5
+
+# Starting USD balance, also the base of the trade statistics equity curve
+INITIAL_CASH = 50000
+
+# Bars the indicators see at any resolution (a year of daily bars)
+HISTORY_BARS = 365
+
+# Maximum bars returned by /api/bars/<symbol>
+MAX_BARS = 10000
 
-# Database setup
-DB_PATH = 'data/trades.db'
+# Default and maximum days of daily returns behind /api/risk
+RISK_WINDOW = 365
+MAX_RISK_WINDOW = 3650
+
+# Warm the watchlist's caches in the background at startup; /api/health/ready
+# reports 503 until done. EAR_WARMUP=0 skips it (ready at once, cold first requests)
+WARMUP = os.environ.get('EAR_WARMUP', '1') != '0'
+
+# Seconds warm-up waits for the scanner's first snapshot
+WARMUP_TIMEOUT = 60
+
+# Default and maximum page size of /api/trades/history
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+# Schema migrations, applied in order (entry i upgrades to user_version i + 1)
+MIGRATIONS = [
+    # 1: Base tables
+    [
+        # Portfolio table
+        '''CREATE TABLE IF NOT EXISTS portfolio
+           (id INTEGER PRIMARY KEY, 
+            asset TEXT, 
+            amount REAL, 
+            avg_price REAL,
+            updated_at TIMESTAMP)''',
+        
+        # Trades table
+        '''CREATE TABLE IF NOT EXISTS trades
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TIMESTAMP,
+            asset TEXT,
+            type TEXT,
+            entry_price REAL,
+            exit_price REAL,
+            amount REAL,
+            pnl_percent REAL,
+            regime TEXT,
+            epi REAL,
+            eci REAL,
+            etb REAL,
+            notes TEXT)''',
+        
+        PRICE_HISTORY_SCHEMA
+    ],
+    # 2: Indexes for history ordering and per-asset lookups
+    [
+        "CREATE INDEX IF NOT EXISTS idx_trades_date ON trades (date)",
+        "CREATE INDEX IF NOT EXISTS idx_portfolio_asset ON portfolio (asset)"
+    ],
+    # 3: Incrementally maintained trade statistics
+    trade_stats_schema(INITIAL_CASH),
+    # 4: Intraday OHLC bars
+    [OHLC_BARS_SCHEMA],
+    # 5: Portfolio value history
+    [PORTFOLIO_SNAPSHOTS_SCHEMA],
+    # 6: Alert rules and fired alerts
+    ALERTS_SCHEMA
+]
+
+db = Database(DB_PATH, MIGRATIONS)
+position_book = PositionBook(db)
 
 def init_db():
     """Initialize SQLite database"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = db.connection()  # Migrates on first use; only a PRAGMA read once the schema is current
     c = conn.cursor()
     
-    # Portfolio table
-    c.execute('''CREATE TABLE IF NOT EXISTS portfolio
-                 (id INTEGER PRIMARY KEY, 
-                  asset TEXT, 
-                  amount REAL, 
-                  avg_price REAL,
-                  updated_at TIMESTAMP)''')
-    
-    # Trades table
-    c.execute('''CREATE TABLE IF NOT EXISTS trades
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  date TIMESTAMP,
-                  asset TEXT,
-                  type TEXT,
-                  entry_price REAL,
-                  exit_price REAL,
-                  amount REAL,
-                  pnl_percent REAL,
-                  regime TEXT,
-                  epi REAL,
-                  eci REAL,
-                  etb REAL,
-                  notes TEXT)''')
-    
     # Initial cash position
     c.execute("SELECT COUNT(*) FROM portfolio WHERE asset='USD'")
     if c.fetchone()[0] == 0:
-        c.execute("INSERT INTO portfolio VALUES (1, 'USD', 50000, 1, ?)", 
-                  (datetime.now(),))
+        c.execute("INSERT INTO portfolio VALUES (1, 'USD', ?, 1, ?)", 
+                  (INITIAL_CASH, datetime.now()))
     
     conn.commit()
-    conn.close()
 
-# EAR Calculations
-class EAREngine:
-    """Core EAR analysis engine"""
+@app.teardown_appcontext
+def release_db(exc):
+    """Never leave a pooled connection inside a half-finished transaction"""
+    db.release()
+
+# Request header opting into a per-request breakdown, returned as Server-Timing
+PROFILE_HEADER = 'X-Profile'
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    if metrics.enabled and request.headers.get(PROFILE_HEADER):
+        g.profile_token = metrics.start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    """Request latency by endpoint; Server-Timing breakdown when profiling"""
+    if metrics.enabled and 'request_start' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('ear_http_request_seconds', (request.method, endpoint, str(response.status_code)),
+                        time.perf_counter() - g.request_start)
+        if 'profile_token' in g:
+            response.headers['Server-Timing'] = metrics.profile().server_timing()
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    if 'profile_token' in g:
+        metrics.stop_profile(g.pop('profile_token'))
+
+# Data fetching
+# Ticker -> CoinGecko coin id, shared by every DataFetcher call
+COINGECKO_IDS = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'SOL': 'solana',
+    'DOGE': 'dogecoin',
+    'XRP': 'ripple'
+}
+
+MOCK_PRICES = {'BTC': 42150, 'ETH': 2240, 'SOL': 98.5}
+
+class DataFetcher:
+    """Fetch market data from the configured source (CoinGecko by default)"""
+    
+    source, recorder = create_source(DATA_SOURCE, COINGECKO_IDS, FEED_DIR, speed=REPLAY_SPEED,
+                                     seed=SYNTHETIC_SEED, levels=MOCK_PRICES)
+    # Deterministic history for symbols the source cannot serve
+    fallback = SyntheticSource(levels=MOCK_PRICES)
+    
+    # Spot prices go stale fast; history only gains one point per day, so
+    # history_cache just throttles tail syncs of the local price store
+    price_cache = TTLCache('spot_price', ttl=10, maxsize=256)
+    history_cache = TTLCache('history', ttl=600, maxsize=64)
+    store = PriceStore(db)
+    bars = BarStore(db)
+    _backfilled = {}  # symbol -> deepest history fetched this process (days)
     
     @staticmethod
-    def calculate_hurst_exponent(prices: np.ndarray, max_lag: int = 20) -> float:
-        """
-        Calculate Hurst exponent using R/S analysis with robust fallback
-        H ≈ 0.5: Random walk
-        H > 0.5: Persistent (trending)
-        H < 0.5: Anti-persistent (mean-reverting)
-        """
+    def get_current_price(symbol: str) -> float:
+        """Get current price for symbol (cached, concurrent misses share one request)"""
+        symbol = symbol.upper()
+        
+        def load():
+            fetched = DataFetcher._fetch_current_prices([symbol])
+            DataFetcher._cache_prices([symbol], fetched)  # Also records it in record mode
+            return fetched[symbol]
+        
         try:
-            if len(prices) < 30:
-                return 0.5
-            
-            lags = range(2, min(max_lag, len(prices)//2))
-            tau = []
-            
-            for lag in lags:
-                std = np.std(prices)
-                if std == 0:
-                    continue
-                
-                mean = np.mean(prices)
-                Y = np.cumsum(prices - mean)
-                R = np.max(Y) - np.min(Y)
-                
-                if R > 0 and std > 0:
-                    RS = R / std
-                    if RS > 0:
-                        tau.append([np.log(lag), np.log(RS)])
-            
-            if len(tau) < 2:
-                # Fallback: autocorrelation method
-                returns = np.diff(prices) / prices[:-1]
-                if len(returns) > 2:
-                    mean_ret = np.mean(returns)
-                    autocorr = np.corrcoef(returns[:-1], returns[1:])[0, 1]
-                    if not np.isnan(autocorr):
-                        return float(np.clip(0.5 + autocorr * 0.25, 0.3, 0.85))
-                return 0.5
-            
-            tau = np.array(tau)
-            poly = np.polyfit(tau[:, 0], tau[:, 1], 1)
-            hurst = float(poly[0])
-            return np.clip(hurst, 0.3, 0.9)
-            
-        except Exception:
-            return 0.5
+            return DataFetcher.price_cache.get_or_load(symbol, load)
+        except:
+            # Fallback mock data
+            return MOCK_PRICES.get(symbol.upper(), 100.0)
     
     @staticmethod
-    def calculate_eci(prices: np.ndarray, volumes: np.ndarray = None) -> float:
+    def get_current_prices(symbols: List[str]) -> Dict[str, float]:
         """
-        Calculate EAR Criticality Index (ECI)
-        Measures proximity to critical threshold
-        ECI > 0.8: Near threshold (transition imminent)
-        ECI < 0.5: Stable
+        Get current prices for many symbols with at most one upstream request.
+        Cached prices are reused; the rest are fetched in one /simple/price call.
         """
-        if len(prices) < 30:
-            return 0.0
-            
-        # Component 1: Volatility compression
-        short_vol = np.std(prices[-30:])
-        long_vol = np.std(prices[-365:] if len(prices) >= 365 else prices)
-        vol_compression = short_vol / long_vol if long_vol != 0 else 1.0
-        
-        # Component 2: Correlation instability (rolling correlation variance)
-        if len(prices) >= 100:
-            window = 20
-            rolling_corrs = []
-            for i in range(window, len(prices) - window):
-                subset = prices[i-window:i+window]
-                corr = np.corrcoef(subset[:-1], subset[1:])[0, 1]
-                rolling_corrs.append(corr)
-            corr_instability = np.std(rolling_corrs) if rolling_corrs else 0.0
-        else:
-            corr_instability = 0.0
-        
-        # Component 3: Price momentum divergence
-        if len(prices) >= 50:
-            short_momentum = (prices[-1] - prices[-10]) / prices[-10]
-            long_momentum = (prices[-1] - prices[-50]) / prices[-50]
-            momentum_div = abs(short_momentum - long_momentum)
-        else:
-            momentum_div = 0.0
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            price = DataFetcher.price_cache.get(symbol)
+            if price is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = price
         
-        # Weighted combination
-        eci = (0.4 * vol_compression + 
-               0.3 * corr_instability * 10 +  # Scale up
-               0.3 * momentum_div * 5)  # Scale up
+        if missing:
+            prices.update(DataFetcher.refresh_prices(missing))
         
-        return min(max(eci, 0.0), 1.0)  # Clamp to [0, 1]
+        return prices
     
     @staticmethod
-    def calculate_etb(prices: np.ndarray) -> float:
+    def refresh_prices(symbols: List[str]) -> Dict[str, float]:
+        """Fetch spot prices in one request regardless of the cache, then cache them"""
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        try:
+            fetched = DataFetcher._fetch_current_prices(symbols)
+        except Exception:
+            fetched = {}
+        return DataFetcher._cache_prices(symbols, fetched)
+    
+    @staticmethod
+    def _cache_prices(symbols: List[str], fetched: Dict[str, float]) -> Dict[str, float]:
+        """Cache fetched prices; symbols the upstream did not return get mock prices"""
+        if DataFetcher.recorder is not None:
+            DataFetcher.recorder.prices(fetched)
+        prices = {}
+        for symbol in symbols:
+            if symbol in fetched:
+                DataFetcher.price_cache.put(symbol, fetched[symbol])
+                prices[symbol] = fetched[symbol]
+            else:
+                # Fallback mock data
+                prices[symbol] = MOCK_PRICES.get(symbol, 100.0)
+        return prices
+    
+    @staticmethod
+    @metrics.timed('upstream', 'simple_price')
+    def _fetch_current_prices(symbols: List[str]) -> Dict[str, float]:
+        """One source request for all symbols; unknown ids are left out"""
+        return DataFetcher.source.current_prices(symbols)
+    
+    @staticmethod
+    def get_price_history(symbol: str, days: int = 365) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calculate EAR Topology Balance (ETB)
-        Measures structural health of the system
-        ETB > 0.6: Healthy balanced structure
-        ETB < 0.4: Degraded structure
-        
-        For price data, we approximate topology from:
-        - Tree: trend consistency (hierarchy)
-        - Lattice: mean reversion (network)
-        - Loop: cyclical patterns (feedback)
+        Last `days` daily points as (timestamps in ms, float64 prices).
+        Served from the local price store, whose tail is synced with CoinGecko
+        at most once per history_cache TTL. The arrays are views into the
+        store and must not be mutated.
         """
-        if len(prices) < 50:
-            return 0.5
-            
-        # Tree score: trend consistency
-        returns = np.diff(prices) / prices[:-1]
-        trend_consistency = abs(np.mean(returns) / np.std(returns)) if np.std(returns) != 0 else 0
-        tree_score = min(trend_consistency * 0.3, 0.5)
-        
-        # Lattice score: mean reversion strength
-        mean_price = np.mean(prices)
-        deviations = abs(prices - mean_price) / mean_price
-        mean_reversion = 1 - np.mean(deviations)
-        lattice_score = max(mean_reversion * 0.5, 0.2)
-        
-        # Loop score: cyclical pattern (simple autocorrelation)
-        if len(prices) >= 100:
-            lag = 20
-            autocorr = np.corrcoef(prices[:-lag], prices[lag:])[0, 1]
-            loop_score = abs(autocorr) * 0.3
-        else:
-            loop_score = 0.2
-        
-        # Balance: ideally each component ~33%
-        total = tree_score + lattice_score + loop_score
-        if total == 0:
-            return 0.5
-            
-        # Normalized scores
-        tree_norm = tree_score / total
-        lattice_norm = lattice_score / total
-        loop_norm = loop_score / total
-        
-        # ETB: how close to perfect balance (0.33, 0.33, 0.33)
-        ideal = 1/3
-        deviation = (abs(tree_norm - ideal) + 
-                     abs(lattice_norm - ideal) + 
-                     abs(loop_norm - ideal)) / 2
+        symbol = symbol.upper()
+        try:
+            DataFetcher.history_cache.get_or_load(
+                (symbol, days), lambda: DataFetcher._sync_history(symbol, days))
+        except Exception as e:
+            print(f"Error fetching data: {e}")
         
-        etb = 1 - deviation
-        return max(min(etb, 1.0), 0.0)
+        return DataFetcher._stored_history(symbol, days)
+    
+    @staticmethod
+    def _stored_history(symbol: str, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Last `days` points from the store, or seeded mock data if it has none"""
+        timestamps, prices = DataFetcher.store.get(symbol)
+        if len(prices) == 0:
+            # Same series on every call, ending at the mock spot price
+            return DataFetcher.fallback.market_chart(symbol, days)
+        return timestamps[-days:], prices[-days:]
     
     @staticmethod
-    def classify_regime(epi: float, eci: float, etb: float) -> str:
+    def get_bar_history(symbol: str, resolution: str = '1d',
+                        bars: int = HISTORY_BARS) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Classify market regime using EAR framework
-        Returns symbol notation (e.g., Σ₂₃₂₊)
+        Last `bars` closes at a resolution (see bars.RESOLUTIONS). Daily
+        history comes from CoinGecko as before; intraday bars only exist for
+        ingested data (bars.py), and are empty otherwise.
         """
-        # Simplified regime classification
-        if epi > 0.75 and eci < 0.6:
-            return "Σ₂₃₂₊"  # Spirale - Strong trend
-        elif epi > 0.65 and eci < 0.5:
-            return "Σ₂₃₂₊"  # Spirale - Moderate trend
-        elif epi > 0.75 and eci > 0.75:
-            return "Σ₃₃₁₊"  # Espansione - Exhaustion
-        elif epi < 0.55:
-            return "Σ₁₁₁₋"  # Continuità - Ranging
-        elif eci > 0.75:
-            return "Σ₄₁₃₊"  # Evento - Breakout imminent
-        elif epi > 0.6 and eci < 0.5:
-            return "Σ₁₃₁₊"  # Avanzamento - Early trend
-        elif etb < 0.4:
-            return "Σ₃₃₃₋"  # Dissoluzione - Structure breakdown
-        else:
-            return "Σ₁₂₃₊"  # Transizione - Uncertain
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution} (use {', '.join(RESOLUTIONS)})")
+        if resolution == '1d':
+            return DataFetcher.get_price_history(symbol, days=bars)
+        return DataFetcher.bars.closes(symbol.upper(), resolution, bars)
     
     @staticmethod
-    def get_recommendation(epi: float, eci: float, etb: float, 
-                          regime: str, current_position: str = None) -> Dict:
-        """Generate trading recommendation based on EAR indicators"""
-        
-        # Default: no position
-        if current_position is None:
-            if regime in ["Σ₂₃₂₊", "Σ₁₃₁₊"] and eci < 0.6 and etb > 0.5:
-                return {
-                    "action": "ENTER_LONG",
-                    "confidence": "HIGH",
-                    "rationale": [
-                        f"EPI={epi:.2f} confirms persistence",
-                        f"ECI={eci:.2f} safe from threshold",
-                        f"ETB={etb:.2f} structure healthy"
-                    ]
-                }
-            elif regime == "Σ₄₁₃₊" and eci > 0.75:
-                return {
-                    "action": "PREPARE_BREAKOUT",
-                    "confidence": "MEDIUM",
-                    "rationale": [
-                        f"ECI={eci:.2f} near threshold",
-                        "Breakout imminent (direction uncertain)"
-                    ]
-                }
-            else:
-                return {
-                    "action": "WAIT",
-                    "confidence": "HIGH",
-                    "rationale": [
-                        f"Regime {regime} not favorable for entry"
-                    ]
-                }
-        
-        # Has long position
-        elif current_position == "LONG":
-            if epi > 0.85 or eci > 0.8:
-                return {
-                    "action": "EXIT",
-                    "confidence": "HIGH",
-                    "rationale": [
-                        f"EPI={epi:.2f} exhaustion zone" if epi > 0.85 else "",
-                        f"ECI={eci:.2f} threshold approaching" if eci > 0.8 else ""
-                    ]
-                }
-            elif etb < 0.4:
-                return {
-                    "action": "REDUCE_50%",
-                    "confidence": "MEDIUM",
-                    "rationale": [
-                        f"ETB={etb:.2f} structure degrading"
-                    ]
-                }
-            else:
-                return {
-                    "action": "HOLD",
-                    "confidence": "HIGH",
-                    "rationale": [
-                        f"EPI={epi:.2f} trend intact",
-                        f"ECI={eci:.2f} stable",
-                        f"ETB={etb:.2f} healthy"
-                    ]
-                }
-        
-        return {"action": "HOLD", "confidence": "MEDIUM", "rationale": ["Default"]}
-
-# Data fetching
-class DataFetcher:
-    """Fetch real market data from public APIs"""
+    def get_historical_prices(symbol: str, days: int = 365) -> 'pd.DataFrame':
+        """Get historical price data as a DataFrame (see get_price_history)"""
+        import pandas as pd
+        timestamps, prices = DataFetcher.get_price_history(symbol, days)
+        return pd.DataFrame({'timestamp': pd.to_datetime(timestamps, unit='ms'), 'price': prices})
     
-    COINGECKO_BASE = "https://api.coingecko.com/api/v3"
+    @staticmethod
+    def _sync_history(symbol: str, days: int) -> bool:
+        """Fetch only the missing tail (or a full backfill when the store is short)"""
+        fetch_days = DataFetcher._missing_days(symbol, days)
+        timestamps, prices = DataFetcher._fetch_market_chart(symbol, fetch_days)
+        return DataFetcher._store_history(symbol, timestamps, prices, fetch_days)
     
     @staticmethod
-    def get_current_price(symbol: str) -> float:
-        """Get current price for symbol"""
-        symbol_map = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'SOL': 'solana',
-            'DOGE': 'dogecoin',
-            'XRP': 'ripple'
-        }
-        
-        coin_id = symbol_map.get(symbol.upper(), symbol.lower())
-        
-        try:
-            url = f"{DataFetcher.COINGECKO_BASE}/simple/price"
-            params = {'ids': coin_id, 'vs_currencies': 'usd'}
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
-            return data[coin_id]['usd']
-        except:
-            # Fallback mock data
-            mock_prices = {'BTC': 42150, 'ETH': 2240, 'SOL': 98.5}
-            return mock_prices.get(symbol.upper(), 100.0)
+    def _missing_days(symbol: str, days: int) -> int:
+        """How many days of history a sync has to fetch"""
+        last = DataFetcher.store.last_timestamp(symbol)
+        stored = len(DataFetcher.store.get(symbol)[1])
+        if last is None or (stored < days and DataFetcher._backfilled.get(symbol, 0) < days):
+            return days
+        now = int(datetime.now().timestamp() * 1000)
+        return max(1, -(-(now - last) // DAY_MS) + 1)
     
     @staticmethod
-    def get_historical_prices(symbol: str, days: int = 365) -> pd.DataFrame:
-        """Get historical OHLCV data"""
-        symbol_map = {
-            'BTC': 'bitcoin',
-            'ETH': 'ethereum',
-            'SOL': 'solana'
-        }
+    def _store_history(symbol: str, timestamps: np.ndarray, prices: np.ndarray,
+                       fetch_days: int) -> bool:
+        """Write fetched points to the store, one per UTC day"""
+        # One point per UTC day; the latest quote of a day wins
+        day_starts = timestamps - timestamps % DAY_MS
+        unique_days, last_index = np.unique(day_starts[::-1], return_index=True)
+        DataFetcher.store.append(symbol, unique_days, prices[::-1][last_index])
+        if DataFetcher.recorder is not None:
+            DataFetcher.recorder.history(symbol, timestamps, prices)
         
-        coin_id = symbol_map.get(symbol.upper(), symbol.lower())
-        
-        try:
-            url = f"{DataFetcher.COINGECKO_BASE}/coins/{coin_id}/market_chart"
-            params = {'vs_currency': 'usd', 'days': days}
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            prices = data['prices']
-            df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
-        except Exception as e:
-            print(f"Error fetching data: {e}")
-            # Return mock data
-            dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
-            # Generate realistic-looking price data
-            base = 40000 if symbol == 'BTC' else 2000
-            noise = np.random.randn(days).cumsum() * (base * 0.01)
-            prices = base + noise
-            return pd.DataFrame({'timestamp': dates, 'price': prices})
-
-# API Endpoints
-@app.route('/api/portfolio', methods=['GET'])
-def get_portfolio():
-    """Get current portfolio state"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT asset, amount, avg_price FROM portfolio")
-    rows = c.fetchall()
-    conn.close()
+        DataFetcher._backfilled[symbol] = max(DataFetcher._backfilled.get(symbol, 0), fetch_days)
+        return True
     
+    @staticmethod
+    @metrics.timed('upstream', 'market_chart')
+    def _fetch_market_chart(symbol: str, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        return DataFetcher.source.market_chart(symbol, days)
+    
+    @staticmethod
+    def cache_stats() -> List[Dict]:
+        """Hit/miss/latency counters for the upstream caches"""
+        return [DataFetcher.price_cache.stats(), DataFetcher.history_cache.stats()]
+
+# Response payloads, shared by the Flask routes and the ASGI app (asgi.py)
+def portfolio_rows() -> List[Tuple[str, float, float]]:
+    """(asset, amount, avg_price) for every position, from the in-memory book"""
+    return position_book.rows()
+
+def held_assets(rows: List[Tuple[str, float, float]]) -> List[str]:
+    """Assets that need a spot price to be valued"""
+    return [asset for asset, _, _ in rows if asset != 'USD']
+
+def risk_window(arg: str) -> int:
+    """Days of a ?window= query"""
+    try:
+        window = int(arg) if arg else RISK_WINDOW
+    except ValueError:
+        raise ValueError('Invalid window')
+    if not 2 <= window <= MAX_RISK_WINDOW:
+        raise ValueError(f'window must be between 2 and {MAX_RISK_WINDOW} days')
+    return window
+
+def portfolio_payload(rows: List[Tuple[str, float, float]], prices: Dict[str, float]) -> Dict:
+    """Portfolio valuation from its rows and the spot prices of held assets"""
     portfolio = []
     total_value = 0
     
@@ -381,7 +402,7 @@ def get_portfolio():
             })
             total_value += amount
         else:
-            current_price = DataFetcher.get_current_price(asset)
+            current_price = prices[asset.upper()]
             value = amount * current_price
             pnl = ((current_price - avg_price) / avg_price * 100) if avg_price > 0 else 0
             
@@ -395,189 +416,526 @@ def get_portfolio():
             })
             total_value += value
     
-    return jsonify({
+    return {
         'portfolio': portfolio,
         'total_value': total_value
-    })
+    }
+
+def analysis_payload(symbol: str, current_price: float, indicators: Dict) -> Dict:
+    """Rounded EAR indicators, regime and recommendation (see compute.analyze)"""
+    return {
+        'symbol': symbol,
+        'current_price': current_price,
+        'epi': rounded(indicators['epi']),
+        'eci': rounded(indicators['eci']),
+        'etb': rounded(indicators['etb']),
+        'regime': indicators['regime'],
+        'recommendation': indicators['recommendation']
+    }
+
+def market_payload(symbol: str, current_price: float, timestamps: np.ndarray,
+                   prices: np.ndarray, indicators: Dict, resolution: str = '1d') -> Dict:
+    """EAR analysis of a symbol plus its last 30 bars (days by default)"""
+    payload = analysis_payload(symbol, current_price, indicators)
+    payload['resolution'] = resolution
+    payload['price_history'] = [{'timestamp': datetime.utcfromtimestamp(ts / 1000), 'price': float(price)}
+                                for ts, price in zip(timestamps[-30:].tolist(), prices[-30:])]
+    return payload
+
+def scan_symbols(arg: str) -> List[str]:
+    """Symbols of a ?symbols=BTC,ETH query (all known symbols when empty)"""
+    symbols = list(dict.fromkeys(s.strip().upper() for s in (arg or '').split(',') if s.strip()))
+    if not symbols:
+        symbols = list(COINGECKO_IDS)
+    if len(symbols) > MAX_SCAN_SYMBOLS:
+        raise ValueError(f'At most {MAX_SCAN_SYMBOLS} symbols per scan')
+    return symbols
+
+def scan_payload(symbols: List[str], prices: Dict[str, float], indicators: List[Dict]) -> Dict:
+    return {'results': [analysis_payload(symbol, prices[symbol], analysis)
+                        for symbol, analysis in zip(symbols, indicators)]}
+
+compute_pool = ComputePool(COMPUTE_WORKERS)
+
+# Indicators per history tail: bars only change at the end, so the same
+# length, last bar and last close mean the same result
+indicator_cache = TTLCache('indicators', ttl=600, maxsize=256)
+
+def market_indicators(symbol: str, resolution: str, timestamps: np.ndarray, prices: np.ndarray) -> Dict:
+    """EAR indicators of a symbol's bars (see compute.analyze), computed on the pool on a miss"""
+    key = (symbol.upper(), resolution, len(prices), int(timestamps[-1]), float(prices[-1]))
+    return indicator_cache.get_or_load(key, lambda: compute_pool.analyze(prices))
+
+# API Endpoints
+@app.route('/api/portfolio', methods=['GET'])
+def get_portfolio():
+    """Get current portfolio state"""
+    rows = portfolio_rows()
+    
+    # One upstream round trip for all held assets
+    prices = DataFetcher.get_current_prices(held_assets(rows))
+    
+    return jsonify(portfolio_payload(rows, prices))
 
 @app.route('/api/market/<symbol>', methods=['GET'])
 def get_market_data(symbol):
-    """Get current market data and EAR analysis for symbol"""
+    """
+    Get current market data and EAR analysis for symbol.
+    Query: ?resolution=1m|5m|1h|1d (default 1d); indicators run on the last
+    HISTORY_BARS bars, so their windows are counted in bars of that size.
+    """
+    resolution = request.args.get('resolution', '1d')
     
     # Fetch data
+    try:
+        timestamps, prices = DataFetcher.get_bar_history(symbol, resolution)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(prices) == 0:
+        return jsonify({'error': f'No {resolution} bars for {symbol}'}), 404
     current_price = DataFetcher.get_current_price(symbol)
-    hist_df = DataFetcher.get_historical_prices(symbol, days=365)
-    prices = hist_df['price'].values
     
-    # Calculate EAR indicators
-    engine = EAREngine()
-    epi = engine.calculate_hurst_exponent(prices[-100:])  # Last 100 days
-    eci = engine.calculate_eci(prices)
-    etb = engine.calculate_etb(prices[-100:])
-    regime = engine.classify_regime(epi, eci, etb)
+    # Calculate EAR indicators (on the compute pool, unless cached)
+    indicators = market_indicators(symbol, resolution, timestamps, prices)
     
-    # Get recommendation
-    recommendation = engine.get_recommendation(epi, eci, etb, regime)
+    return jsonify(market_payload(symbol, current_price, timestamps, prices, indicators, resolution))
+
+@app.route('/api/bars/<symbol>', methods=['GET'])
+def get_bars(symbol):
+    """OHLC bars of ingested data. Query: ?resolution=1h&limit=500"""
+    try:
+        limit = int(request.args.get('limit', 500))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    if not 1 <= limit <= MAX_BARS:
+        return jsonify({'error': f'Invalid limit (use 1 to {MAX_BARS})'}), 400
+    try:
+        timestamps, open_, high, low, close = DataFetcher.bars.get(
+            symbol.upper(), request.args.get('resolution', '1h'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'symbol': symbol,
-        'current_price': current_price,
-        'epi': round(epi, 3),
-        'eci': round(eci, 3),
-        'etb': round(etb, 3),
-        'regime': regime,
-        'recommendation': recommendation,
-        'price_history': hist_df.tail(30).to_dict('records')
+        'symbol': symbol.upper(),
+        'resolution': request.args.get('resolution', '1h'),
+        'bars': [{'timestamp': ts, 'open': o, 'high': h, 'low': l, 'close': c}
+                 for ts, o, h, l, c in zip(timestamps.tolist(), open_.tolist(), high.tolist(),
+                                           low.tolist(), close.tolist())]
     })
 
-@app.route('/api/trade', methods=['POST'])
-def execute_trade():
-    """Execute a paper trade"""
-    data = request.json
+@app.route('/api/bars/<symbol>', methods=['POST'])
+def ingest_bars(symbol):
+    """
+    Add ticks or minute prices to the symbol's bars.
+    Body: {"timestamps": [ms, ...], "prices": [...]}, oldest first
+    """
+    data = request.json or {}
+    try:
+        timestamps = np.asarray(data['timestamps'], dtype=np.int64)
+        prices = np.asarray(data['prices'], dtype=np.float64)
+        if len(timestamps) != len(prices) or len(prices) == 0:
+            raise ValueError('timestamps and prices must be non-empty and of equal length')
+        written = DataFetcher.bars.ingest(symbol, timestamps, prices)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid ticks: {e}'}), 400
     
-    asset = data['asset']
-    trade_type = data['type']  # 'BUY' or 'SELL'
-    amount = float(data['amount'])
-    price = float(data['price'])
+    return jsonify({'symbol': symbol.upper(), 'ticks': len(prices), 'bars_written': written})
+
+@app.route('/api/market/scan', methods=['GET'])
+def scan_market():
+    """
+    EAR analysis of many symbols at once, computed across the pool workers.
+    Query: ?symbols=BTC,ETH,SOL (defaults to every known symbol)
+    """
+    try:
+        symbols = scan_symbols(request.args.get('symbols'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    prices = DataFetcher.get_current_prices(symbols)
+    histories = [DataFetcher.get_price_history(symbol, days=365)[1] for symbol in symbols]
+    indicators = compute_pool.analyze_many(histories)
     
-    if trade_type == 'BUY':
-        # Check USD balance
-        c.execute("SELECT amount FROM portfolio WHERE asset='USD'")
-        usd_balance = c.fetchone()[0]
-        
-        cost = amount * price
-        if cost > usd_balance:
-            conn.close()
-            return jsonify({'error': 'Insufficient USD balance'}), 400
-        
-        # Update USD
-        c.execute("UPDATE portfolio SET amount = amount - ? WHERE asset='USD'", (cost,))
-        
-        # Update asset
-        c.execute("SELECT amount, avg_price FROM portfolio WHERE asset=?", (asset,))
-        row = c.fetchone()
-        
-        if row:
-            old_amount, old_avg = row
-            new_amount = old_amount + amount
-            new_avg = ((old_amount * old_avg) + (amount * price)) / new_amount
-            c.execute("UPDATE portfolio SET amount=?, avg_price=?, updated_at=? WHERE asset=?",
-                     (new_amount, new_avg, datetime.now(), asset))
-        else:
-            c.execute("INSERT INTO portfolio VALUES (NULL, ?, ?, ?, ?)",
-                     (asset, amount, price, datetime.now()))
+    return jsonify(scan_payload(symbols, prices, indicators))
+
+scanner = MarketScanner(DataFetcher.get_price_history, COINGECKO_IDS, interval=SCAN_INTERVAL)
+
+@app.route('/api/scan', methods=['GET'])
+def scan_watchlist():
+    """
+    Ranked EAR scan of the watchlist from the scanner's last refresh.
+    Query: ?symbols=BTC,ETH (default: whole watchlist), ?threshold=0.8
+    (ECI level for near_threshold), ?top=5
+    Unknown symbols are listed as pending and join the next refresh.
+    """
+    try:
+        symbols = scan_symbols(request.args['symbols']) if request.args.get('symbols') else None
+        threshold = float(request.args['threshold']) if 'threshold' in request.args else None
+        top = int(request.args.get('top', 5))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    elif trade_type == 'SELL':
-        # Check asset balance
-        c.execute("SELECT amount, avg_price FROM portfolio WHERE asset=?", (asset,))
-        row = c.fetchone()
-        
-        if not row or row[0] < amount:
-            conn.close()
-            return jsonify({'error': f'Insufficient {asset} balance'}), 400
-        
-        old_amount, avg_price = row
-        proceeds = amount * price
-        
-        # Update asset
-        new_amount = old_amount - amount
-        if new_amount == 0:
-            c.execute("DELETE FROM portfolio WHERE asset=?", (asset,))
-        else:
-            c.execute("UPDATE portfolio SET amount=?, updated_at=? WHERE asset=?",
-                     (new_amount, datetime.now(), asset))
-        
-        # Update USD
-        c.execute("UPDATE portfolio SET amount = amount + ? WHERE asset='USD'", (proceeds,))
-        
-        # Record trade for history
-        pnl = ((price - avg_price) / avg_price * 100)
-        
-        # Get current EAR indicators
-        hist_df = DataFetcher.get_historical_prices(asset)
-        prices = hist_df['price'].values
-        engine = EAREngine()
-        epi = engine.calculate_hurst_exponent(prices[-100:])
-        eci = engine.calculate_eci(prices)
-        etb = engine.calculate_etb(prices[-100:])
-        regime = engine.classify_regime(epi, eci, etb)
+    scanner.start()
+    return jsonify(scanner.scan(symbols, threshold, top))
+
+@app.route('/api/scan/status', methods=['GET'])
+def get_scan_status():
+    """Refresh count, duration and age of the scanner snapshot"""
+    return jsonify(scanner.stats())
+
+def stream_symbols() -> List[str]:
+    """Watchlist plus held assets and alerted symbols, so the stream can value and check them"""
+    scanner.watch(held_assets(portfolio_rows()) + alert_engine.symbols())
+    return scanner.symbols
+
+def stream_indicators() -> Dict[str, Dict]:
+    scanner.start()
+    snapshot = scanner.snapshot()
+    return snapshot['rows'] if snapshot else {}
+
+market_stream = MarketStream(stream_symbols, DataFetcher.refresh_prices, stream_indicators,
+                             interval=STREAM_INTERVAL)
+
+# Stream deltas are checked against the alert rules; fired alerts go back out on the stream
+alert_engine = AlertEngine(db, on_alerts=lambda events: market_stream.publish('alert', events))
+market_stream.listen(alert_engine.submit, active=alert_engine.active)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_market():
+    """
+    Server-Sent Events: a `snapshot` of prices and indicators for every
+    watched symbol, then `update` events carrying only what changed.
+    """
+    subscription = market_stream.subscribe()
+    
+    def events():
+        try:
+            while True:
+                message = subscription.get(timeout=market_stream.keepalive)
+                if message is None:
+                    break
+                yield message
+        finally:
+            market_stream.unsubscribe(subscription)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alert_rules():
+    """Alert rules and evaluation counters"""
+    return jsonify({'rules': alert_engine.rules(), 'stats': alert_engine.stats()})
+
+@app.route('/api/alerts', methods=['POST'])
+def create_alert_rule():
+    """
+    Add a rule: {"symbol": "BTC" or "*", "field": "eci", "condition": "above",
+    "threshold": 0.75} (above/below on current_price, epi, eci, etb), or
+    {"field": "regime", "condition": "changes", "from": ..., "to": ...}
+    with from/to optional. Fired alerts arrive as `alert` stream events.
+    """
+    try:
+        rule = parse_rule(request.json or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rule = alert_engine.add(rule)
+    market_stream.start()
+    return jsonify(rule), 201
+
+@app.route('/api/alerts/<int:rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    if not alert_engine.remove(rule_id):
+        return jsonify({'error': f'No alert rule {rule_id}'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/alerts/events', methods=['GET'])
+def get_alert_events():
+    """Fired alerts, newest first. Query: ?since=<event id>&limit=50"""
+    try:
+        since = request.args.get('since', type=int)
+        limit = min(int(request.args.get('limit', 50)), 1000)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return jsonify({'events': alert_engine.events(since, limit)})
+
+@app.route('/api/stream/status', methods=['GET'])
+def get_stream_status():
+    """Subscribers, tick count and timing of the live stream"""
+    return jsonify(market_stream.stats())
+
+@metrics.collector
+def service_metrics():
+    """Cache, queue and background loop counters for /api/metrics"""
+    caches = DataFetcher.cache_stats() + [indicator_cache.stats(), risk_engine.cache.stats()]
+    for field in ('hits', 'misses', 'coalesced', 'evictions', 'errors'):
+        yield (f'ear_cache_{field}_total', 'counter', f'Cache {field}',
+               [({'cache': c['name']}, c[field]) for c in caches])
+    yield ('ear_cache_entries', 'gauge', 'Entries held per cache',
+           [({'cache': c['name']}, c['size']) for c in caches])
+    
+    tagging = tagging_worker.stats()
+    yield ('ear_tagging_queue_depth', 'gauge', 'Closed trades waiting for indicator tags',
+           [({}, tagging['depth'])])
+    yield ('ear_tagging_oldest_pending_seconds', 'gauge', 'Age of the oldest untagged trade',
+           [({}, tagging['oldest_pending_s'])])
+    
+    scan = scanner.stats()
+    yield ('ear_scanner_refreshes_total', 'counter', 'Scanner matrix refreshes', [({}, scan['refreshes'])])
+    yield ('ear_scanner_failures_total', 'counter', 'Failed scanner refreshes', [({}, scan['failures'])])
+    if scan['age_s'] is not None:
+        yield ('ear_scanner_snapshot_age_seconds', 'gauge', 'Age of the scanner snapshot',
+               [({}, scan['age_s'])])
+    
+    stream = market_stream.stats()
+    yield ('ear_stream_subscribers', 'gauge', 'Connected /api/stream clients', [({}, stream['subscribers'])])
+    yield ('ear_stream_dropped_total', 'counter', 'Stream subscribers dropped for falling behind',
+           [({}, stream['dropped'])])
+    
+    book = position_book.stats()
+    yield ('ear_positions_dirty', 'gauge', 'Positions changed but not yet written to SQLite',
+           [({}, book['dirty'])])
+    yield ('ear_position_flushes_total', 'counter', 'Write-behind flushes of the position book',
+           [({}, book['flushes'])])
+    yield ('ear_position_flush_errors_total', 'counter', 'Failed position book flushes',
+           [({}, book['flush_errors'])])
+    
+    alerts = alert_engine.stats()
+    yield ('ear_alert_queue_depth', 'gauge', 'Stream updates waiting for alert evaluation',
+           [({}, alerts['depth'])])
+    yield ('ear_alert_rules_checked_total', 'counter', 'Alert rules checked against updates',
+           [({}, alerts['candidates'])])
+    yield ('ear_alerts_fired_total', 'counter', 'Alerts fired', [({}, alerts['fired'])])
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus text format: ear_operation_seconds{kind, name} splits time
+    between upstream (CoinGecko), db (SQLite), engine (indicator math) and
+    compute (pool round trips); ear_http_request_seconds is per endpoint.
+    Engine methods nest (calculate_eci includes rolling_corr_instability),
+    so their times overlap. EAR_METRICS=0 disables collection.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def current_indicators(asset: str) -> Tuple[str, float, float, float]:
+    """Regime and EAR indicators used to tag closed trades"""
+    timestamps, prices = DataFetcher.get_price_history(asset)
+    indicators = market_indicators(asset, '1d', timestamps, prices)
+    return indicators['regime'], indicators['epi'], indicators['eci'], indicators['etb']
+
+tagging_worker = TaggingWorker(db, tagger=current_indicators)
+trade_stats = TradeStats(db)
+order_engine = OrderEngine(db, position_book, on_trades=tagging_worker.submit)
+mark_to_market = MarkToMarket(position_book, DataFetcher.get_current_prices, db, interval=SNAPSHOT_INTERVAL)
+
+@app.route('/api/portfolio/history', methods=['GET'])
+def get_portfolio_history():
+    """
+    Recorded portfolio values (mark-to-market every SNAPSHOT_INTERVAL s)
+    with running peak and drawdown. Query: ?since=<ms>&limit=1000
+    """
+    try:
+        since = request.args.get('since', type=int)
+        limit = min(int(request.args.get('limit', 1000)), 10000)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    snapshots = mark_to_market.history(since, limit)
+    return jsonify({
+        'snapshots': snapshots,
+        'max_drawdown': snapshots[-1]['max_drawdown'] if snapshots else 0,
+        'book': position_book.stats()
+    })
+
+risk_engine = RiskEngine()
+
+@app.route('/api/risk', methods=['GET'])
+def get_risk():
+    """
+    VaR/CVaR (historical and parametric, one day), rolling volatility and
+    return correlations of the held assets over ?window= days of history
+    """
+    try:
+        window = risk_window(request.args.get('window'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    holdings = {asset: amount for asset, amount, _ in portfolio_rows() if asset != 'USD'}
+    histories = {asset: DataFetcher.get_price_history(asset, days=window + 1) for asset in holdings}
+    return jsonify(risk_engine.report(holdings, histories, window))
+
+@app.route('/api/backtest', methods=['POST'])
+def run_backtest():
+    """
+    Replay EAR regimes and recommendations over history.
+    Body: {"symbol": "BTC", "days": 1095, "prices": [...] (optional, overrides symbol),
+           "thresholds": {...}, "lookback": 365, "cost_bps": 10, "include_curve": true,
+           "grid": {"exit_eci": [0.7, 0.8]} (optional: threshold sweep instead)}
+    """
+    data = request.json or {}
+    try:
+        symbol = str(data.get('symbol', 'BTC'))
+        lookback = int(data.get('lookback', 365))
+        cost_bps = float(data.get('cost_bps', 10.0))
+        days = int(data.get('days', 1095))
+        top = int(data.get('top', 20))
+        prices = np.asarray(data['prices'], dtype=float) if data.get('prices') else None
+        thresholds, grid = data.get('thresholds') or {}, data.get('grid') or {}
+        if not isinstance(thresholds, dict) or not isinstance(grid, dict):
+            raise ValueError('thresholds and grid must be objects')
+        thresholds = {key: float(value) for key, value in thresholds.items()} or None
+        grid = {key: [float(value) for value in values] for key, values in grid.items()}
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid backtest parameters: {e}'}), 400
+    
+    if prices is None:
+        _, prices = DataFetcher.get_price_history(symbol, days=days)
+    
+    try:
+        if grid:
+            results = backtest.sweep({symbol: prices}, grid, lookback, cost_bps)
+            return jsonify({'symbol': symbol, 'results': results[:top]})
         
-        c.execute("""INSERT INTO trades 
-                     (date, asset, type, entry_price, exit_price, amount, pnl_percent, 
-                      regime, epi, eci, etb, notes)
-                     VALUES (?, ?, 'LONG', ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                  (datetime.now(), asset, avg_price, price, amount, pnl, 
-                   regime, epi, eci, etb, f"Paper trade executed"))
+        result = backtest.run_backtest(prices, thresholds, lookback, cost_bps)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    conn.commit()
-    conn.close()
+    return jsonify(dict(backtest.summarize(result, bool(data.get('include_curve', True))),
+                        symbol=symbol))
+
+@app.route('/api/trade', methods=['POST'])
+def execute_trade():
+    """Execute a paper trade"""
+    try:
+        order = parse_order(request.json or {})
+        result = order_engine.submit(order)
+    except (ValueError, OrderRejected) as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({'success': True, 'message': f'{trade_type} executed'})
+    return jsonify(result)
+
+@app.route('/api/trades/batch', methods=['POST'])
+def execute_trade_batch():
+    """
+    Execute many paper trades in one transaction.
+    Body: {"orders": [{asset, type, amount, price}, ...], "atomic": false}
+    With atomic=true a single rejected order rolls back the whole batch.
+    """
+    data = request.json or {}
+    try:
+        orders = [parse_order(o) for o in data.get('orders', [])]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not orders:
+        return jsonify({'error': 'No orders'}), 400
+    
+    try:
+        results = order_engine.submit_batch(orders, atomic=bool(data.get('atomic', False)))
+    except OrderRejected as e:
+        return jsonify({'error': str(e)}), 400
+    
+    executed = sum(1 for r in results if r['success'])
+    return jsonify({
+        'success': True,
+        'executed': executed,
+        'rejected': len(results) - executed,
+        'results': results
+    })
+
+@app.route('/api/trades/tagging', methods=['GET'])
+def get_tagging_status():
+    """Depth and lag of the background trade tagging queue"""
+    return jsonify(tagging_worker.stats())
 
 @app.route('/api/trades/history', methods=['GET'])
 def get_trade_history():
-    """Get trade history with statistics"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    """
+    Get trade history with statistics.
+    Newest first, `limit` trades per page; pass the returned `next_cursor`
+    as `?cursor=` for the next page. Statistics cover every trade.
+    """
+    try:
+        limit = min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE)
+        cursor = request.args.get('cursor', type=int)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    # Keyset pagination on the primary key: ids grow with date
+    query = """SELECT id, date, asset, type, entry_price, exit_price, 
+                      amount, pnl_percent, regime, epi, eci, etb
+               FROM trades"""
+    params = []
+    if cursor is not None:
+        query += " WHERE id < ?"
+        params.append(cursor)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
     
-    c.execute("""SELECT date, asset, type, entry_price, exit_price, 
-                        amount, pnl_percent, regime, epi, eci, etb
-                 FROM trades 
-                 ORDER BY date DESC 
-                 LIMIT 50""")
+    c = db.connection().cursor()
+    c.execute(query, params)
     
     trades = []
     for row in c.fetchall():
         trades.append({
-            'date': row[0],
-            'asset': row[1],
-            'type': row[2],
-            'entry_price': row[3],
-            'exit_price': row[4],
-            'amount': row[5],
-            'pnl_percent': row[6],
-            'regime': row[7],
-            'epi': row[8],
-            'eci': row[9],
-            'etb': row[10]
+            'id': row[0],
+            'date': row[1],
+            'asset': row[2],
+            'type': row[3],
+            'entry_price': row[4],
+            'exit_price': row[5],
+            'amount': row[6],
+            'pnl_percent': row[7],
+            'regime': row[8],
+            'epi': row[9],
+            'eci': row[10],
+            'etb': row[11]
         })
     
-    # Calculate statistics
-    if trades:
-        pnls = [t['pnl_percent'] for t in trades]
-        wins = [p for p in pnls if p > 0]
-        losses = [p for p in pnls if p < 0]
-        
-        stats = {
-            'total_trades': len(trades),
-            'win_rate': len(wins) / len(trades) * 100 if trades else 0,
-            'avg_win': np.mean(wins) if wins else 0,
-            'avg_loss': np.mean(losses) if losses else 0,
-            'sharpe_ratio': np.mean(pnls) / np.std(pnls) if len(pnls) > 1 and np.std(pnls) != 0 else 0,
-            'max_drawdown': min(pnls) if pnls else 0
-        }
-    else:
-        stats = {
-            'total_trades': 0,
-            'win_rate': 0,
-            'avg_win': 0,
-            'avg_loss': 0,
-            'sharpe_ratio': 0,
-            'max_drawdown': 0
-        }
-    
-    conn.close()
-    
     return jsonify({
         'trades': trades,
-        'statistics': stats
+        'next_cursor': trades[-1]['id'] if len(trades) == limit else None,
+        'statistics': trade_stats.get(),
+        'by_asset': trade_stats.by('asset'),
+        'by_regime': trade_stats.by('regime')
     })
 
+def warm_prices():
+    DataFetcher.get_current_prices(scanner.symbols)
+
+def warm_indicators():
+    """Sync each watched symbol's history and cache its /api/market indicators"""
+    for symbol in scanner.symbols:
+        timestamps, prices = DataFetcher.get_bar_history(symbol)
+        if len(prices):
+            market_indicators(symbol, '1d', timestamps, prices)
+
+def warm_scanner():
+    scanner.start()
+    if not scanner.wait(WARMUP_TIMEOUT):
+        raise TimeoutError(f'no scanner snapshot after {WARMUP_TIMEOUT}s')
+
+warmup = Warmup([('prices', warm_prices), ('indicators', warm_indicators),
+                 ('scanner', warm_scanner)] if WARMUP else [])
+
+@app.route('/api/health/ready', methods=['GET'])
+def get_readiness():
+    """200 once the startup warm-up has run, 503 (with its progress) until then"""
+    warmup.start()
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
-    init_db()
+    # The debug reloader also runs this block in its watcher process, which serves nothing
+    # and must not touch the database or start workers next to the serving process
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_db()
+        tagging_worker.recover()
+        warmup.start()
+        mark_to_market.start()
+        market_stream.start()
     print("🚀 EAR Trader Simulator Backend Starting...")
     print("📊 Access at: http://localhost:5000")
     app.run(debug=True, port=5000)
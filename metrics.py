@@ -0,0 +1,192 @@
+"""
+EAR Trader Simulator - Metrics
+In-process latency histograms for upstream calls, SQLite and indicator
+math, exported in Prometheus text format, with opt-in per-request profiles
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds, from a fast SQLite lookup to a slow upstream call
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram families: name -> (help, label names)
+FAMILIES = {
+    'ear_operation_seconds': ('Time spent in upstream calls, SQLite and indicator math',
+                              ('kind', 'name')),
+    'ear_http_request_seconds': ('Request handling time by endpoint',
+                                 ('method', 'endpoint', 'status'))
+}
+
+# (name, type, help, [(labels, value), ...]) samples from a collector
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    """Cumulative-bucket histogram; callers hold the registry lock"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above every bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Profile:
+    """Per-operation time spent on behalf of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[Tuple[str, str], List] = {}  # (kind, name) -> [calls, seconds]
+        self._lock = threading.Lock()  # ASGI requests may fan out over executor threads
+
+    def add(self, kind: str, name: str, seconds: float):
+        with self._lock:
+            span = self.spans.setdefault((kind, name), [0, 0.0])
+            span[0] += 1
+            span[1] += seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, slowest operations first (durations in ms)"""
+        total = (time.perf_counter() - self.start) * 1000
+        with self._lock:
+            spans = sorted(self.spans.items(), key=lambda item: -item[1][1])
+        entries = [f'total;dur={total:.2f}']
+        entries += [f'{kind}.{name};dur={seconds * 1000:.2f};desc="{calls} calls"'
+                    for (kind, name), (calls, seconds) in spans]
+        return ', '.join(entries)
+
+
+class Metrics:
+    """
+    Registry of latency histograms, keyed by family and label values.
+
+    timed()/timer() record an operation as ear_operation_seconds{kind, name}
+    and add it to the current request's Profile, if one was started in this
+    context. When disabled they reduce to one attribute check. Collectors
+    contribute extra gauges and counters (cache hits, queue depths) at
+    render time, so nothing is counted twice on the hot path.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Tuple[str, ...]], Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+        self._profile = contextvars.ContextVar('profile', default=None)
+
+    def observe(self, family: str, labels: Tuple[str, ...], seconds: float):
+        key = (family, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record(self, kind: str, name: str, seconds: float):
+        """Record one operation in the histograms and the current profile"""
+        self.observe('ear_operation_seconds', (kind, name), seconds)
+        profile = self._profile.get()
+        if profile is not None:
+            profile.add(kind, name, seconds)
+
+    @contextmanager
+    def timer(self, kind: str, name: str):
+        """Time the enclosed block (also inside coroutines)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start)
+
+    def timed(self, kind: str, name: str = None):
+        """Decorator timing every call of a function (exceptions included)"""
+        def decorator(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(kind, label, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def start_profile(self) -> contextvars.Token:
+        """Collect operations of the current request (thread or task) into a Profile"""
+        return self._profile.set(Profile())
+
+    def profile(self) -> Optional[Profile]:
+        return self._profile.get()
+
+    def stop_profile(self, token: contextvars.Token):
+        self._profile.reset(token)
+
+    def collector(self, fn: Callable[[], Iterable[Sample]]):
+        """Register a function returning extra samples for render()"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted((key, list(h.counts), h.sum, h.count, h.buckets)
+                                for key, h in self._histograms.items())
+
+        lines = []
+        for family, (help_text, label_names) in FAMILIES.items():
+            series = [h for h in histograms if h[0][0] == family]
+            if not series:
+                continue
+            lines += [f'# HELP {family} {help_text}', f'# TYPE {family} histogram']
+            for (_, labels), counts, total, count, buckets in series:
+                base = _labels(dict(zip(label_names, labels)))
+                cumulative = 0
+                for bound, n in zip(buckets, counts):
+                    cumulative += n
+                    lines.append(f'{family}_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f'{family}_bucket{{{base},le="+Inf"}} {count}')
+                lines.append(f'{family}_sum{{{base}}} {total}')
+                lines.append(f'{family}_count{{{base}}} {count}')
+
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, help_text, values in samples:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for labels, value in values:
+                    lines.append(f'{name}{{{_labels(labels)}}} {float(value)}' if labels
+                                 else f'{name} {float(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    escaped = {k: str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for k, v in labels.items()}
+    return ','.join(f'{k}="{v}"' for k, v in escaped.items())
+
+
+# Process-wide registry; EAR_METRICS=0 turns instrumentation off
+metrics = Metrics(enabled=os.environ.get('EAR_METRICS', '1') != '0')
@@ -0,0 +1,140 @@
+"""
+EAR Trader Simulator - Order execution
+Atomic balance checks and position updates, one transaction per batch
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from db import Database
+from positions import BookTransaction, PositionBook
+
+ORDER_TYPES = ('BUY', 'SELL')
+
+# Called after commit with the (trade_id, asset) of every trades row inserted
+TradesListener = Callable[[List[Tuple[int, str]]], None]
+
+
+class OrderRejected(Exception):
+    """Order cannot be filled (e.g. insufficient balance)"""
+
+
+def parse_order(data: Dict) -> Dict:
+    """Validate a raw order payload, raising ValueError on bad input"""
+    try:
+        order = {
+            'asset': data['asset'],
+            'type': data['type'],
+            'amount': float(data['amount']),
+            'price': float(data['price'])
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid order: {e}')
+
+    if order['type'] not in ORDER_TYPES:
+        raise ValueError(f"Unknown trade type: {order['type']}")
+    if order['amount'] <= 0 or order['price'] <= 0:
+        raise ValueError('Amount and price must be positive')
+    return order
+
+
+class OrderEngine:
+    """
+    Applies orders to the in-memory position book inside one book
+    transaction per batch, so balance checks and updates cannot interleave
+    with another order. A rejected order touches nothing.
+
+    SELLs record their trades row (with empty indicator columns) in one
+    SQLite transaction per batch, together with the batch's position
+    changes, before those are published; if that write fails the batch is
+    dropped as a whole. Batches without trades rows (BUYs only) reach the
+    portfolio table through the book's write-behind flush. on_trades
+    is told about the recorded trades after commit so tagging happens off
+    the request path.
+    """
+
+    def __init__(self, db: Database, book: PositionBook, on_trades: Optional[TradesListener] = None):
+        self.db = db
+        self.book = book
+        self.on_trades = on_trades
+
+    def submit(self, order: Dict) -> Dict:
+        """Execute one order, raising OrderRejected if it cannot be filled"""
+        return self.submit_batch([order], atomic=True)[0]
+
+    def submit_batch(self, orders: List[Dict], atomic: bool = False) -> List[Dict]:
+        """
+        Execute orders in sequence as a single transaction.
+        Rejected orders are reported and skipped, unless atomic is set, in
+        which case the first rejection drops the whole batch.
+        """
+        results = []
+        trades = []
+        recorded = []
+        with self.book.transaction() as tx:
+            now = datetime.now()
+            for order in orders:
+                try:
+                    trade = self._apply(tx, order)
+                    if trade is not None:
+                        trades.append(trade)
+                    results.append({'success': True, 'message': f"{order['type']} executed"})
+                except OrderRejected as e:
+                    if atomic:
+                        raise
+                    results.append({'success': False, 'error': str(e)})
+
+            if trades:
+                conn = self.db.connection()
+                with conn:
+                    for asset, avg_price, price, amount, pnl in trades:
+                        cur = conn.execute("""INSERT INTO trades
+                                              (date, asset, type, entry_price, exit_price, amount,
+                                               pnl_percent, notes)
+                                              VALUES (?, ?, 'LONG', ?, ?, ?, ?, ?)""",
+                                           (now, asset, avg_price, price, amount, pnl,
+                                            "Paper trade executed"))
+                        recorded.append((cur.lastrowid, asset))
+                    tx.write(conn)  # Positions commit with the trades rows
+
+        if recorded and self.on_trades is not None:
+            self.on_trades(recorded)
+        return results
+
+    @staticmethod
+    def _apply(tx: BookTransaction, order: Dict) -> Optional[Tuple]:
+        """Apply one order; returns (asset, avg_price, price, amount, pnl) of the trade SELLs close"""
+        asset = order['asset']
+        amount = order['amount']
+        price = order['price']
+        cash, _ = tx.get('USD') or (0.0, 1.0)
+
+        if order['type'] == 'BUY':
+            cost = amount * price
+            if cash < cost:
+                raise OrderRejected('Insufficient USD balance')
+
+            held = tx.get(asset)
+            if held is None:
+                position = (amount, price)
+            else:
+                held_amount, avg_price = held
+                position = (held_amount + amount,
+                            (held_amount * avg_price + amount * price) / (held_amount + amount))
+            tx.set('USD', (cash - cost, 1.0))
+            tx.set(asset, position)
+            return None
+
+        else:
+            held = tx.get(asset)
+            if held is None or held[0] < amount:
+                raise OrderRejected(f'Insufficient {asset} balance')
+            held_amount, avg_price = held
+
+            remaining = held_amount - amount
+            tx.set(asset, (remaining, avg_price) if remaining != 0 else None)
+            tx.set('USD', (cash + amount * price, 1.0))
+
+            # Record trade for history (indicators are filled in after commit)
+            pnl = ((price - avg_price) / avg_price * 100)
+            return asset, avg_price, price, amount, pnl
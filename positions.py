@@ -0,0 +1,292 @@
+"""
+EAR Trader Simulator - Position book
+In-memory portfolio positions with write-behind persistence to SQLite, and
+periodic mark-to-market snapshots of portfolio value
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from db import Database
+
+PORTFOLIO_SNAPSHOTS_SCHEMA = '''CREATE TABLE IF NOT EXISTS portfolio_snapshots
+            (timestamp INTEGER PRIMARY KEY,
+             total_value REAL NOT NULL,
+             cash REAL NOT NULL,
+             positions_value REAL NOT NULL,
+             peak REAL NOT NULL,
+             drawdown REAL NOT NULL,
+             max_drawdown REAL NOT NULL)'''
+
+# asset -> (amount, avg_price); None marks a position closed in a transaction
+Position = Tuple[float, float]
+
+
+class BookTransaction:
+    """Staged position changes, published to the book only on commit"""
+
+    def __init__(self, positions: Dict[str, Position]):
+        self._positions = positions
+        self.changes: Dict[str, Optional[Position]] = {}
+        self.written = False
+
+    def get(self, asset: str) -> Optional[Position]:
+        if asset in self.changes:
+            return self.changes[asset]
+        return self._positions.get(asset)
+
+    def set(self, asset: str, position: Optional[Position]):
+        self.changes[asset] = position
+
+    def write(self, conn):
+        """
+        Write the staged changes to the portfolio table on `conn`, inside the
+        caller's SQLite transaction, so they commit (or roll back) with it
+        """
+        now = datetime.now()
+        write_positions(conn, {asset: (position, now) for asset, position in self.changes.items()})
+        self.written = True
+
+
+def write_positions(conn, changes: Dict[str, Tuple[Optional[Position], datetime]]):
+    """Upsert (or delete, for None) portfolio rows: asset -> (position, updated_at)"""
+    for asset, (position, updated_at) in changes.items():
+        if position is None:
+            conn.execute("DELETE FROM portfolio WHERE asset=?", (asset,))
+            continue
+        amount, avg_price = position
+        cur = conn.execute("""UPDATE portfolio SET amount=?, avg_price=?, updated_at=?
+                              WHERE asset=?""", (amount, avg_price, updated_at, asset))
+        if cur.rowcount == 0:
+            conn.execute("INSERT INTO portfolio VALUES (NULL, ?, ?, ?, ?)",
+                         (asset, amount, avg_price, updated_at))
+
+
+class PositionBook:
+    """
+    The portfolio table held in memory, so reads are lookups instead of
+    queries. Loaded from SQLite on first use; after that this process is the
+    only writer of the portfolio table, so the server must run as a single
+    process (one uvicorn worker): another process's position writes would
+    be overwritten by this book's flushes.
+
+    Writers go through transaction(): changes are staged, checked and then
+    published atomically under the book lock, so readers never see a
+    half-applied batch. A transaction that records trades rows writes its
+    positions in the same SQLite transaction (BookTransaction.write), so
+    trades and portfolio never disagree. Other changes are flushed to
+    SQLite write-behind, every flush_interval seconds by a daemon thread
+    (started by the first change) and at exit; a crash can lose at most
+    that window of such position updates.
+    """
+
+    def __init__(self, db: Database, flush_interval: float = 1.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._positions: Optional[Dict[str, Position]] = None
+        self._dirty: Dict[str, datetime] = {}  # asset -> time of last change
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_errors = 0
+
+    def _load(self) -> Dict[str, Position]:
+        if self._positions is None:
+            rows = self.db.connection().execute(
+                "SELECT asset, amount, avg_price FROM portfolio ORDER BY id").fetchall()
+            self._positions = {asset: (amount, avg_price) for asset, amount, avg_price in rows}
+        return self._positions
+
+    def reload(self):
+        """Drop the in-memory positions and unflushed changes; the next read loads the portfolio table"""
+        with self._flush_lock, self._lock:
+            self._positions = None
+            self._dirty = {}
+
+    def rows(self) -> List[Tuple[str, float, float]]:
+        """(asset, amount, avg_price) for every position, in portfolio table order"""
+        with self._lock:
+            return [(asset, amount, avg_price) for asset, (amount, avg_price) in self._load().items()]
+
+    def get(self, asset: str) -> Optional[Position]:
+        with self._lock:
+            return self._load().get(asset)
+
+    @contextmanager
+    def transaction(self) -> Iterator[BookTransaction]:
+        """
+        Stage changes in a BookTransaction; they are published when the block
+        exits normally and dropped on an exception. The book stays locked for
+        the whole block.
+        """
+        # Taken in flush()'s order; keeps a flush from writing an older snapshot over tx.write()
+        with self._flush_lock, self._lock:
+            tx = BookTransaction(self._load())
+            yield tx
+            self._publish(tx.changes, tx.written)
+
+    def _publish(self, changes: Dict[str, Optional[Position]], written: bool = False):
+        positions = self._load()
+        now = datetime.now()
+        for asset, position in changes.items():
+            if position is None:
+                positions.pop(asset, None)
+            else:
+                positions[asset] = position
+            if written:
+                self._dirty.pop(asset, None)  # Already in the portfolio table
+            else:
+                self._dirty[asset] = now
+        if changes and not written:
+            self.start()
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write changed positions to the portfolio table now; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                dirty = self._dirty
+                self._dirty = {}
+                snapshot = {asset: self._positions.get(asset) for asset in dirty}
+
+            conn = self.db.connection()
+            try:
+                with conn:
+                    write_positions(conn, {asset: (snapshot[asset], updated_at)
+                                           for asset, updated_at in dirty.items()})
+            except Exception:
+                # Keep the assets dirty (newer changes win) and retry on the next flush
+                with self._lock:
+                    self._dirty = {**dirty, **self._dirty}
+                self.flush_errors += 1
+                raise
+
+            self.flushes += 1
+            self.rows_flushed += len(dirty)
+            return len(dirty)
+
+    def start(self):
+        """Start the write-behind flusher (idempotent); also flushes at interpreter exit"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='position-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.flush_interval)  # Batch the changes of the next interval together
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing positions: {e}")
+            finally:
+                self.db.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'positions': len(self._positions) if self._positions is not None else None,
+                'dirty': len(self._dirty),
+                'flushes': self.flushes,
+                'rows_flushed': self.rows_flushed,
+                'flush_errors': self.flush_errors,
+                'flush_interval_s': self.flush_interval,
+                'running': self._thread is not None
+            }
+
+
+class MarkToMarket:
+    """
+    Values the position book at spot prices every `interval` seconds and
+    appends a row to portfolio_snapshots. The running equity peak, drawdown
+    and max drawdown are stored with each row, so the equity history and its
+    drawdown are reads, never recomputed over past snapshots.
+    """
+
+    def __init__(self, book: PositionBook, prices: Callable[[List[str]], Dict[str, float]],
+                 db: Database, interval: float = 60.0):
+        self.book = book
+        self.prices = prices
+        self.db = db
+        self.interval = interval
+        self._peak = None
+        self._max_drawdown = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.snapshots = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict:
+        """Record one valuation now and return it"""
+        rows = self.book.rows()
+        assets = [asset for asset, _, _ in rows if asset != 'USD']
+        prices = self.prices(assets) if assets else {}
+        cash = sum(amount for asset, amount, _ in rows if asset == 'USD')
+        positions_value = sum(amount * prices[asset.upper()] for asset, amount, _ in rows if asset != 'USD')
+        total = cash + positions_value
+
+        with self._lock:
+            conn = self.db.connection()
+            if self._peak is None:
+                last = conn.execute("""SELECT peak, max_drawdown FROM portfolio_snapshots
+                                       ORDER BY timestamp DESC LIMIT 1""").fetchone()
+                self._peak, self._max_drawdown = last if last else (total, 0.0)
+            self._peak = max(self._peak, total)
+            drawdown = (total - self._peak) / self._peak * 100 if self._peak > 0 else 0.0
+            self._max_drawdown = min(self._max_drawdown, drawdown)
+
+            row = {
+                'timestamp': int(time.time() * 1000),
+                'total_value': total,
+                'cash': cash,
+                'positions_value': positions_value,
+                'peak': self._peak,
+                'drawdown': drawdown,
+                'max_drawdown': self._max_drawdown
+            }
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO portfolio_snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             tuple(row.values()))
+            self.snapshots += 1
+        return row
+
+    def history(self, since: int = None, limit: int = 1000) -> List[Dict]:
+        """Snapshots from `since` (ms) on, oldest first, at most `limit` (the latest ones)"""
+        rows = self.db.connection().execute(
+            """SELECT timestamp, total_value, cash, positions_value, peak, drawdown, max_drawdown
+               FROM portfolio_snapshots WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?""",
+            (since or 0, limit)).fetchall()
+        columns = ('timestamp', 'total_value', 'cash', 'positions_value', 'peak', 'drawdown', 'max_drawdown')
+        return [dict(zip(columns, row)) for row in reversed(rows)]
+
+    def start(self):
+        """Start the periodic snapshot loop (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='mark-to-market', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.snapshot()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error recording portfolio snapshot: {e}")
+            finally:
+                self.db.release()
+            time.sleep(self.interval)
@@ -0,0 +1,114 @@
+"""
+EAR Trader Simulator - Local price history store
+Persistent (symbol, timestamp) price series in SQLite, mirrored in memory
+as contiguous float64 arrays so warm reads need no I/O or pandas copies
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from db import Database
+
+PRICE_HISTORY_SCHEMA = '''CREATE TABLE IF NOT EXISTS price_history
+            (symbol TEXT NOT NULL,
+             timestamp INTEGER NOT NULL,
+             price REAL NOT NULL,
+             PRIMARY KEY (symbol, timestamp)) WITHOUT ROWID'''
+
+
+class _Series:
+    """Append-only timestamp/price buffers with amortized O(1) growth"""
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray):
+        capacity = max(2 * len(prices), 512)
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty(capacity, dtype=np.float64)
+        self.n = len(prices)
+        self.timestamps[:self.n] = timestamps
+        self.prices[:self.n] = prices
+
+    def append(self, timestamps: np.ndarray, prices: np.ndarray):
+        needed = self.n + len(prices)
+        if needed > len(self.prices):
+            capacity = 2 * needed
+            self.timestamps = np.resize(self.timestamps[:self.n], capacity)
+            self.prices = np.resize(self.prices[:self.n], capacity)
+        self.timestamps[self.n:needed] = timestamps
+        self.prices[self.n:needed] = prices
+        self.n = needed
+
+    def replace_last(self, price: float):
+        """Update the newest price on a copy of the buffer, leaving views already handed out intact"""
+        self.prices = self.prices.copy()
+        self.prices[self.n - 1] = price
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.timestamps[:self.n], self.prices[:self.n]
+
+
+class PriceStore:
+    """
+    Price history per symbol, indexed by (symbol, timestamp in ms).
+
+    Series are read from SQLite once per process and then kept in memory;
+    append() writes through to SQLite and extends the in-memory arrays.
+    Arrays returned by get() are views: callers must not mutate them, and
+    the store never does either (appends land past the end of every view;
+    a new price for the last day goes to a copy), so a caller computing on
+    a view never sees it change.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._series: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol: str) -> _Series:
+        series = self._series.get(symbol)
+        if series is None:
+            rows = self.db.connection().execute("""SELECT timestamp, price FROM price_history
+                                                   WHERE symbol=? ORDER BY timestamp""", (symbol,)).fetchall()
+            data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+            series = _Series(data[:, 0].astype(np.int64), data[:, 1])
+            self._series[symbol] = series
+        return series
+
+    def get(self, symbol: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps int64 ms, prices float64) for symbol, oldest first"""
+        with self._lock:
+            return self._load(symbol).view()
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        with self._lock:
+            series = self._load(symbol)
+            return int(series.timestamps[series.n - 1]) if series.n else None
+
+    def append(self, symbol: str, timestamps: np.ndarray, prices: np.ndarray):
+        """
+        Upsert points (sorted, unique timestamps). Points at or after the
+        last stored timestamp extend the series in place; anything older
+        triggers a reload of the symbol from SQLite.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) == 0:
+            return
+
+        with self._lock:
+            conn = self.db.connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO price_history VALUES (?, ?, ?)",
+                                 zip([symbol] * len(prices), timestamps.tolist(), prices.tolist()))
+
+            series = self._load(symbol)
+            last = series.timestamps[series.n - 1] if series.n else None
+            if last is not None and timestamps[0] < last:
+                del self._series[symbol]
+                return
+
+            if last is not None and timestamps[0] == last:
+                series.replace_last(prices[0])
+                timestamps, prices = timestamps[1:], prices[1:]
+            series.append(timestamps, prices)
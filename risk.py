@@ -0,0 +1,194 @@
+"""
+EAR Trader Simulator - Portfolio risk
+Historical and parametric VaR/CVaR, rolling volatility and the return
+correlation matrix of current holdings, vectorized over the stored daily
+price histories and cached per (holdings, as-of date)
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from functools import reduce
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+
+CONFIDENCE_LEVELS = (0.95, 0.99)
+
+# Days per year for annualized volatility (crypto trades every day)
+PERIODS_PER_YEAR = 365
+
+# Days in the rolling volatility window
+VOL_WINDOW = 30
+
+# (timestamps in ms, float64 prices)
+Series = Tuple[np.ndarray, np.ndarray]
+
+
+def holdings_hash(holdings: Dict[str, float]) -> str:
+    """Stable digest of {asset: amount}, independent of order"""
+    canonical = json.dumps(sorted((asset.upper(), float(amount)) for asset, amount in holdings.items()))
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def align(histories: List[Series]) -> Tuple[np.ndarray, np.ndarray]:
+    """Timestamps every series has, and the (T, N) price matrix on them"""
+    common = reduce(np.intersect1d, (timestamps for timestamps, _ in histories))
+    matrix = np.empty((len(common), len(histories)))
+    for j, (timestamps, prices) in enumerate(histories):
+        matrix[:, j] = prices[np.searchsorted(timestamps, common)]
+    return common, matrix
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Population std of every `window`-row slice of `values` (T or T x N),
+    from running sums: O(T) whatever the window
+    """
+    values = values - values.mean(axis=0)  # Centering keeps the running sums well conditioned
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate((zero, np.cumsum(values, axis=0)))
+    squares = np.concatenate((zero, np.cumsum(values * values, axis=0)))
+    mean = (sums[window:] - sums[:-window]) / window
+    variance = (squares[window:] - squares[:-window]) / window - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def value_at_risk(returns: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """Historical one-period VaR and CVaR (expected shortfall) as positive fractions of value"""
+    cutoff = np.quantile(returns, 1 - confidence)
+    tail = returns[returns <= cutoff]
+    return 0.0 - float(cutoff), 0.0 - float(tail.mean())
+
+
+def parametric_var(mean: float, std: float, confidence: float) -> Tuple[float, float]:
+    """Gaussian (variance-covariance) one-period VaR and CVaR"""
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - confidence)
+    return 0.0 - (mean + z * std), 0.0 - (mean - std * normal.pdf(z) / (1 - confidence))
+
+
+def portfolio_risk(timestamps: np.ndarray, prices: np.ndarray, amounts: np.ndarray,
+                   confidence_levels=CONFIDENCE_LEVELS, vol_window: int = VOL_WINDOW) -> Dict:
+    """
+    Risk of holding `amounts` of each column of the (T, N) price matrix,
+    valued at the last row. VaR/CVaR are one-day losses as fractions of
+    the positions' value; volatilities are annualized.
+    """
+    values = amounts * prices[-1]
+    total = float(values.sum())
+    weights = values / total if total > 0 else np.zeros_like(values)
+
+    returns = np.expm1(np.diff(np.log(prices), axis=0))
+    portfolio = returns @ weights
+    n = len(portfolio)
+
+    var = []
+    if n >= 2:
+        covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+        std = float(np.sqrt(max(weights @ covariance @ weights, 0.0)))
+        mean = float(portfolio.mean())
+        for confidence in confidence_levels:
+            historical, historical_shortfall = value_at_risk(portfolio, confidence)
+            parametric, parametric_shortfall = parametric_var(mean, std, confidence)
+            var.append({
+                'confidence': confidence,
+                'historical_var': historical,
+                'historical_cvar': historical_shortfall,
+                'parametric_var': parametric,
+                'parametric_cvar': parametric_shortfall
+            })
+
+    annualize = np.sqrt(PERIODS_PER_YEAR)
+    window = min(vol_window, n)
+    rolling = rolling_std(portfolio, window) * annualize if window >= 2 else np.empty(0)
+    asset_vol = (rolling_std(returns[-window:], window)[-1] * annualize if window >= 2
+                 else np.zeros(len(values)))
+
+    if n >= 2:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = np.atleast_2d(np.corrcoef(returns, rowvar=False))
+        # Flat series have no defined correlation; report them as uncorrelated
+        correlation = np.nan_to_num(correlation, nan=0.0)
+        np.fill_diagonal(correlation, 1.0)
+    else:
+        correlation = np.eye(len(values))
+
+    return {
+        'observations': n,
+        'positions_value': total,
+        'weights': weights,
+        'var': var,
+        'volatility': float(rolling[-1]) if len(rolling) else 0.0,
+        'rolling_volatility': (timestamps[len(timestamps) - len(rolling):], rolling),
+        'asset_volatility': asset_vol,
+        'correlation': correlation
+    }
+
+
+class RiskEngine:
+    """
+    Risk reports of a set of holdings, cached per (holdings hash, window,
+    as-of date) with the last common history point as the as-of date. The
+    daily histories gain one point a day, so a report is computed once a
+    day per portfolio, and every refresh in between is a cache hit.
+    Positions are valued at the as-of close, not the spot price.
+    """
+
+    def __init__(self, ttl: float = 24 * 60 * 60, maxsize: int = 64):
+        self.cache = TTLCache('risk', ttl=ttl, maxsize=maxsize)
+
+    def report(self, holdings: Dict[str, float], histories: Dict[str, Series], window: int) -> Dict:
+        """JSON-ready risk of holdings ({asset: amount}) from their daily histories"""
+        assets = sorted(asset for asset, amount in holdings.items() if amount > 0)
+        digest = holdings_hash({asset: holdings[asset] for asset in assets})
+        if not assets:
+            return self._payload(digest, window, assets, None, None)
+
+        series = [tuple(array[-(window + 1):] for array in histories[asset]) for asset in assets]
+        lasts = [int(timestamps[-1]) if len(timestamps) else None for timestamps, _ in series]
+        as_of = None if None in lasts else min(lasts)
+        return self.cache.get_or_load((digest, window, as_of),
+                                      lambda: self._compute(digest, window, assets, holdings, series))
+
+    def _compute(self, digest: str, window: int, assets: List[str], holdings: Dict[str, float],
+                 series: List[Series]) -> Dict:
+        timestamps, prices = align(series)
+        if len(timestamps) == 0:
+            return self._payload(digest, window, assets, None, None)
+        amounts = np.array([holdings[asset] for asset in assets], dtype=np.float64)
+        return self._payload(digest, window, assets, timestamps, portfolio_risk(timestamps, prices, amounts))
+
+    @staticmethod
+    def _payload(digest: str, window: int, assets: List[str], timestamps, risk) -> Dict:
+        if risk is None:
+            return {'holdings_hash': digest, 'as_of': None, 'window_days': window, 'assets': assets,
+                    'observations': 0, 'positions_value': 0.0, 'weights': {}, 'var': [],
+                    'volatility': {'portfolio': 0.0, 'assets': {}, 'rolling': []},
+                    'correlation': {'assets': assets, 'matrix': []}}
+
+        value = risk['positions_value']
+        for row in risk['var']:
+            for field in ('historical_var', 'historical_cvar', 'parametric_var', 'parametric_cvar'):
+                row[f'{field}_usd'] = row[field] * value
+        rolling_times, rolling = risk['rolling_volatility']
+        return {
+            'holdings_hash': digest,
+            'as_of': datetime.utcfromtimestamp(int(timestamps[-1]) / 1000).date().isoformat(),
+            'window_days': window,
+            'assets': assets,
+            'observations': risk['observations'],
+            'positions_value': value,
+            'weights': dict(zip(assets, risk['weights'].tolist())),
+            'var': risk['var'],
+            'volatility': {
+                'portfolio': risk['volatility'],
+                'assets': dict(zip(assets, risk['asset_volatility'].tolist())),
+                'rolling': [{'timestamp': int(ts), 'value': float(v)}
+                            for ts, v in zip(rolling_times.tolist(), rolling.tolist())]
+            },
+            'correlation': {'assets': assets, 'matrix': np.round(risk['correlation'], 4).tolist()}
+        }
@@ -0,0 +1,223 @@
+"""
+EAR Trader Simulator - Market scanner
+Aligned (symbols x days) price matrix with EAR indicators for every symbol
+computed in one vectorized pass, refreshed by a background scheduler
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from compute import analyze
+from ear_engine import DEFAULT_THRESHOLDS, REGIMES, EAREngine, classify_regimes
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# symbol, days -> (timestamps in ms, prices), e.g. DataFetcher.get_price_history
+HistorySource = Callable[[str, int], Tuple[np.ndarray, np.ndarray]]
+
+# Order of actions in the ranked scan (most actionable first)
+ACTION_RANK = {'ENTER_LONG': 0, 'PREPARE_BREAKOUT': 1, 'WAIT': 2}
+
+
+def align(histories: Dict[str, Tuple[np.ndarray, np.ndarray]], days: int) -> Tuple[np.ndarray, int]:
+    """
+    Daily price matrix (symbols x days, in histories order) ending at the
+    latest day any symbol has. Gaps are forward-filled; days before a
+    symbol's first price stay NaN. Returns (matrix, last day in ms).
+    """
+    last_day = max((int(ts[-1]) // DAY_MS for ts, _ in histories.values() if len(ts)), default=0)
+    matrix = np.full((len(histories), days), np.nan)
+    for row, (timestamps, prices) in enumerate(histories.values()):
+        col = np.asarray(timestamps, dtype=np.int64) // DAY_MS - (last_day - days + 1)
+        inside = (col >= 0) & (col < days)
+        matrix[row, col[inside]] = np.asarray(prices, dtype=float)[inside]
+
+    # Forward fill along time: index of the last seen price per cell
+    seen = np.where(np.isnan(matrix), 0, np.arange(days))
+    np.maximum.accumulate(seen, axis=1, out=seen)
+    matrix = matrix[np.arange(len(matrix))[:, None], seen]
+    return matrix, last_day * DAY_MS
+
+
+def indicators(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    EPI/ECI/ETB for every row, as compute.analyze would compute them on the
+    row. Complete rows go through the batched EAREngine kernels in one pass;
+    rows with a short history fall back to analyzing their available tail.
+    """
+    n_rows = len(matrix)
+    result = {name: np.empty(n_rows) for name in ('epi', 'eci', 'etb')}
+    complete = ~np.isnan(matrix).any(axis=1)
+
+    full = matrix[complete]
+    if len(full):
+        result['epi'][complete] = EAREngine.calculate_hurst_batch(full[:, -100:])
+        result['eci'][complete] = EAREngine.calculate_eci_batch(full)
+        result['etb'][complete] = EAREngine.calculate_etb_batch(full[:, -100:])
+
+    for row in np.flatnonzero(~complete):
+        prices = matrix[row][~np.isnan(matrix[row])]
+        tail = analyze(prices)
+        for name in result:
+            result[name][row] = tail[name]
+    return result
+
+
+class MarketScanner:
+    """
+    Keeps EAR indicators for a watchlist precomputed, so scans are a read
+    of the last snapshot instead of one fetch and recompute per symbol.
+
+    refresh() pulls every symbol's history from the source, aligns it into
+    a (symbols x days) matrix and recomputes all indicators; start() runs
+    it every `interval` seconds on a daemon thread. Symbols requested but
+    not yet scanned are added to the watchlist (up to max_symbols) and
+    picked up by an early refresh.
+    """
+
+    def __init__(self, source: HistorySource, symbols: Iterable[str], days: int = 365,
+                 interval: float = 300.0, max_symbols: int = 200):
+        self.source = source
+        self.days = days
+        self.interval = interval
+        self.max_symbols = max_symbols
+        self._symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refreshed = threading.Event()
+        self._thread = None
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_ms = 0.0
+
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._symbols)
+
+    def watch(self, symbols: Iterable[str]) -> List[str]:
+        """Add symbols to the watchlist; returns the ones that were new"""
+        with self._lock:
+            new = [s for s in dict.fromkeys(s.upper() for s in symbols) if s not in self._symbols]
+            new = new[:max(0, self.max_symbols - len(self._symbols))]
+            self._symbols.extend(new)
+        if new:
+            self._wake.set()
+        return new
+
+    def refresh(self) -> Dict:
+        """Rebuild the matrix and indicators now; returns the new snapshot"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            symbols = self.symbols
+            histories = {symbol: self.source(symbol, self.days) for symbol in symbols}
+            matrix, as_of = align(histories, self.days)
+            values = indicators(matrix)
+            regimes = classify_regimes(values['epi'], values['eci'], values['etb'])
+
+            rows = {}
+            for i, symbol in enumerate(symbols):
+                epi, eci, etb = (float(values[name][i]) for name in ('epi', 'eci', 'etb'))
+                regime = REGIMES[regimes[i]]
+                rows[symbol] = {
+                    'symbol': symbol,
+                    'price': float(matrix[i, -1]),
+                    'epi': epi,
+                    'eci': eci,
+                    'etb': etb,
+                    'regime': regime,
+                    'recommendation': EAREngine.get_recommendation(epi, eci, etb, regime)
+                }
+
+            snapshot = {
+                'rows': rows,
+                'matrix': matrix,
+                'as_of': as_of,
+                'updated_at': datetime.now()
+            }
+            with self._lock:
+                self._snapshot = snapshot
+                self.refreshes += 1
+                self.last_refresh_ms = (time.perf_counter() - start) * 1000
+            self._refreshed.set()
+            return snapshot
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the first snapshot exists; False on timeout"""
+        return self._refreshed.wait(timeout)
+
+    def snapshot(self) -> Optional[Dict]:
+        """Last refreshed snapshot (None before the first refresh)"""
+        with self._lock:
+            return self._snapshot
+
+    def scan(self, symbols: Iterable[str] = None, threshold: float = None, top: int = 5) -> Dict:
+        """
+        Ranked view of the last snapshot: most actionable recommendations
+        first (then by EPI), plus the `top` symbols whose ECI is closest to
+        `threshold` (default: the ECI exit threshold).
+        """
+        threshold = DEFAULT_THRESHOLDS['exit_eci'] if threshold is None else threshold
+        snapshot = self.snapshot()
+        if snapshot is None:
+            snapshot = self.refresh()
+
+        wanted = self.symbols if symbols is None else list(dict.fromkeys(s.upper() for s in symbols))
+        rows = [snapshot['rows'][s] for s in wanted if s in snapshot['rows']]
+        pending = [s for s in wanted if s not in snapshot['rows']]
+        if pending:
+            self.watch(pending)
+
+        def distance(row):
+            return abs(row['eci'] - threshold) if np.isfinite(row['eci']) else np.inf
+
+        ranked = sorted(rows, key=lambda r: (ACTION_RANK.get(r['recommendation']['action'], len(ACTION_RANK)),
+                                             -np.nan_to_num(r['epi'])))
+        nearest = sorted(rows, key=distance)[:top]
+        return {
+            'as_of': datetime.utcfromtimestamp(snapshot['as_of'] / 1000),
+            'updated_at': snapshot['updated_at'],
+            'eci_threshold': threshold,
+            'results': [dict(r, **{k: round(r[k], 3) for k in ('epi', 'eci', 'etb')}) for r in ranked],
+            'near_threshold': [{'symbol': r['symbol'], 'eci': round(r['eci'], 3),
+                                'distance': round(distance(r), 3)} for r in nearest],
+            'pending': pending
+        }
+
+    def start(self):
+        """Start the background refresh loop (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='scanner', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error refreshing scanner: {e}")
+            # Sleep until the next interval, or until watch() adds symbols
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                'symbols': len(self._symbols),
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'last_refresh_ms': self.last_refresh_ms,
+                'age_s': (datetime.now() - snapshot['updated_at']).total_seconds() if snapshot else None,
+                'interval_s': self.interval,
+                'running': self._thread is not None
+            }
@@ -0,0 +1,348 @@
+"""
+EAR Trader Simulator - Market data sources
+Where DataFetcher gets spot prices and daily history: live CoinGecko,
+replay of a recorded feed at a configurable speed, or a seeded synthetic
+feed, plus the recorder that writes live data to disk for later replay
+"""
+
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# One record per point, 16 bytes; feed files are plain arrays of these
+FEED_DTYPE = np.dtype([('timestamp', '<i8'), ('price', '<f8')])
+
+# Feed file kinds: daily history points and spot price ticks
+FEED_KINDS = ('daily', 'ticks')
+
+SOURCES = ('live', 'record', 'replay', 'synthetic')
+
+# (timestamps in ms, float64 prices)
+Series = Tuple[np.ndarray, np.ndarray]
+
+
+class MarketSource(ABC):
+    """
+    Upstream market data. current_prices() leaves out symbols it has no
+    price for; market_chart() raises when it has no history. Either may
+    raise on failure, and DataFetcher falls back to mock data.
+
+    Remote sources also expose the request/parse helpers of LiveSource, so
+    the ASGI server can issue the same requests on its own async client;
+    local sources are called directly (off the event loop).
+    """
+
+    name = 'source'
+    remote = False
+
+    @abstractmethod
+    def current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        ...
+
+    @abstractmethod
+    def market_chart(self, symbol: str, days: int) -> Series:
+        ...
+
+    def stats(self) -> Dict:
+        return {'source': self.name}
+
+
+class LiveSource(MarketSource):
+    """CoinGecko API v3 over HTTP"""
+
+    name = 'live'
+    remote = True
+
+    def __init__(self, coin_ids: Dict[str, str], base_url: str = "https://api.coingecko.com/api/v3"):
+        self.coin_ids = coin_ids
+        self.base_url = base_url
+
+    def coin_id(self, symbol: str) -> str:
+        """CoinGecko id for a ticker (unknown tickers are passed through)"""
+        return self.coin_ids.get(symbol.upper(), symbol.lower())
+
+    def price_request(self, symbols: List[str]) -> Tuple[str, Dict, Dict[str, str]]:
+        """URL, query params and symbol -> coin id map of a /simple/price call"""
+        coin_ids = {symbol.upper(): self.coin_id(symbol) for symbol in symbols}
+        url = f"{self.base_url}/simple/price"
+        params = {'ids': ','.join(coin_ids.values()), 'vs_currencies': 'usd'}
+        return url, params, coin_ids
+
+    @staticmethod
+    def parse_prices(data: Dict, coin_ids: Dict[str, str]) -> Dict[str, float]:
+        return {symbol: data[coin_id]['usd']
+                for symbol, coin_id in coin_ids.items() if coin_id in data}
+
+    def market_chart_request(self, symbol: str, days: int) -> Tuple[str, Dict]:
+        url = f"{self.base_url}/coins/{self.coin_id(symbol)}/market_chart"
+        params = {'vs_currency': 'usd', 'days': days, 'interval': 'daily'}
+        return url, params
+
+    @staticmethod
+    def parse_market_chart(data: Dict) -> Series:
+        points = np.array(data['prices'], dtype=np.float64).reshape(-1, 2)
+        return points[:, 0].astype(np.int64), points[:, 1]
+
+    def current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """One /simple/price request for all symbols"""
+        import requests  # Imported on first use: offline sources never need it
+        url, params, coin_ids = self.price_request(symbols)
+        response = requests.get(url, params=params, timeout=5)
+        return self.parse_prices(response.json(), coin_ids)
+
+    def market_chart(self, symbol: str, days: int) -> Series:
+        import requests
+        url, params = self.market_chart_request(symbol, days)
+        response = requests.get(url, params=params, timeout=10)
+        return self.parse_market_chart(response.json())
+
+    def stats(self) -> Dict:
+        return {'source': self.name, 'base_url': self.base_url}
+
+
+def feed_path(directory: str, symbol: str, kind: str) -> str:
+    return os.path.join(directory, f'{symbol.upper()}.{kind}')
+
+
+def read_feed(directory: str, symbol: str, kind: str) -> Series:
+    """A feed file as contiguous arrays (empty when missing); a torn last record is dropped"""
+    path = feed_path(directory, symbol, kind)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    raw = np.fromfile(path, dtype=np.uint8)
+    records = raw[:len(raw) - len(raw) % FEED_DTYPE.itemsize].view(FEED_DTYPE)
+    return np.ascontiguousarray(records['timestamp']), np.ascontiguousarray(records['price'])
+
+
+def write_feed(directory: str, symbol: str, kind: str, timestamps, prices):
+    """Append points to a feed file"""
+    records = np.empty(len(prices), dtype=FEED_DTYPE)
+    records['timestamp'] = timestamps
+    records['price'] = prices
+    with open(feed_path(directory, symbol, kind), 'ab') as f:
+        f.write(records.tobytes())
+
+
+class FeedRecorder:
+    """
+    Appends upstream data to a feed directory as it arrives: every fetched
+    spot price as a tick, and history points newer than the last one
+    recorded. Files are append-only, so a recording can be replayed (or
+    copied) while it grows.
+    """
+
+    def __init__(self, directory: str, clock=time.time):
+        self.directory = directory
+        self.clock = clock
+        self._last_daily: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.ticks = 0
+        self.points = 0
+
+    def prices(self, fetched: Dict[str, float]):
+        now = int(self.clock() * 1000)
+        with self._lock:
+            for symbol, price in fetched.items():
+                write_feed(self.directory, symbol, 'ticks', [now], [price])
+            self.ticks += len(fetched)
+
+    def history(self, symbol: str, timestamps: np.ndarray, prices: np.ndarray):
+        symbol = symbol.upper()
+        with self._lock:
+            last = self._last_daily.get(symbol)
+            if last is None:
+                recorded = read_feed(self.directory, symbol, 'daily')[0]
+                last = int(recorded[-1]) if len(recorded) else -1
+            new = timestamps > last
+            if new.any():
+                write_feed(self.directory, symbol, 'daily', timestamps[new], prices[new])
+                last = int(timestamps[new][-1])
+                self.points += int(new.sum())
+            self._last_daily[symbol] = last
+
+    def stats(self) -> Dict:
+        return {'directory': self.directory, 'ticks': self.ticks, 'points': self.points}
+
+
+class Feed:
+    """Daily history and spot ticks of one symbol, both time-sorted"""
+
+    def __init__(self, daily: Series, ticks: Series):
+        self.daily = daily
+        self.ticks = ticks
+
+    def price_at(self, t: int) -> Optional[float]:
+        """Last tick at or before t"""
+        i = np.searchsorted(self.ticks[0], t, side='right') - 1
+        return float(self.ticks[1][i]) if i >= 0 else None
+
+    def history_at(self, t: int, days: int) -> Series:
+        """
+        Last `days` history points at or before t, ending with the latest
+        tick like CoinGecko's market_chart ends with the current price
+        """
+        n = np.searchsorted(self.daily[0], t, side='right')
+        timestamps, prices = self.daily[0][:n], self.daily[1][:n]
+        i = np.searchsorted(self.ticks[0], t, side='right') - 1
+        if i >= 0 and (n == 0 or self.ticks[0][i] > timestamps[-1]):
+            timestamps = np.append(timestamps, self.ticks[0][i])
+            prices = np.append(prices, self.ticks[1][i])
+        return timestamps[-days:], prices[-days:]
+
+
+class ReplaySource(MarketSource):
+    """
+    Serves a recorded feed directory on a replay clock that starts at the
+    first recorded tick on the first request and runs `speed` times faster
+    than the wall clock. speed=0 steps instead: every current_prices() call
+    moves the clock to the next tick, so load tests run at full speed and
+    see the same price sequence on every run. Past the last tick prices
+    hold. Symbols missing from the recording are left out, as if the
+    upstream did not know them.
+    """
+
+    name = 'replay'
+
+    def __init__(self, directory: str, speed: float = 1.0, clock=time.time):
+        self.directory = directory
+        self.speed = speed
+        self.clock = clock
+        self._feeds: Dict[str, Optional[Feed]] = {}
+        self._timeline = None
+        self._started = None
+        self._step = 0
+        self._lock = threading.Lock()
+
+    def _load_feed(self, symbol: str) -> Optional[Feed]:
+        daily, ticks = (read_feed(self.directory, symbol, kind) for kind in FEED_KINDS)
+        return Feed(daily, ticks) if len(daily[0]) or len(ticks[0]) else None
+
+    def _load_timeline(self) -> np.ndarray:
+        """Every tick time of every recorded symbol"""
+        symbols = {name.rsplit('.', 1)[0] for name in os.listdir(self.directory)
+                   if name.endswith('.ticks')}
+        times = [self.feed(symbol).ticks[0] for symbol in symbols]
+        return np.unique(np.concatenate(times)) if times else np.empty(0, dtype=np.int64)
+
+    def feed(self, symbol: str) -> Optional[Feed]:
+        symbol = symbol.upper()
+        if symbol not in self._feeds:
+            self._feeds[symbol] = self._load_feed(symbol)
+        return self._feeds[symbol]
+
+    def now(self, advance: bool = False) -> int:
+        """Replay time in ms; advance moves a stepping clock to the next tick"""
+        with self._lock:
+            if self._timeline is None:
+                self._timeline = self._load_timeline()
+            timeline = self._timeline
+            if len(timeline) == 0:
+                return int(self.clock() * 1000)
+            if self.speed > 0:
+                if self._started is None:
+                    self._started = self.clock()
+                return int(timeline[0] + (self.clock() - self._started) * 1000 * self.speed)
+            t = int(timeline[min(self._step, len(timeline) - 1)])
+            if advance:
+                self._step += 1
+            return t
+
+    def current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        t = self.now(advance=True)
+        prices = {}
+        for symbol in symbols:
+            feed = self.feed(symbol)
+            price = feed.price_at(t) if feed is not None else None
+            if price is not None:
+                prices[symbol.upper()] = price
+        return prices
+
+    def market_chart(self, symbol: str, days: int) -> Series:
+        feed = self.feed(symbol)
+        if feed is None:
+            raise KeyError(f"{symbol.upper()} is not in the feed")
+        return feed.history_at(self.now(), days)
+
+    def stats(self) -> Dict:
+        return {'source': self.name, 'directory': self.directory, 'speed': self.speed,
+                'time': self.now(), 'step': self._step}
+
+
+class SyntheticSource(ReplaySource):
+    """
+    A replay of generated feeds: seeded geometric Brownian motion per
+    symbol, so the same seed gives the same prices on every run and every
+    machine. Daily history runs back history_days from today's UTC
+    midnight, where the replayed ticks (every tick_seconds) start; both end
+    at levels[symbol] (100 for other symbols) at that midnight.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed: int = 0, speed: float = 0.0, levels: Dict[str, float] = None,
+                 history_days: int = 3650, ticks: int = 10080, tick_seconds: int = 60,
+                 volatility: float = 0.03, clock=time.time):
+        super().__init__(directory=None, speed=speed, clock=clock)
+        self.seed = seed
+        self.levels = {symbol.upper(): level for symbol, level in (levels or {}).items()}
+        self.history_days = history_days
+        self.ticks = ticks
+        self.tick_ms = tick_seconds * 1000
+        self.volatility = volatility
+        self.anchor = int(clock() * 1000) // DAY_MS * DAY_MS
+
+    def _rng(self, symbol: str, stream: int) -> np.random.Generator:
+        # crc32, not hash(): str hashes are salted per process
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), stream])
+
+    def _load_feed(self, symbol: str) -> Feed:
+        level = float(self.levels.get(symbol, 100.0))
+
+        # History is generated backwards from the anchor, so its recent part
+        # does not depend on history_days
+        steps = self._rng(symbol, 0).normal(0.0, self.volatility, self.history_days - 1)
+        daily_prices = level * np.exp(-np.concatenate(([0.0], np.cumsum(steps))))[::-1]
+        daily_times = self.anchor - DAY_MS * np.arange(self.history_days, dtype=np.int64)[::-1]
+
+        tick_volatility = self.volatility * np.sqrt(self.tick_ms / DAY_MS)
+        steps = self._rng(symbol, 1).normal(0.0, tick_volatility, self.ticks - 1)
+        tick_prices = level * np.exp(np.concatenate(([0.0], np.cumsum(steps))))
+        tick_times = self._load_timeline()
+
+        # Later daily points are the ticks at each midnight
+        midnight = (tick_times % DAY_MS == 0) & (tick_times > self.anchor)
+        daily = (np.concatenate((daily_times, tick_times[midnight])),
+                 np.concatenate((daily_prices, tick_prices[midnight])))
+        return Feed(daily, (tick_times, tick_prices))
+
+    def _load_timeline(self) -> np.ndarray:
+        return self.anchor + self.tick_ms * np.arange(self.ticks, dtype=np.int64)
+
+    def stats(self) -> Dict:
+        return {'source': self.name, 'seed': self.seed, 'speed': self.speed,
+                'time': self.now(), 'step': self._step}
+
+
+def create_source(mode: str, coin_ids: Dict[str, str], feed_dir: str, speed: float = 1.0,
+                  seed: int = 0, levels: Dict[str, float] = None) -> Tuple[MarketSource, Optional[FeedRecorder]]:
+    """The source (and recorder, in record mode) for a mode in SOURCES"""
+    if mode == 'live':
+        return LiveSource(coin_ids), None
+    if mode == 'record':
+        return LiveSource(coin_ids), FeedRecorder(feed_dir)
+    if mode == 'replay':
+        if not os.path.isdir(feed_dir):
+            raise ValueError(f"No recorded feed in {feed_dir}")
+        return ReplaySource(feed_dir, speed=speed), None
+    if mode == 'synthetic':
+        return SyntheticSource(seed=seed, speed=speed, levels=levels), None
+    raise ValueError(f"Unknown data source: {mode} (use {', '.join(SOURCES)})")
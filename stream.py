@@ -0,0 +1,227 @@
+"""
+EAR Trader Simulator - Live market stream
+One server-side refresh loop whose price/indicator changes are fanned out
+to every subscriber as Server-Sent Events
+"""
+
+import asyncio
+import json
+import math
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Fields pushed per symbol; indicators are rounded as in /api/market, so
+# noise below the displayed precision does not produce deltas
+INDICATOR_FIELDS = ('epi', 'eci', 'etb', 'regime', 'recommendation')
+
+# SSE comment line, sent on idle connections so proxies keep them open
+KEEPALIVE = ': keepalive\n\n'
+
+
+def rounded(value, digits: int = 3):
+    """Indicator value as sent to clients: rounded, None (JSON null) when NaN/inf"""
+    if isinstance(value, float):
+        return round(value, digits) if math.isfinite(value) else None
+    return value
+
+
+def sse(event: str, data: Dict, event_id: int = None) -> str:
+    """One Server-Sent Events message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """Bounded message queue of one subscriber, consumed by a thread"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._queue = queue.Queue()
+
+    def put(self, message: Optional[str]) -> bool:
+        """Queue a message; False if the subscriber has fallen too far behind"""
+        if message is not None and self._queue.qsize() >= self.maxsize:
+            return False
+        self._queue.put_nowait(message)
+        return True
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Next message, KEEPALIVE after `timeout` idle seconds, None once closed"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return KEEPALIVE
+
+
+class AsyncSubscription(Subscription):
+    """Subscription consumed by a coroutine on `loop`"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 256):
+        super().__init__(maxsize)
+        self.loop = loop
+        self._queue = asyncio.Queue()
+
+    def put(self, message: Optional[str]) -> bool:
+        if message is not None and self._queue.qsize() >= self.maxsize:
+            return False
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        return True
+
+    async def get(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return KEEPALIVE
+
+
+class MarketStream:
+    """
+    Polls spot prices and indicator snapshots once per `interval` for the
+    union of all watched symbols, however many clients are connected, and
+    pushes only what changed. Prices are live to within `interval`;
+    indicators and regimes come from the scanner snapshot, so they change
+    at most once per scanner refresh (SCAN_INTERVAL, 5 minutes by default).
+    Undefined indicators (NaN on flat or short series) are sent as null.
+
+    New subscribers get a `snapshot` event with the full state, then
+    `update` events of {symbol: {changed fields}}. Each message is encoded
+    once and shared by all subscribers. A subscriber whose queue overflows
+    is disconnected; EventSource reconnects and resyncs from a snapshot.
+    Listeners (the alert engine) get every delta with the state before it.
+    The loop idles while nobody is subscribed and no listener is active.
+    """
+
+    def __init__(self, symbols: Callable[[], List[str]],
+                 prices: Callable[[List[str]], Dict[str, float]],
+                 indicators: Callable[[], Dict[str, Dict]],
+                 interval: float = 5.0, keepalive: float = 15.0):
+        self.symbols = symbols
+        self.prices = prices
+        self.indicators = indicators
+        self.interval = interval
+        self.keepalive = keepalive
+        self._state: Dict[str, Dict] = {}
+        self._subscribers = set()
+        self._listeners = []  # (callback, active)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.ticks = 0
+        self.updates = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_tick_ms = 0.0
+
+    def subscribe(self, subscription: Subscription = None) -> Subscription:
+        """Register a subscriber and queue the current snapshot for it"""
+        subscription = subscription or Subscription()
+        with self._cond:
+            subscription.put(sse('snapshot', self._state, self._seq))
+            self._subscribers.add(subscription)
+            self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._cond:
+            self._subscribers.discard(subscription)
+
+    def listen(self, callback: Callable[[Dict[str, Dict], Dict[str, Dict]], None],
+               active: Callable[[], bool] = lambda: True):
+        """Call callback(delta, previous state) after every tick that changed something"""
+        with self._cond:
+            self._listeners.append((callback, active))
+
+    def publish(self, event: str, data):
+        """Push an event of another kind (e.g. fired alerts) to every subscriber"""
+        with self._cond:
+            self._seq += 1
+            self._broadcast(sse(event, data, self._seq))
+
+    def start(self):
+        """Start the refresh loop (idempotent); it runs while there is demand"""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='market-stream', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _idle(self) -> bool:
+        return not self._subscribers and not any(active() for _, active in self._listeners)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._idle():
+                    # Listener demand is polled, so a new alert rule wakes the loop within one interval
+                    self._cond.wait(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error refreshing market stream: {e}")
+            time.sleep(self.interval)
+
+    def tick(self) -> Dict[str, Dict]:
+        """Refresh prices and indicators once and broadcast the delta"""
+        start = time.perf_counter()
+        symbols = self.symbols()
+        prices = self.prices(symbols)
+        indicators = self.indicators()
+
+        state = {}
+        for symbol in symbols:
+            entry = {'current_price': prices.get(symbol)}
+            row = indicators.get(symbol)
+            if row is not None:
+                for field in INDICATOR_FIELDS:
+                    entry[field] = rounded(row[field])
+            state[symbol] = entry
+
+        delta = {}
+        for symbol, entry in state.items():
+            previous = self._state.get(symbol, {})
+            changed = {k: v for k, v in entry.items() if previous.get(k) != v}
+            if changed:
+                delta[symbol] = changed
+
+        with self._cond:
+            previous = self._state
+            self._state = state
+            if delta:
+                self._seq += 1
+                self.updates += 1
+                self._broadcast(sse('update', delta, self._seq))
+            self.ticks += 1
+            self.last_tick_ms = (time.perf_counter() - start) * 1000
+            listeners = list(self._listeners)
+
+        if delta:
+            for callback, _ in listeners:
+                callback(delta, previous)
+        return delta
+
+    def _broadcast(self, message: str):
+        for subscription in list(self._subscribers):
+            if not subscription.put(message):
+                self._subscribers.discard(subscription)
+                subscription.put(None)
+                self.dropped += 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'subscribers': len(self._subscribers),
+                'symbols': len(self._state),
+                'ticks': self.ticks,
+                'updates': self.updates,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'last_tick_ms': self.last_tick_ms,
+                'interval_s': self.interval
+            }
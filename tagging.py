@@ -0,0 +1,145 @@
+"""
+EAR Trader Simulator - Background trade tagging
+Fills regime/epi/eci/etb on trades rows after the trade has committed
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Tuple
+
+from db import Database
+
+# Tagger: asset -> (regime, epi, eci, etb)
+Tagger = Callable[[str], Tuple[str, float, float, float]]
+
+
+class TaggingWorker:
+    """
+    Thread pool that tags closed trades with the EAR indicators of their
+    asset, keeping price history fetches and indicator math off the SELL
+    request path.
+
+    Each worker drains everything pending, computes indicators once per
+    asset and writes all rows of the batch in one transaction. A batch whose
+    write fails is logged and counted as failed; the worker keeps running.
+    stats() exposes queue depth, the age of the oldest pending trade and the
+    enqueue-to-tagged lag.
+    """
+
+    def __init__(self, db: Database, tagger: Tagger, workers: int = 2):
+        self.db = db
+        self.tagger = tagger
+        self.workers = workers
+        self._pending = deque()  # (trade_id, asset, enqueued_at)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._busy = 0
+
+        self.processed = 0
+        self.failed = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.lag_last = 0.0
+
+    def submit(self, trades: Iterable[Tuple[int, str]]):
+        """Queue (trade_id, asset) pairs for tagging"""
+        now = time.monotonic()
+        with self._cond:
+            self._start()
+            self._pending.extend((trade_id, asset, now) for trade_id, asset in trades)
+            self._cond.notify_all()
+
+    def recover(self) -> int:
+        """Queue trades left untagged by a previous run; returns how many"""
+        rows = self.db.connection().execute(
+            "SELECT id, asset FROM trades WHERE regime IS NULL ORDER BY id").fetchall()
+        if rows:
+            self.submit(rows)
+        return len(rows)
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until the queue is empty and no batch is in flight"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _start(self):
+        if not self._threads:
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f'tagging-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = list(self._pending)
+                self._pending.clear()
+                self._busy += 1
+            try:
+                self._tag(batch)
+            except Exception as e:
+                # Rows stay untagged in the DB; recover() queues them again on restart
+                print(f"Error tagging batch of {len(batch)} trades: {e}")
+                with self._cond:
+                    self.failed += len(batch)
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def _tag(self, batch):
+        tags = {}
+        rows = []
+        failed = 0
+        for trade_id, asset, _ in batch:
+            if asset not in tags:
+                try:
+                    tags[asset] = self.tagger(asset)
+                except Exception as e:
+                    print(f"Error tagging {asset}: {e}")
+                    tags[asset] = None
+            if tags[asset] is None:
+                failed += 1
+                continue
+            regime, epi, eci, etb = tags[asset]
+            rows.append((regime, epi, eci, etb, trade_id))
+
+        if rows:
+            conn = self.db.connection()
+            with conn:
+                conn.executemany("UPDATE trades SET regime=?, epi=?, eci=?, etb=? WHERE id=?", rows)
+
+        now = time.monotonic()
+        with self._cond:
+            self.processed += len(rows)
+            self.failed += failed
+            for _, _, enqueued_at in batch:
+                lag = now - enqueued_at
+                self.lag_total += lag
+                self.lag_max = max(self.lag_max, lag)
+            self.lag_last = now - batch[-1][2]
+
+    def stats(self) -> Dict:
+        """Queue depth and lag metrics"""
+        with self._cond:
+            done = self.processed + self.failed
+            return {
+                'depth': len(self._pending),
+                'in_flight': self._busy,
+                'oldest_pending_s': time.monotonic() - self._pending[0][2] if self._pending else 0.0,
+                'processed': self.processed,
+                'failed': self.failed,
+                'avg_lag_ms': self.lag_total / done * 1000 if done else 0.0,
+                'max_lag_ms': self.lag_max * 1000,
+                'last_lag_ms': self.lag_last * 1000,
+                'workers': self.workers
+            }
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before any test imports main, so the suite never opens data/trades.db
+_scratch = tempfile.TemporaryDirectory(prefix='ear-tests-')
+os.environ['EAR_DB_PATH'] = os.path.join(_scratch.name, 'trades.db')
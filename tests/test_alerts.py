@@ -0,0 +1,33 @@
+"""Alert rule validation and regime change evaluation"""
+
+import pytest
+
+import main
+from alerts import ALERTS_SCHEMA, AlertEngine, parse_rule
+from ear_engine import BREAKDOWN, RANGING, REGIMES
+from db import Database
+
+
+def regime_rule(**values) -> dict:
+    return dict({'symbol': '*', 'field': 'regime', 'condition': 'changes'}, **values)
+
+
+@pytest.mark.parametrize('values', [{'to': 'FRAG'}, {'from': 'TREE'}, {'from': REGIMES[0], 'to': 'x'}])
+def test_unknown_regime_is_rejected(values):
+    with pytest.raises(ValueError, match='Unknown regime'):
+        parse_rule(regime_rule(**values))
+
+
+def test_unknown_regime_returns_400():
+    response = main.app.test_client().post('/api/alerts', json=regime_rule(to='FRAG'))
+    assert response.status_code == 400
+    assert 'Unknown regime' in response.json['error']
+
+
+def test_regime_rule_fires(tmp_path):
+    engine = AlertEngine(Database(str(tmp_path / 'alerts.db'), [ALERTS_SCHEMA]))
+    rule = engine.add(parse_rule(regime_rule(to=REGIMES[BREAKDOWN])))
+
+    events = engine.evaluate({'BTC': {'regime': REGIMES[BREAKDOWN]}}, {'BTC': {'regime': REGIMES[RANGING]}})
+    assert [event['rule_id'] for event in events] == [rule['id']]
+    assert engine.evaluate({'BTC': {'regime': REGIMES[RANGING]}}, {'BTC': {'regime': REGIMES[BREAKDOWN]}}) == []
@@ -0,0 +1,33 @@
+"""Input validation of POST /api/backtest"""
+
+import pytest
+
+import main
+
+PRICES = [100.0 + i % 7 for i in range(400)]
+
+
+@pytest.mark.parametrize('body', [
+    {'lookback': 'x'},
+    {'cost_bps': None},
+    {'days': 'a'},
+    {'top': [1], 'grid': {'exit_eci': [0.7]}},
+    {'prices': ['a', 'b']},
+    {'prices': [[1, 2], [3]]},
+    {'thresholds': 'x'},
+    {'thresholds': {'exit_eci': 'high'}},
+    {'grid': [0.7]},
+    {'grid': {'exit_eci': 5}},
+    {'prices': PRICES, 'grid': {'bogus': [1]}},
+])
+def test_invalid_parameters_are_rejected(body):
+    response = main.app.test_client().post('/api/backtest', json=body)
+    assert response.status_code == 400
+    assert response.json['error']
+
+
+def test_prices_backtest():
+    response = main.app.test_client().post('/api/backtest', json={
+        'prices': PRICES, 'lookback': '100', 'thresholds': {'exit_eci': 0.8}, 'include_curve': False})
+    assert response.status_code == 200
+    assert 'statistics' in response.json
@@ -0,0 +1,30 @@
+"""BarStore views stay unchanged while ticks extend the last bar; /api/bars limits"""
+
+import numpy as np
+import pytest
+
+import main
+from bars import OHLC_BARS_SCHEMA, BarStore
+from db import Database
+
+
+def test_views_survive_ingest(tmp_path):
+    store = BarStore(Database(str(tmp_path / 'bars.db'), [OHLC_BARS_SCHEMA]))
+    store.ingest('BTC', np.arange(0, 600000, 1000), np.linspace(100, 110, 600))
+    timestamps, open_, high, low, close = store.get('BTC', '1m')
+    before = [column.copy() for column in (timestamps, open_, high, low, close)]
+
+    # Ticks inside the last minute extend its bar; later ones add bars
+    store.ingest('BTC', np.array([599500, 650000]), np.array([200.0, 50.0]))
+
+    for column, expected in zip((timestamps, open_, high, low, close), before):
+        assert np.array_equal(column, expected)
+    _, _, high, _, close = store.get('BTC', '1m')
+    assert high[-2] == 200.0 and close[-2] == 200.0 and close[-1] == 50.0
+
+
+@pytest.mark.parametrize('limit', ['0', '-5', str(main.MAX_BARS + 1), 'all'])
+def test_bars_limit_out_of_range_returns_400(limit):
+    response = main.app.test_client().get(f'/api/bars/BTC?resolution=1m&limit={limit}')
+    assert response.status_code == 400
+    assert 'Invalid limit' in response.json['error']
@@ -0,0 +1,34 @@
+"""Commits are timed whether explicit or made by `with conn:`"""
+
+import pytest
+
+from db import Database
+from metrics import metrics
+
+pytestmark = pytest.mark.skipif(not metrics.enabled, reason='metrics disabled (EAR_METRICS=0)')
+
+
+def commits(run) -> int:
+    token = metrics.start_profile()
+    try:
+        run()
+        return metrics.profile().spans.get(('db', 'commit'), [0])[0]
+    finally:
+        metrics.stop_profile(token)
+
+
+def test_context_manager_commit_is_timed(tmp_path):
+    conn = Database(str(tmp_path / 'timed.db'), ["CREATE TABLE t (x INTEGER)"]).connection()
+
+    def with_block():
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+
+    def explicit():
+        conn.execute("INSERT INTO t VALUES (2)")
+        conn.commit()
+
+    assert commits(with_block) == 1
+    assert commits(explicit) == 1
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+    conn.close()
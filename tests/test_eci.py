@@ -0,0 +1,13 @@
+"""Vectorized rolling correlation instability matches the reference loop"""
+
+import numpy as np
+import pytest
+
+from ear_engine import EAREngine
+
+
+@pytest.mark.parametrize('n_points, window', [(365, 20), (100, 20), (60, 5), (41, 20), (40, 20), (10, 20)])
+def test_rolling_corr_instability_matches_reference(n_points, window):
+    prices = 100 * np.cumprod(1 + np.random.default_rng(n_points).normal(0, 0.03, n_points))
+    expected = EAREngine._rolling_corr_instability_reference(prices, window)
+    assert EAREngine.rolling_corr_instability(prices, window) == pytest.approx(expected, rel=0, abs=1e-12)
@@ -0,0 +1,58 @@
+"""calculate_hurst_batch rows match the 1-D estimator and a plain R/S loop"""
+
+import numpy as np
+import pytest
+
+from ear_engine import EAREngine
+
+
+def loop_hurst(prices: np.ndarray, max_lag: int = 20) -> float:
+    """Chunked R/S Hurst written out one lag and one chunk at a time"""
+    returns = np.diff(prices) / prices[:-1]
+    points = []
+    for lag in range(2, min(max_lag, len(prices) // 2)):
+        rs = []
+        for start in range(0, len(returns) - lag + 1, lag):
+            chunk = returns[start:start + lag]
+            dev = chunk - chunk.mean()
+            Y = np.cumsum(dev)
+            R, S = Y.max() - Y.min(), chunk.std()
+            if R > 0 and S > 0:
+                rs.append(R / S)
+        if rs:
+            points.append((np.log(lag), np.log(np.mean(rs))))
+    if len(points) < 2:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            autocorr = np.corrcoef(returns[:-1], returns[1:])[0, 1]
+        return 0.5 if np.isnan(autocorr) else float(np.clip(0.5 + autocorr * 0.25, 0.3, 0.85))
+    x, y = np.array(points).T
+    return float(np.clip(np.polyfit(x, y, 1)[0], 0.3, 0.9))
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(7)
+    walks = 100 * np.cumprod(1 + rng.normal(0, 0.02, (6, 120)), axis=1)
+    trend = 100 * np.cumprod(1 + 0.01 + rng.normal(0, 0.002, 120))
+    flat = np.full(120, 100.0)
+    return np.vstack([walks, trend, flat])
+
+
+@pytest.mark.parametrize('max_lag', [20, 8, 3])
+def test_batch_rows_match_1d(rows, max_lag):
+    batch = EAREngine.calculate_hurst_batch(rows, max_lag)
+    for row, hurst in zip(rows, batch):
+        assert hurst == pytest.approx(EAREngine.calculate_hurst_exponent(row, max_lag), abs=1e-12)
+        assert hurst == pytest.approx(loop_hurst(row, max_lag), abs=1e-9)
+
+
+@pytest.mark.parametrize('max_lag', [2, 1])
+def test_no_lags_falls_back_to_autocorrelation(rows, max_lag):
+    batch = EAREngine.calculate_hurst_batch(rows, max_lag)
+    expected = [loop_hurst(row, max_lag) for row in rows]
+    assert batch == pytest.approx(expected, abs=1e-12)
+    assert EAREngine.calculate_hurst_exponent(rows[0], max_lag) == pytest.approx(expected[0], abs=1e-12)
+
+
+def test_short_rows_are_neutral():
+    assert EAREngine.calculate_hurst_batch(np.ones((3, 20))).tolist() == [0.5] * 3
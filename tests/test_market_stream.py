@@ -0,0 +1,28 @@
+"""MarketStream messages are valid JSON for the browser's JSON.parse"""
+
+import json
+
+from stream import MarketStream, Subscription
+
+
+def strict_json(message: str):
+    """Payload of an SSE message, rejecting NaN/Infinity as JSON.parse does"""
+    data = next(line[len('data: '):] for line in message.splitlines() if line.startswith('data: '))
+    return json.loads(data, parse_constant=lambda name: (_ for _ in ()).throw(ValueError(name)))
+
+
+def test_undefined_indicators_are_null(monkeypatch):
+    row = {'epi': 0.5, 'eci': float('nan'), 'etb': float('nan'), 'regime': 'Σ₃₃₃₋', 'recommendation': 'HOLD'}
+    prices = {'FLAT': 1.0}
+    stream = MarketStream(lambda: ['FLAT'], lambda symbols: dict(prices), lambda: {'FLAT': row})
+    monkeypatch.setattr(stream, 'start', lambda: None)  # Tick by hand, not on the refresh thread
+    stream.tick()
+
+    subscription = stream.subscribe(Subscription())
+    snapshot = strict_json(subscription.get(timeout=0))
+    assert snapshot['FLAT']['eci'] is None and snapshot['FLAT']['etb'] is None
+
+    # Unchanged NaN indicators are not re-sent on every tick
+    prices['FLAT'] = 1.5
+    assert stream.tick() == {'FLAT': {'current_price': 1.5}}
+    assert strict_json(subscription.get(timeout=0)) == {'FLAT': {'current_price': 1.5}}
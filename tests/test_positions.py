@@ -0,0 +1,37 @@
+"""Positions changed by a SELL commit together with its trades row"""
+
+import sqlite3
+
+from db import Database
+from orders import OrderEngine
+from positions import PositionBook
+
+SCHEMA = [
+    "CREATE TABLE portfolio (id INTEGER PRIMARY KEY, asset TEXT, amount REAL, avg_price REAL, updated_at TIMESTAMP)",
+    """CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date TIMESTAMP, asset TEXT, type TEXT,
+       entry_price REAL, exit_price REAL, amount REAL, pnl_percent REAL, regime TEXT, epi REAL,
+       eci REAL, etb REAL, notes TEXT)"""
+]
+
+
+def test_sell_writes_positions_with_trade(tmp_path):
+    path = str(tmp_path / 'trades.db')
+    db = Database(path, [SCHEMA])
+    conn = db.connection()
+    conn.execute("INSERT INTO portfolio VALUES (NULL, 'USD', 1000, 1, NULL)")
+    conn.commit()
+    book = PositionBook(db, flush_interval=3600)  # No write-behind flush during the test
+    engine = OrderEngine(db, book)
+
+    engine.submit({'asset': 'BTC', 'type': 'BUY', 'amount': 2.0, 'price': 100.0})
+    assert book.stats()['dirty'] == 2  # BUYs stay write-behind
+    engine.submit({'asset': 'BTC', 'type': 'SELL', 'amount': 0.5, 'price': 120.0})
+
+    # What a crash right now would leave on disk
+    disk = sqlite3.connect(path)
+    assert disk.execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 1
+    portfolio = dict(disk.execute("SELECT asset, amount FROM portfolio").fetchall())
+    assert portfolio == {'USD': 860.0, 'BTC': 1.5}
+    assert book.stats()['dirty'] == 0
+    disk.close()
+    db.close_all()
@@ -0,0 +1,39 @@
+"""PriceStore views stay unchanged while the store is updated"""
+
+import numpy as np
+
+from db import Database
+from price_store import PRICE_HISTORY_SCHEMA, PriceStore
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def test_views_are_immutable(tmp_path):
+    store = PriceStore(Database(str(tmp_path / 'prices.db'), [PRICE_HISTORY_SCHEMA]))
+    days = np.arange(10, dtype=np.int64) * DAY_MS
+    store.append('BTC', days, np.arange(10, dtype=np.float64))
+    timestamps, prices = store.get('BTC')
+    before = prices.copy()
+
+    # New quote for the last day, then new days (past the buffer capacity too)
+    store.append('BTC', days[-1:], np.array([99.0]))
+    store.append('BTC', days[-1] + np.arange(1, 1000) * DAY_MS, np.full(999, 7.0))
+
+    assert np.array_equal(prices, before)
+    assert timestamps[-1] == days[-1]
+    new_timestamps, new_prices = store.get('BTC')
+    assert len(new_prices) == 1009
+    assert new_prices[9] == 99.0
+
+
+def test_reload_matches_memory(tmp_path):
+    db = Database(str(tmp_path / 'prices.db'), [PRICE_HISTORY_SCHEMA])
+    store = PriceStore(db)
+    days = np.arange(5, dtype=np.int64) * DAY_MS
+    store.append('ETH', days, np.arange(5, dtype=np.float64))
+    store.append('ETH', days[-2:], np.array([30.0, 40.0]))  # Older than the last point: reloaded from SQLite
+
+    fresh = PriceStore(db)
+    for stored, reloaded in zip(store.get('ETH'), fresh.get('ETH')):
+        assert np.array_equal(stored, reloaded)
+    assert store.get('ETH')[1].tolist() == [0.0, 1.0, 2.0, 30.0, 40.0]
@@ -0,0 +1,76 @@
+"""StreamingEAREngine against the batch EAREngine functions on the same windows"""
+
+import numpy as np
+import pytest
+
+from ear_engine import EAREngine, StreamingEAREngine
+
+
+def synthetic_prices(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 40000.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+def batch(prices: np.ndarray) -> dict:
+    """What /api/market computes: ECI on the last 365 prices, EPI/ETB on the last 100"""
+    window = prices[-365:]
+    epi = EAREngine.calculate_hurst_exponent(window[-100:])
+    eci = EAREngine.calculate_eci(window)
+    etb = EAREngine.calculate_etb(window[-100:])
+    return {'epi': epi, 'eci': float(eci), 'etb': float(etb),
+            'regime': EAREngine.classify_regime(epi, eci, etb)}
+
+
+def assert_matches(state: dict, prices: np.ndarray):
+    expected = batch(prices)
+    assert state['price'] == prices[-1]
+    assert state['epi'] == expected['epi']
+    for name in ('eci', 'etb'):
+        # Accumulators round differently; NaN (constant windows) must stay NaN
+        if np.isnan(expected[name]):
+            assert np.isnan(state[name])
+        else:
+            assert state[name] == pytest.approx(expected[name], rel=1e-9, abs=1e-12)
+    assert state['regime'] == expected['regime']
+
+
+@pytest.mark.parametrize('seed_points', [400, 150])
+def test_push_matches_batch(seed_points):
+    prices = synthetic_prices(3000)
+    stream = StreamingEAREngine.from_prices(prices[:seed_points])
+    for i in range(seed_points, len(prices)):
+        assert_matches(stream.push(prices[i]), prices[:i + 1])
+
+
+def test_short_history():
+    # Fewer ticks than the 100-point window, then past it and past 365
+    prices = synthetic_prices(500, seed=1)
+    stream = StreamingEAREngine.from_prices(prices[:5])
+    for i in range(5, len(prices)):
+        assert_matches(stream.push(prices[i]), prices[:i + 1])
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')  # np.corrcoef of a constant series
+def test_flat_series():
+    prices = np.full(600, 100.0)
+    stream = StreamingEAREngine.from_prices(prices[:200])
+    for i in range(200, len(prices)):
+        assert_matches(stream.push(prices[i]), prices[:i + 1])
+
+    state = stream.snapshot()
+    assert state['epi'] == 0.5
+    assert np.isnan(state['eci'])  # Constant windows have no correlations, as in the batch path
+    assert np.isnan(state['etb'])
+
+
+def test_resync_keeps_parity():
+    prices = synthetic_prices(StreamingEAREngine.RESYNC_EVERY * 2 + 500, seed=2)
+    stream = StreamingEAREngine.from_prices(prices[:365])
+    for i in range(365, len(prices)):
+        state = stream.push(prices[i])
+    assert_matches(state, prices)
+
+
+def test_history_must_cover_window():
+    with pytest.raises(ValueError):
+        StreamingEAREngine(history=StreamingEAREngine.WINDOW - 1)
@@ -0,0 +1,33 @@
+"""The tagging worker survives a failed batch write"""
+
+import sqlite3
+
+from db import Database
+from tagging import TaggingWorker
+
+TRADES = "CREATE TABLE trades (id INTEGER PRIMARY KEY, asset TEXT, regime TEXT, epi REAL, eci REAL, etb REAL)"
+
+
+def test_worker_survives_locked_database(tmp_path):
+    path = str(tmp_path / 'trades.db')
+    db = Database(path, [TRADES], busy_timeout_ms=50)
+    conn = db.connection()
+    conn.executemany("INSERT INTO trades (id, asset) VALUES (?, ?)", [(1, 'BTC'), (2, 'ETH')])
+    conn.commit()
+    worker = TaggingWorker(db, tagger=lambda asset: ('Σ₃₃₃₊', 0.6, 0.1, 0.2), workers=1)
+
+    # Another writer holds the lock: the UPDATE fails with "database is locked"
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN EXCLUSIVE")
+    worker.submit([(1, 'BTC')])
+    assert worker.join(timeout=5)
+    blocker.rollback()
+    blocker.close()
+    assert worker.stats()['failed'] == 1
+
+    worker.submit([(2, 'ETH')])
+    assert worker.join(timeout=5)
+    rows = dict(conn.execute("SELECT id, regime FROM trades").fetchall())
+    assert rows == {1: None, 2: 'Σ₃₃₃₊'}
+    assert worker.stats()['processed'] == 1
+    db.close_all()
@@ -0,0 +1,58 @@
+"""Upstream round trips of /api/portfolio, against the local CoinGecko stub"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import main
+from sources import FeedRecorder, LiveSource, read_feed
+from stub_prices import StubServer
+
+HELD = ['BTC', 'ETH', 'SOL', 'DOGE']
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    server = StubServer().start()
+    path = main.db.path
+    main.db.reset(str(tmp_path / 'trades.db'))
+    monkeypatch.setattr(main.DataFetcher, 'source', LiveSource(main.COINGECKO_IDS, base_url=server.base_url))
+    main.init_db()
+    conn = main.db.connection()
+    conn.executemany("INSERT INTO portfolio VALUES (NULL, ?, 1.5, 100, ?)", [(s, datetime.now()) for s in HELD])
+    conn.commit()
+    main.position_book.reload()  # Load the seeded rows
+    main.DataFetcher.price_cache.invalidate()
+    yield server
+    main.db.reset(path)
+    main.position_book.reload()
+    server.shutdown()
+    server.server_close()
+
+
+def test_portfolio_prices_in_one_request(stub):
+    client = main.app.test_client()
+
+    response = client.get('/api/portfolio')
+    assert response.status_code == 200
+    assert {row['asset'] for row in response.json['portfolio']} == {'USD', *HELD}
+    assert stub.calls['simple_price'] == 1  # One bulk call for every held asset
+    assert stub.requests == 1
+
+    # Within the spot price TTL the repeat is served from the cache
+    assert client.get('/api/portfolio').status_code == 200
+    assert stub.requests == 1
+
+
+def test_market_spot_price_is_recorded(stub, tmp_path, monkeypatch):
+    recorder = FeedRecorder(str(tmp_path / 'feed'))
+    monkeypatch.setattr(main.DataFetcher, 'recorder', recorder)
+
+    response = main.app.test_client().get('/api/market/BTC')
+    assert response.status_code == 200
+    timestamps, prices = read_feed(recorder.directory, 'BTC', 'ticks')
+    assert prices.tolist() == [response.json['current_price']]
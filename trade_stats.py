@@ -0,0 +1,142 @@
+"""
+EAR Trader Simulator - Trade statistics
+Per-scope aggregates of closed trades (all, per asset, per regime), kept
+current by SQLite triggers so reading them never scans the trades table
+"""
+
+import math
+from typing import Dict, List
+
+from db import Database
+
+# Columns of a trade_stats row, in order
+STATS_COLUMNS = ('n', 'wins', 'losses', 'sum_win', 'sum_loss', 'mean', 'm2',
+                 'pnl', 'peak', 'max_drawdown')
+
+
+def _upsert(scope: str, key: str) -> str:
+    """
+    Fold NEW (a trades row) into the (scope, key) aggregate.
+
+    mean/m2 are Welford's running mean and sum of squared deviations of
+    pnl_percent. pnl/peak track realized USD PnL and its high-water mark;
+    max_drawdown is the deepest peak-to-trough fall of the resulting equity
+    curve, in percent of the equity at the peak. On conflict the right-hand
+    sides read the row as it was before the update.
+    """
+    x = 'NEW.pnl_percent'
+    usd = '(NEW.exit_price - NEW.entry_price) * NEW.amount'
+    pnl = f'(pnl + {usd})'
+    peak = f'max(peak, {pnl})'
+    return f'''INSERT INTO trade_stats (scope, key, {', '.join(STATS_COLUMNS)})
+               VALUES ('{scope}', {key}, 1, {x} > 0, {x} < 0,
+                       max({x}, 0), min({x}, 0), {x}, 0,
+                       {usd}, max({usd}, 0),
+                       (max({usd}, 0) - {usd}) / (:initial + max({usd}, 0)) * 100)
+               ON CONFLICT (scope, key) DO UPDATE SET
+                   n = n + 1,
+                   wins = wins + excluded.wins,
+                   losses = losses + excluded.losses,
+                   sum_win = sum_win + excluded.sum_win,
+                   sum_loss = sum_loss + excluded.sum_loss,
+                   mean = mean + ({x} - mean) / (n + 1),
+                   m2 = m2 + ({x} - mean) * ({x} - (mean + ({x} - mean) / (n + 1))),
+                   pnl = {pnl},
+                   peak = {peak},
+                   max_drawdown = max(max_drawdown, ({peak} - {pnl}) / (:initial + {peak}) * 100);'''
+
+
+def _backfill(scope: str, key: str, where: str) -> str:
+    """Aggregate trades recorded before the triggers existed, in id order"""
+    return f'''INSERT OR REPLACE INTO trade_stats (scope, key, {', '.join(STATS_COLUMNS)})
+               SELECT '{scope}', k, COUNT(*), SUM(x > 0), SUM(x < 0),
+                      SUM(max(x, 0)), SUM(min(x, 0)), AVG(x), SUM((x - mean_x) * (x - mean_x)),
+                      SUM(usd), max(MAX(cum), 0),
+                      max(MAX((max(peak, 0) - cum) / (:initial + max(peak, 0)) * 100), 0)
+               FROM (SELECT k, x, usd, mean_x, cum,
+                            MAX(cum) OVER (PARTITION BY k ORDER BY id) AS peak
+                     FROM (SELECT {key} AS k, id, pnl_percent AS x,
+                                  (exit_price - entry_price) * amount AS usd,
+                                  AVG(pnl_percent) OVER (PARTITION BY {key}) AS mean_x,
+                                  SUM((exit_price - entry_price) * amount)
+                                      OVER (PARTITION BY {key} ORDER BY id) AS cum
+                           FROM trades WHERE pnl_percent IS NOT NULL {where}))
+               GROUP BY k'''
+
+
+def trade_stats_schema(initial_equity: float) -> List[str]:
+    """
+    Migration statements for trade_stats: the table, its triggers and a
+    backfill of existing trades. Drawdowns are measured on an equity curve
+    starting at initial_equity.
+
+    Asset aggregates are updated when a trade is inserted; regime aggregates
+    when the tagging worker fills in the trade's regime.
+    """
+    statements = [
+        f'''CREATE TABLE IF NOT EXISTS trade_stats
+            (scope TEXT NOT NULL,
+             key TEXT NOT NULL,
+             {', '.join(f'{column} REAL NOT NULL' for column in STATS_COLUMNS)},
+             PRIMARY KEY (scope, key)) WITHOUT ROWID''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trade_stats_insert
+            AFTER INSERT ON trades WHEN NEW.pnl_percent IS NOT NULL
+            BEGIN
+                {_upsert('all', "''")}
+                {_upsert('asset', 'NEW.asset')}
+            END''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trade_stats_tag
+            AFTER UPDATE OF regime ON trades
+            WHEN OLD.regime IS NULL AND NEW.regime IS NOT NULL AND NEW.pnl_percent IS NOT NULL
+            BEGIN
+                {_upsert('regime', 'NEW.regime')}
+            END''',
+
+        _backfill('all', "''", ''),
+        _backfill('asset', 'asset', ''),
+        _backfill('regime', 'regime', 'AND regime IS NOT NULL')
+    ]
+    return [statement.replace(':initial', repr(float(initial_equity))) for statement in statements]
+
+
+def summarize(row: Dict) -> Dict:
+    """Win rate, averages, Sharpe and drawdown of one aggregate row"""
+    n = row['n']
+    std = math.sqrt(row['m2'] / n) if n else 0.0
+    return {
+        'total_trades': int(n),
+        'win_rate': row['wins'] / n * 100 if n else 0,
+        'avg_win': row['sum_win'] / row['wins'] if row['wins'] else 0,
+        'avg_loss': row['sum_loss'] / row['losses'] if row['losses'] else 0,
+        'sharpe_ratio': row['mean'] / std if n > 1 and std > 1e-12 else 0,
+        'max_drawdown': -row['max_drawdown'] if row['max_drawdown'] else 0,
+        'realized_pnl': row['pnl']
+    }
+
+
+class TradeStats:
+    """
+    Reads of the trade_stats aggregates: one primary-key lookup per scope,
+    independent of how many trades have been recorded.
+    """
+
+    EMPTY = dict.fromkeys(STATS_COLUMNS, 0.0)
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def get(self, scope: str = 'all', key: str = '') -> Dict:
+        """Statistics of one scope ('all', 'asset' or 'regime') and key"""
+        row = self.db.connection().execute(
+            f"SELECT {', '.join(STATS_COLUMNS)} FROM trade_stats WHERE scope=? AND key=?",
+            (scope, key)).fetchone()
+        return summarize(dict(zip(STATS_COLUMNS, row)) if row else self.EMPTY)
+
+    def by(self, scope: str) -> Dict[str, Dict]:
+        """Statistics of every key in a scope, e.g. by('asset')"""
+        rows = self.db.connection().execute(
+            f"SELECT key, {', '.join(STATS_COLUMNS)} FROM trade_stats WHERE scope=? ORDER BY key",
+            (scope,)).fetchall()
+        return {row[0]: summarize(dict(zip(STATS_COLUMNS, row[1:]))) for row in rows}
@@ -0,0 +1,77 @@
+"""
+EAR Trader Simulator - Startup warm-up
+Fills the spot price, history and indicator caches of the watchlist on a
+background thread at startup, and reports when the server is ready
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+# (name, function) run once, in order
+Step = Tuple[str, Callable[[], object]]
+
+
+class Warmup:
+    """
+    Runs the warm-up steps once, in order, on a daemon thread. The server
+    takes requests meanwhile (a request that arrives cold does the work
+    itself, sharing in-flight loads through the caches); ready() turns true
+    when every step has run, so a readiness probe can hold traffic back
+    until first responses come from warm caches. A failing step is recorded
+    and skipped: warm-up only saves time, it never keeps the server unready.
+    """
+
+    def __init__(self, steps: List[Step]):
+        self.steps = steps
+        self.results: List[Dict] = []
+        self.started_at = None
+        self.elapsed_ms = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        if not steps:
+            self._done.set()
+
+    def start(self):
+        """Start warming up in the background (idempotent)"""
+        with self._lock:
+            if self._thread is None and not self._done.is_set():
+                self.started_at = datetime.now()
+                self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        start = time.perf_counter()
+        for name, step in self.steps:
+            step_start = time.perf_counter()
+            error = None
+            try:
+                step()
+            except Exception as e:
+                error = str(e)
+                print(f"Error warming up {name}: {e}")
+            with self._lock:
+                self.results.append({'name': name, 'ms': (time.perf_counter() - step_start) * 1000,
+                                     'error': error})
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        self._done.set()
+
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until warm-up has finished; False on timeout"""
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict:
+        with self._lock:
+            done = [result['name'] for result in self.results]
+            return {
+                'ready': self.ready(),
+                'started_at': self.started_at,
+                'elapsed_ms': self.elapsed_ms,
+                'steps': list(self.results),
+                'pending': [name for name, _ in self.steps if name not in done]
+            }